@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+User = get_user_model()
+
+TOKEN_VERSION_KEY = 'yamdb:token_version:{user_id}'
+# Сколько другие процессы могут принимать отозванный токен
+TOKEN_VERSION_TIMEOUT = 60
+# Поля пользователя, которые передаются в токене
+TOKEN_CLAIMS = ('username', 'role', 'is_superuser', 'token_version')
+
+
+def issue_token(user):
+    '''Токен доступа с ролью и версией для аутентификации без БД'''
+    token = AccessToken.for_user(user)
+    for claim in TOKEN_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def cache_token_version(user):
+    cache.set(
+        TOKEN_VERSION_KEY.format(user_id=user.pk), user.token_version,
+        TOKEN_VERSION_TIMEOUT
+    )
+
+
+def get_token_version(user_id):
+    '''Текущая версия токенов пользователя, None если его нет'''
+    key = TOKEN_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    version = User.objects.filter(pk=user_id).values_list(
+        'token_version', flat=True
+    ).first()
+    if version is not None:
+        cache.set(key, version, TOKEN_VERSION_TIMEOUT)
+    return version
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    '''Пользователь собирается из токена без запроса к БД
+
+    Остальные поля пользователя отложены и загружаются одним запросом
+    при первом обращении. Такого пользователя нельзя сохранить без
+    refresh_from_db(): имя и роль в токене могли устареть.
+    Токены без версии проверяются как обычно.
+    '''
+
+    def get_user(self, validated_token):
+        if 'token_version' not in validated_token:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed(
+                'Токен не содержит идентификатор пользователя',
+                code='token_not_valid'
+            )
+        version = get_token_version(user_id)
+        if version is None:
+            raise AuthenticationFailed(
+                'Пользователь не найден', code='user_not_found'
+            )
+        if version != validated_token['token_version']:
+            raise AuthenticationFailed(
+                'Токен отозван, получите новый', code='token_revoked'
+            )
+        loaded = {'id': user_id, 'is_active': True}
+        loaded.update(
+            (claim, validated_token[claim]) for claim in TOKEN_CLAIMS
+        )
+        # from_db ожидает значения в порядке полей модели
+        field_names = [
+            field.attname for field in User._meta.concrete_fields
+            if field.attname in loaded
+        ]
+        user = User.from_db(
+            router.db_for_read(User), field_names,
+            [loaded[name] for name in field_names]
+        )
+        user.from_token = True
+        return user
@@ -0,0 +1,109 @@
+import bisect
+import threading
+
+from reviews.models import Categories, Genres, Title
+
+from .cache import get_version
+from .search import casefold
+
+RESOURCE = 'autocomplete'
+# Порядок типов при одинаковом ключе: сначала более общие
+TYPES = (
+    ('category', Categories),
+    ('genre', Genres),
+    ('title', Title),
+)
+TYPE_ORDER = {name: order for order, (name, model) in enumerate(TYPES)}
+TYPE_NAMES = {model: name for name, model in TYPES}
+
+
+def get_keys(name):
+    '''Ключи индекса: всё название и каждый его хвост с начала слова'''
+    words = casefold(name).split()
+    return {' '.join(words[start:]) for start in range(len(words))}
+
+
+class PrefixIndex:
+    '''Отсортированный массив ключей названий для поиска по префиксу
+
+    Изменения своего процесса вносятся точечно из сигналов, а если
+    версия ресурса autocomplete сдвинулась из-за другого процесса,
+    индекс перестраивается целиком при следующем запросе.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+        self.keys = {}
+        self.version = None
+
+    def rebuild(self):
+        version = get_version(RESOURCE)
+        entries, keys = [], {}
+        for type_name, model in TYPES:
+            order = TYPE_ORDER[type_name]
+            for pk, name in model.objects.values_list('pk', 'name'):
+                object_keys = get_keys(name)
+                keys[(type_name, pk)] = object_keys
+                entries.extend(
+                    (key, order, pk, name) for key in object_keys
+                )
+        entries.sort()
+        with self.lock:
+            self.entries, self.keys = entries, keys
+            self.version = version
+
+    def lookup(self, prefix, limit=10, types=None):
+        '''Первые limit объектов, одно из слов названия которых — prefix'''
+        if self.version != get_version(RESOURCE):
+            self.rebuild()
+        prefix = ' '.join(casefold(prefix).split())
+        if not prefix:
+            return []
+        entries = self.entries
+        results, seen = [], set()
+        position = bisect.bisect_left(entries, (prefix,))
+        while position < len(entries) and len(results) < limit:
+            key, order, pk, name = entries[position]
+            position += 1
+            if not key.startswith(prefix):
+                break
+            type_name = TYPES[order][0]
+            if (order, pk) in seen or (types and type_name not in types):
+                continue
+            seen.add((order, pk))
+            results.append({'id': pk, 'name': name, 'type': type_name})
+        return results
+
+    def update(self, instance, deleted=False):
+        '''Точечно обновляет объект, если индекс отстаёт только на него'''
+        version = get_version(RESOURCE)
+        with self.lock:
+            if self.version is None:
+                return
+            if version != self.version + 1:
+                # Пропущены изменения других процессов
+                self.version = None
+                return
+            self.version = version
+            self.replace(instance, deleted)
+
+    def replace(self, instance, deleted):
+        type_name = TYPE_NAMES[type(instance)]
+        order = TYPE_ORDER[type_name]
+        entries = list(self.entries)
+        old_keys = self.keys.pop((type_name, instance.pk), set())
+        for key in old_keys:
+            position = bisect.bisect_left(entries, (key, order, instance.pk))
+            del entries[position]
+        if not deleted:
+            new_keys = get_keys(instance.name)
+            self.keys[(type_name, instance.pk)] = new_keys
+            for key in new_keys:
+                bisect.insort(
+                    entries, (key, order, instance.pk, instance.name)
+                )
+        self.entries = entries
+
+
+prefix_index = PrefixIndex()
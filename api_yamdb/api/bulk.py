@@ -0,0 +1,334 @@
+import codecs
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.response import Response
+
+from reviews.genre_masks import assign_genre_masks
+from reviews.models import Categories, Genres, Title
+
+from .cache import bump_versions
+from .serializers import (CategorySerializer, GenreSerializer,
+                          TitleWriteSerializer)
+
+TitleGenre = Title.genre.through
+
+
+class InvalidLine:
+    '''Строка NDJSON, которую не удалось разобрать'''
+
+    def __init__(self, error):
+        self.error = error
+
+
+class NDJSONParser(BaseParser):
+    '''Поток JSON-объектов, по одному на строку'''
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        if stream is None:
+            return items
+        for line in codecs.getreader(encoding)(stream):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as error:
+                items.append(InvalidLine(f'Некорректный JSON: {error}'))
+        return items
+
+
+class BulkCategorySerializer(CategorySerializer):
+    '''Проверка полей без запросов: уникальность проверяется пачкой'''
+    slug = serializers.SlugField(max_length=50)
+
+
+class BulkGenreSerializer(GenreSerializer):
+    slug = serializers.SlugField(max_length=50)
+
+
+class BulkTitleSerializer(TitleWriteSerializer):
+    '''Слаги категории и жанров разрешаются пачкой в TitleBulkWriter'''
+    category = serializers.CharField()
+    genre = serializers.ListField(child=serializers.CharField())
+
+    class Meta(TitleWriteSerializer.Meta):
+        validators = []
+
+
+class BulkWriter:
+    '''Пакетная запись объектов с результатом по каждому элементу
+
+    Каждая пачка проверяется целиком: уникальность и связанные объекты
+    запрашиваются одним запросом на пачку, а запись идёт в отдельной
+    транзакции. Ошибка элемента не мешает записи остальных.
+    '''
+    model = None
+    serializer_class = None
+    key_fields = ('slug',)
+    update_fields = ('name',)
+    resources = ()
+
+    def __init__(self, upsert=False):
+        self.upsert = upsert
+
+    def write(self, items, batch_size):
+        results = []
+        for start in range(0, len(items), batch_size):
+            batch = list(enumerate(items[start:start + batch_size], start))
+            results.extend(self.write_batch(batch))
+        if any(result['status'] != 'error' for result in results):
+            transaction.on_commit(lambda: bump_versions(*self.resources))
+        return results
+
+    def write_batch(self, batch):
+        errors, valid = {}, []
+        for index, item in batch:
+            item_errors, data = self.validate_item(item)
+            if item_errors:
+                errors[index] = item_errors
+            else:
+                valid.append((index, data))
+        valid = self.validate_batch(valid, errors)
+
+        saved = {}
+        if valid:
+            try:
+                with transaction.atomic():
+                    saved = self.save(valid)
+            except DatabaseError as error:
+                for index, data in valid:
+                    errors[index] = {
+                        'non_field_errors': [f'Ошибка записи пачки: {error}']
+                    }
+
+        results = []
+        for index, item in batch:
+            if index in errors:
+                results.append({
+                    'index': index, 'status': 'error', 'errors': errors[index]
+                })
+            else:
+                pk, created = saved[index]
+                results.append({
+                    'index': index,
+                    'status': 'created' if created else 'updated',
+                    'id': pk,
+                })
+        return results
+
+    def validate_item(self, item):
+        if isinstance(item, InvalidLine):
+            return {'non_field_errors': [item.error]}, None
+        if not isinstance(item, dict):
+            return {'non_field_errors': ['Ожидается объект']}, None
+        serializer = self.serializer_class(data=item)
+        if not serializer.is_valid():
+            return serializer.errors, None
+        return None, serializer.validated_data
+
+    def get_key(self, data):
+        return tuple(data[field] for field in self.key_fields)
+
+    def get_object_key(self, obj):
+        return tuple(getattr(obj, field) for field in self.key_fields)
+
+    def get_existing(self, keys):
+        '''Существующие объекты пачки по естественному ключу
+
+        Фильтр по первому полю ключа отбирает кандидатов одним
+        запросом, точное совпадение проверяется в Python.
+        '''
+        first_field = self.key_fields[0]
+        candidates = self.model.objects.filter(**{
+            f'{first_field}__in': {key[0] for key in keys}
+        })
+        existing = {}
+        for obj in candidates:
+            key = self.get_object_key(obj)
+            if key in keys:
+                existing[key] = obj
+        return existing
+
+    def validate_batch(self, valid, errors):
+        '''Дубликаты внутри пачки и существующие записи в режиме создания'''
+        keys, unique = set(), []
+        for index, data in valid:
+            key = self.get_key(data)
+            if key in keys:
+                errors[index] = {
+                    'non_field_errors': ['Повторяется в этой пачке']
+                }
+                continue
+            keys.add(key)
+            unique.append((index, data))
+        self.existing = self.get_existing(keys) if keys else {}
+        if self.upsert:
+            return unique
+        valid = []
+        for index, data in unique:
+            if self.get_key(data) in self.existing:
+                errors[index] = {'non_field_errors': ['Уже существует']}
+            else:
+                valid.append((index, data))
+        return valid
+
+    def save(self, valid):
+        '''Создаёт новые и обновляет существующие объекты пачки'''
+        now = timezone.now()
+        new, changed, saved = [], [], {}
+        for index, data in valid:
+            obj = self.existing.get(self.get_key(data))
+            if obj is None:
+                new.append((index, self.build(data)))
+                continue
+            for field in self.update_fields:
+                setattr(obj, field, data[field])
+            changed.append((index, obj))
+            saved[index] = (obj.pk, False)
+        self.model.objects.bulk_create(obj for index, obj in new)
+        # SQLite не возвращает id из bulk_create, перечитываем по ключу
+        created = self.get_existing({
+            self.get_object_key(obj) for index, obj in new
+        })
+        for index, obj in new:
+            obj.pk = created[self.get_object_key(obj)].pk
+            saved[index] = (obj.pk, True)
+        if changed:
+            update_fields = list(self.update_fields)
+            if hasattr(self.model, 'updated'):
+                for index, obj in changed:
+                    obj.updated = now
+                update_fields.append('updated')
+            self.model.objects.bulk_update(
+                [obj for index, obj in changed], update_fields
+            )
+        self.after_save(new + changed, valid, now)
+        return saved
+
+    def build(self, data):
+        return self.model(**{
+            field: data[field]
+            for field in self.key_fields + self.update_fields
+        })
+
+    def after_save(self, objects, valid, now):
+        pass
+
+
+class CategoryBulkWriter(BulkWriter):
+    model = Categories
+    serializer_class = BulkCategorySerializer
+    resources = ('categories', 'titles', 'autocomplete')
+
+    def after_save(self, objects, valid, now):
+        '''Отмечает изменёнными произведения обновлённых категорий'''
+        Title.objects.filter(category__in=[
+            obj.pk for index, obj in objects
+        ]).update(updated=now)
+
+
+class GenreBulkWriter(BulkWriter):
+    model = Genres
+    serializer_class = BulkGenreSerializer
+    resources = ('genres', 'titles', 'autocomplete')
+
+    def after_save(self, objects, valid, now):
+        assign_genre_masks()
+        Title.objects.filter(genre__in=[
+            obj.pk for index, obj in objects
+        ]).update(updated=now)
+
+
+class TitleBulkWriter(BulkWriter):
+    model = Title
+    serializer_class = BulkTitleSerializer
+    key_fields = ('name', 'year')
+    update_fields = ('description', 'category_id', 'genre_mask')
+    resources = ('titles', 'autocomplete')
+
+    def validate_batch(self, valid, errors):
+        '''Разрешает слаги всей пачки двумя запросами'''
+        categories = dict(Categories.objects.filter(
+            slug__in={data['category'] for index, data in valid}
+        ).values_list('slug', 'pk'))
+        genres = {
+            slug: (pk, mask) for slug, pk, mask in Genres.objects.filter(
+                slug__in={
+                    slug for index, data in valid for slug in data['genre']
+                }
+            ).values_list('slug', 'pk', 'mask')
+        }
+        resolved = []
+        for index, data in valid:
+            item_errors = {}
+            if data['category'] not in categories:
+                item_errors['category'] = [
+                    f'Object with slug={data["category"]} does not exist.'
+                ]
+            missing = [slug for slug in data['genre'] if slug not in genres]
+            if missing:
+                item_errors['genre'] = [
+                    f'Object with slug={slug} does not exist.'
+                    for slug in missing
+                ]
+            if item_errors:
+                errors[index] = item_errors
+                continue
+            data['category_id'] = categories[data.pop('category')]
+            slugs = set(data['genre'])
+            data['genre'] = {genres[slug][0] for slug in slugs}
+            # Маска пишется вместе с произведением, без пересчёта по связи
+            data['genre_mask'] = sum(genres[slug][1] or 0 for slug in slugs)
+            resolved.append((index, data))
+        return super().validate_batch(resolved, errors)
+
+    def after_save(self, objects, valid, now):
+        '''Заменяет жанры произведений пачки двумя запросами'''
+        genres = dict(valid)
+        title_ids = [obj.pk for index, obj in objects]
+        TitleGenre.objects.filter(title_id__in=title_ids).delete()
+        TitleGenre.objects.bulk_create(
+            TitleGenre(title_id=obj.pk, genres_id=genre_id)
+            for index, obj in objects
+            for genre_id in sorted(genres[index]['genre'])
+        )
+
+
+class BulkWriteMixin:
+    '''POST .../bulk/ создаёт, PUT .../bulk/ создаёт или обновляет'''
+    bulk_writer_class = None
+
+    @action(
+        methods=('POST', 'PUT'),
+        detail=False,
+        url_path='bulk', url_name='bulk',
+        parser_classes=(JSONParser, NDJSONParser),
+    )
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'non_field_errors': ['Ожидается массив объектов']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        writer = self.bulk_writer_class(upsert=request.method == 'PUT')
+        results = writer.write(items, settings.API_BULK_BATCH_SIZE)
+        counts = {'created': 0, 'updated': 0, 'error': 0}
+        for result in results:
+            counts[result['status']] += 1
+        return Response({
+            'created': counts['created'],
+            'updated': counts['updated'],
+            'errors': counts['error'],
+            'results': results,
+        }, status=status.HTTP_200_OK)
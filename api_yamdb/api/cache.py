@@ -0,0 +1,87 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+VERSION_KEY = 'yamdb:version:{resource}'
+RESPONSE_KEY = 'yamdb:response:{resource}:{version}:{digest}'
+
+
+def get_version(resource):
+    '''Возвращает текущую версию ресурса'''
+    key = VERSION_KEY.format(resource=resource)
+    version = cache.get(key)
+    if version is not None:
+        return version
+    # Версия после вытеснения не должна совпасть со старой,
+    # поэтому отсчёт начинается с текущего времени.
+    cache.add(key, int(time.time() * 1000), timeout=None)
+    return cache.get(key)
+
+
+def bump_versions(*resources):
+    '''Сбрасывает кэш ресурсов увеличением их версий'''
+    for resource in resources:
+        key = VERSION_KEY.format(resource=resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def nested_resource(name, parent_id):
+    '''Ресурс вложенного списка одного родителя, например отзывов'''
+    return f'{name}:{parent_id}'
+
+
+def response_cache_key(resource, request):
+    digest = hashlib.md5(
+        request.get_full_path().encode('utf-8')
+    ).hexdigest()
+    return RESPONSE_KEY.format(
+        resource=resource, version=get_version(resource), digest=digest
+    )
+
+
+class ResponseCacheMixin:
+    '''Кэширует успешные ответы до изменения ресурса cache_resource
+
+    Вместе с ответом сохраняются атрибуты cached_view_attributes,
+    вычисленные при его построении, например ETag.
+    '''
+    cache_resource = None
+    cached_view_attributes = ()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = response_cache_key(self.cache_resource, request)
+        attributes_key = f'{key}:attributes'
+        cached = cache.get_many([key, attributes_key])
+        if key in cached:
+            for name, value in cached.get(attributes_key, {}).items():
+                if getattr(self, name) is None:
+                    setattr(self, name, value)
+            return Response(cached[key])
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set_many({key: response.data, attributes_key: {
+                name: getattr(self, name)
+                for name in self.cached_view_attributes
+            }}, settings.API_CACHE_TIMEOUT)
+        return response
+
+
+class CachedListMixin(ResponseCacheMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(ResponseCacheMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
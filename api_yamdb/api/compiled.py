@@ -0,0 +1,176 @@
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import SlugRelatedField
+from rest_framework.response import Response
+
+from .pagination import CountedPageNumberPagination
+
+
+def identity(value):
+    return value
+
+
+class CompiledSerializer:
+    '''Сериализатор DRF для чтения, разобранный один раз на класс
+
+    Каждое поле сводится к пути для values() и методу to_representation
+    поля DRF. Ответ строится из словарей values() без создания объектов
+    модели и без обхода полей сериализатора на каждой строке, а результат
+    совпадает с ответом исходного сериализатора.
+    '''
+
+    def __init__(self, serializer_class, prefix=''):
+        self.model = serializer_class.Meta.model
+        self.prefix = prefix
+        # Имя поля, пути для values() и функция строки values() -> значение
+        self.columns = []
+        # Имя поля, связь многие-ко-многим и вложенный сериализатор
+        self.many = []
+        for name, field in serializer_class().fields.items():
+            if not field.write_only:
+                self.compile_field(name, field)
+
+    def path(self, source):
+        return self.prefix + source.replace('.', '__')
+
+    def compile_field(self, name, field):
+        if field.source == '*' or isinstance(
+            field, serializers.SerializerMethodField
+        ):
+            raise ImproperlyConfigured(
+                f'Поле {name} нельзя прочитать через values()'
+            )
+        path = self.path(field.source)
+        if isinstance(field, serializers.ListSerializer):
+            if self.prefix:
+                raise ImproperlyConfigured(
+                    f'Вложенный список {name} поддерживается только '
+                    'на верхнем уровне'
+                )
+            relation = self.model._meta.get_field(field.source)
+            self.many.append((
+                name, relation.related_query_name(),
+                CompiledSerializer(field.child.__class__)
+            ))
+            self.columns.append((name, [self.model._meta.pk.attname], None))
+        elif isinstance(field, serializers.BaseSerializer):
+            nested = CompiledSerializer(field.__class__, prefix=f'{path}__')
+            self.columns.append((
+                name, [path, *nested.paths()], nested_getter(path, nested)
+            ))
+        elif isinstance(field, SlugRelatedField):
+            slug_path = f'{path}__{field.slug_field}'
+            self.columns.append(
+                (name, [slug_path], value_getter(slug_path, identity))
+            )
+        else:
+            self.columns.append(
+                (name, [path], value_getter(path, field.to_representation))
+            )
+
+    def select(self, names=None):
+        if names is None:
+            return self.columns
+        names = set(names)
+        return [column for column in self.columns if column[0] in names]
+
+    def paths(self, names=None):
+        '''Пути values() для полей names, по умолчанию для всех полей'''
+        paths = {}
+        for name, column_paths, getter in self.select(names):
+            paths.update(dict.fromkeys(column_paths))
+        return list(paths)
+
+    def represent(self, row, columns, related=None):
+        data = {}
+        for name, column_paths, getter in columns:
+            if getter is None:
+                data[name] = related[name].get(row[column_paths[0]], [])
+            else:
+                data[name] = getter(row)
+        return data
+
+    def to_representation(self, rows, names=None):
+        '''Список словарей ответа из строк values() с путями paths(names)'''
+        rows = list(rows)
+        columns = self.select(names)
+        related = {}
+        pk = self.model._meta.pk.attname
+        for name, query_name, child in self.many:
+            if names is not None and name not in names:
+                continue
+            related[name] = {}
+            if not rows:
+                continue
+            child_columns = child.select()
+            for child_row in child.model.objects.filter(**{
+                f'{query_name}__in': [row[pk] for row in rows]
+            }).values(query_name, *child.paths()):
+                related[name].setdefault(child_row[query_name], []).append(
+                    child.represent(child_row, child_columns)
+                )
+        return [self.represent(row, columns, related) for row in rows]
+
+
+def value_getter(path, to_representation):
+    def get(row):
+        value = row[path]
+        # Как Serializer.to_representation: None не преобразуется
+        if value is None:
+            return None
+        return to_representation(value)
+    return get
+
+
+def nested_getter(path, nested):
+    columns = nested.select()
+
+    def get(row):
+        if row[path] is None:
+            return None
+        return nested.represent(row, columns)
+    return get
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class):
+    return CompiledSerializer(serializer_class)
+
+
+class CompiledListMixin:
+    '''list() строит ответ из values() скомпилированным сериализатором
+
+    Поля ответа берутся из get_sparse_fields(), колонки для курсора
+    пагинации — из sparse_required_columns SparseFieldsetViewMixin.
+    '''
+    compiled_actions = ('list',)
+
+    def list(self, request, *args, **kwargs):
+        if self.action not in self.compiled_actions:
+            return super().list(request, *args, **kwargs)
+        compiled = compile_serializer(self.get_serializer_class())
+        names = self.get_sparse_fields()
+        objects = self.filter_queryset(self.get_queryset())
+        queryset = objects.prefetch_related(None).values(*dict.fromkeys([
+            *self.sparse_required_columns, *compiled.paths(names)
+        ]))
+        # Соединения для колонок ответа в values() не нужны
+        # для подсчёта строк и мешают индексам
+        page = self.paginate_queryset(queryset, count_queryset=objects)
+        if page is not None:
+            return self.get_paginated_response(
+                compiled.to_representation(page, names)
+            )
+        return Response(compiled.to_representation(queryset, names))
+
+    def paginate_queryset(self, queryset, count_queryset=None):
+        '''count_queryset получают пагинаторы, которые его принимают'''
+        if count_queryset is None or not isinstance(
+            self.paginator, CountedPageNumberPagination
+        ):
+            return super().paginate_queryset(queryset)
+        return self.paginator.paginate_queryset(
+            queryset, self.request, view=self, count_queryset=count_queryset
+        )
@@ -0,0 +1,160 @@
+import copy
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_version
+
+PRECONDITION_HEADERS = (
+    'HTTP_IF_MATCH', 'HTTP_IF_UNMODIFIED_SINCE',
+    'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE',
+)
+ETAG_HEADERS = ('HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH')
+# Суффикс ETag сжатого gzip представления ответа
+GZIP_ETAG_SUFFIX = ';gzip'
+
+
+class ConditionalResponseError(Exception):
+    '''Готовый ответ 304 или 412, который прерывает обработку запроса'''
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+def gzip_etag(etag):
+    '''ETag сжатого представления: байты другие, поэтому и тег другой'''
+    if not etag.endswith('"') or etag.endswith(f'{GZIP_ETAG_SUFFIX}"'):
+        return etag
+    return f'{etag[:-1]}{GZIP_ETAG_SUFFIX}"'
+
+
+def without_gzip_etags(request):
+    '''Копия запроса с ETag в If-Match и If-None-Match без суффикса gzip'''
+    request = copy.copy(request)
+    request.META = {
+        key: value.replace(f'{GZIP_ETAG_SUFFIX}"', '"')
+        if key in ETAG_HEADERS else value
+        for key, value in request.META.items()
+    }
+    return request
+
+
+def list_metadata(queryset):
+    '''ETag и Last-Modified списка по числу строк и последнему изменению'''
+    meta = queryset.prefetch_related(None).order_by().aggregate(
+        count=Count('pk'), updated=Max('updated')
+    )
+    if meta['updated'] is None:
+        return '0', None
+    return f'{meta["count"]}-{meta["updated"].timestamp()}', meta['updated']
+
+
+def object_metadata(queryset):
+    '''ETag и Last-Modified объекта по дате его изменения'''
+    row = queryset.prefetch_related(None).order_by().values_list(
+        'pk', 'updated'
+    ).first()
+    if row is None:
+        return None, None
+    pk, updated = row
+    return f'{pk}-{updated.timestamp()}', updated
+
+
+def instance_metadata(instance):
+    '''ETag и Last-Modified уже загруженного объекта'''
+    return f'{instance.pk}-{instance.updated.timestamp()}', instance.updated
+
+
+class ConditionalMixin:
+    '''Условные запросы по ETag и Last-Modified без выполнения вьюсета
+
+    Для GET и HEAD возвращает 304, если данные не изменились.
+    Для PUT, PATCH и DELETE проверяет If-Match и If-Unmodified-Since
+    и возвращает 412, если объект уже изменён. ETag сжатого ответа
+    с суффиксом GZIP_ETAG_SUFFIX совпадает с ETag тех же данных.
+
+    Запрос к БД за метаданными выполняется только при условных
+    заголовках. Иначе ETag берётся из версии ресурса в кэше
+    (versioned_actions) или из объекта, загруженного get_object().
+    '''
+    conditional_actions = (
+        'list', 'retrieve', 'update', 'partial_update', 'destroy'
+    )
+    versioned_actions = ()
+    # Сохраняются ResponseCacheMixin вместе с ответом
+    cached_view_attributes = ('etag', 'last_modified')
+    etag = None
+    last_modified = None
+
+    def get_version_resource(self):
+        '''Ресурс, версия которого служит ETag versioned_actions'''
+        return self.cache_resource
+
+    def get_conditional_metadata(self):
+        '''Возвращает (etag, last_modified) для текущего действия'''
+        if self.action in self.versioned_actions:
+            resource = self.get_version_resource()
+            return f'{resource}-{get_version(resource)}', None
+        if self.action == 'list':
+            return list_metadata(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return object_metadata(self.get_queryset().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        ))
+
+    def set_conditional_metadata(self, etag, last_modified):
+        if etag is not None:
+            self.etag = quote_etag(etag)
+        if last_modified is not None:
+            self.last_modified = int(last_modified.timestamp())
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action not in self.conditional_actions:
+            return
+
+        if not any(
+            header in request.META for header in PRECONDITION_HEADERS
+        ):
+            if self.action in self.versioned_actions:
+                self.set_conditional_metadata(
+                    *self.get_conditional_metadata()
+                )
+            return
+
+        self.set_conditional_metadata(*self.get_conditional_metadata())
+        response = get_conditional_response(
+            without_gzip_etags(request._request),
+            etag=self.etag,
+            last_modified=self.last_modified
+        )
+        if response is not None:
+            raise ConditionalResponseError(response)
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method in ('GET', 'HEAD') and (
+            self.action in self.conditional_actions and self.etag is None
+        ):
+            self.set_conditional_metadata(*instance_metadata(instance))
+        return instance
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponseError):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if request.method in ('GET', 'HEAD') and response.status_code in (
+            200, 304
+        ):
+            if self.etag is not None:
+                response['ETag'] = self.etag
+            if self.last_modified is not None:
+                response['Last-Modified'] = http_date(self.last_modified)
+        return response
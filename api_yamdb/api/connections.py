@@ -0,0 +1,169 @@
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+class ConnectionStats:
+    '''Постоянные соединения с БД процесса и время их получения
+
+    Django держит одно соединение на поток. В начале запроса соединение
+    потока выдаётся как из пула: простаивавшее проверяется, закрытое
+    открывается заново. Время этой выдачи считается временем ожидания
+    соединения.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wrappers = weakref.WeakSet()
+        # Соединения сверх DB_PERSISTENT_CONNECTIONS, которые
+        # закрываются после запроса
+        self.overflowed = weakref.WeakSet()
+        # Время возврата соединения в конце последнего запроса
+        self.released = weakref.WeakKeyDictionary()
+        # Потоки, которые сейчас обрабатывают запрос
+        self.busy = set()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.unusable = 0
+            self.errors = 0
+            self.overflow = 0
+            self.wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.max_open = 0
+            self.started = time.time()
+
+    def open_wrappers(self):
+        return [
+            wrapper for wrapper in self.wrappers
+            if wrapper.connection is not None
+        ]
+
+    def open_count(self):
+        with self.lock:
+            return len(self.open_wrappers())
+
+    def checkout(self, wrapper, wait_ms, connected, unusable, overflow,
+                 error):
+        with self.lock:
+            self.wrappers.add(wrapper)
+            self.busy.add(threading.get_ident())
+            self.checkouts += 1
+            self.connects += connected
+            self.unusable += unusable
+            self.overflow += overflow
+            self.errors += error
+            self.wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.max_open = max(self.max_open, len(self.open_wrappers()))
+
+    def release(self, wrappers=()):
+        now = time.monotonic()
+        with self.lock:
+            self.busy.discard(threading.get_ident())
+            for wrapper in wrappers:
+                self.released[wrapper] = now
+
+    def idle_seconds(self, wrapper):
+        '''Сколько соединение простаивало, None если не возвращалось'''
+        with self.lock:
+            released = self.released.get(wrapper)
+        if released is None:
+            return None
+        return time.monotonic() - released
+
+    def snapshot(self):
+        with self.lock:
+            opened = self.open_wrappers()
+            checkouts = self.checkouts or 1
+            return {
+                'since': time.strftime(
+                    '%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.started)
+                ),
+                'persistent_limit': settings.DB_PERSISTENT_CONNECTIONS,
+                'open': len(opened),
+                'idle': len([
+                    wrapper for wrapper in opened
+                    if wrapper._thread_ident not in self.busy
+                ]),
+                'max_open': self.max_open,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'unusable': self.unusable,
+                'errors': self.errors,
+                'overflow': self.overflow,
+                'wait_ms': round(self.wait_ms / checkouts, 3),
+                'max_wait_ms': round(self.max_wait_ms, 3),
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+def needs_health_check(wrapper):
+    '''Недавно работавшее соединение не проверяется запросом к БД'''
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return False
+    idle = connection_stats.idle_seconds(wrapper)
+    return idle is None or idle >= settings.DB_CONN_HEALTH_CHECK_IDLE
+
+
+def checkout_connection(wrapper):
+    '''Проверяет соединение потока и открывает его, если оно закрыто'''
+    started = time.perf_counter()
+    unusable = overflow = connected = error = False
+    if wrapper in connection_stats.overflowed:
+        connection_stats.overflowed.discard(wrapper)
+        wrapper.close()
+    if wrapper.connection is not None and needs_health_check(wrapper) and (
+        not wrapper.is_usable()
+    ):
+        wrapper.close()
+        unusable = True
+    if wrapper.connection is None:
+        if connection_stats.open_count() >= (
+            settings.DB_PERSISTENT_CONNECTIONS
+        ):
+            # Сверх предела соединение открывается по запросу view
+            # и закрывается в конце запроса
+            connection_stats.overflowed.add(wrapper)
+            overflow = True
+        else:
+            try:
+                wrapper.ensure_connection()
+                connected = True
+            except DatabaseError:
+                # Ошибка повторится при первом запросе view и вернёт 500
+                error = True
+    connection_stats.checkout(
+        wrapper, (time.perf_counter() - started) * 1000,
+        connected=connected, unusable=unusable, overflow=overflow,
+        error=error
+    )
+
+
+def checkout_connections(**kwargs):
+    '''Выдаёт потоку постоянные соединения в начале запроса'''
+    for alias in connections:
+        wrapper = connections[alias]
+        if wrapper.settings_dict['CONN_MAX_AGE'] != 0:
+            checkout_connection(wrapper)
+
+
+def release_connections(**kwargs):
+    '''Закрывает соединения сверх предела в конце запроса'''
+    released = []
+    for alias in connections:
+        wrapper = connections[alias]
+        if wrapper in connection_stats.overflowed:
+            connection_stats.overflowed.discard(wrapper)
+            wrapper.close()
+        elif wrapper.connection is not None:
+            released.append(wrapper)
+    connection_stats.release(released)
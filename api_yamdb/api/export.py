@@ -0,0 +1,198 @@
+import csv
+import datetime as dt
+import io
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from reviews.models import Comments, Review, Title
+
+TitleGenre = Title.genre.through
+
+
+def parse_updated_since(value):
+    '''Дата или дата со временем в ISO 8601, без зоны считается UTC'''
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is not None:
+                moment = dt.datetime.combine(day, dt.time())
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({
+            'updated_since': 'Ожидается дата или дата и время в ISO 8601'
+        })
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt.timezone.utc)
+    return moment
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Exporter:
+    '''Выгрузка таблицы потоком строк
+
+    Строки читаются курсором на стороне сервера пачками по chunk_size,
+    поэтому память не зависит от размера таблицы.
+    '''
+    model = None
+    # Имя колонки выгрузки и путь поля для values_list()
+    fields = ()
+
+    def __init__(self, updated_since=None, chunk_size=2000):
+        self.updated_since = updated_since
+        self.chunk_size = chunk_size
+
+    @property
+    def columns(self):
+        return [name for name, path in self.fields]
+
+    def get_queryset(self):
+        queryset = self.model.objects.order_by('pk')
+        if self.updated_since is not None:
+            queryset = queryset.filter(updated__gte=self.updated_since)
+        return queryset.values_list(*(path for name, path in self.fields))
+
+    def rows(self):
+        columns = self.columns
+        rows = self.get_queryset().iterator(chunk_size=self.chunk_size)
+        for batch in batches(rows, self.chunk_size):
+            yield [dict(zip(columns, row)) for row in self.complete(batch)]
+
+    def complete(self, batch):
+        '''Дополняет пачку строк данными из связанных таблиц'''
+        return batch
+
+
+class TitleExporter(Exporter):
+    model = Title
+    fields = (
+        ('id', 'id'),
+        ('name', 'name'),
+        ('year', 'year'),
+        ('description', 'description'),
+        ('category', 'category__slug'),
+        ('rating', 'rating'),
+        ('review_count', 'review_count'),
+        ('updated', 'updated'),
+    )
+
+    @property
+    def columns(self):
+        return super().columns + ['genres']
+
+    def complete(self, batch):
+        '''Жанры пачки одним запросом: префетч с iterator() не работает'''
+        genres = {}
+        for title_id, slug in TitleGenre.objects.filter(
+            title_id__in=[row[0] for row in batch]
+        ).order_by('title_id', 'genres__slug').values_list(
+            'title_id', 'genres__slug'
+        ):
+            genres.setdefault(title_id, []).append(slug)
+        return [row + (genres.get(row[0], []),) for row in batch]
+
+
+class ReviewExporter(Exporter):
+    model = Review
+    fields = (
+        ('id', 'id'),
+        ('title_id', 'title_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('score', 'score'),
+        ('pub_date', 'pub_date'),
+        ('updated', 'updated'),
+    )
+
+
+class CommentExporter(Exporter):
+    model = Comments
+    fields = (
+        ('id', 'id'),
+        ('title_id', 'review__title_id'),
+        ('review_id', 'review_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('updated', 'updated'),
+    )
+
+
+EXPORTERS = {
+    'titles': TitleExporter,
+    'reviews': ReviewExporter,
+    'comments': CommentExporter,
+}
+
+
+def ndjson_chunks(exporter):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for rows in exporter.rows():
+        yield ''.join(f'{encoder.encode(row)}\n' for row in rows)
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ','.join(value)
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(exporter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(exporter.columns)
+    for rows in exporter.rows():
+        for row in rows:
+            writer.writerow([csv_value(value) for value in row.values()])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Заголовок пустой выгрузки
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson; charset=utf-8', ndjson_chunks),
+    'csv': ('text/csv; charset=utf-8', csv_chunks),
+}
+
+
+def export_response(resource, output, updated_since, chunk_size):
+    '''Потоковый ответ с выгрузкой ресурса в формате output
+
+    Заголовок X-Updated-Until хранит время начала выгрузки: его можно
+    передать в updated_since следующей выгрузки. Строки, изменённые во
+    время выгрузки, могут прийти дважды, их надо сводить по id.
+    '''
+    started = timezone.now()
+    exporter = EXPORTERS[resource](updated_since, chunk_size)
+    content_type, chunks = EXPORT_FORMATS[output]
+    response = StreamingHttpResponse(
+        chunks(exporter), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{resource}.{output}"'
+    )
+    response['X-Updated-Until'] = started.isoformat()
+    return response
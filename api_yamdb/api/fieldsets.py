@@ -0,0 +1,85 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_names(value):
+    names = (part.strip() for part in value.split(','))
+    return [name for name in names if name]
+
+
+def get_sparse_fields(request, available):
+    '''Поля ответа по ?fields= и ?omit=, None если нужны все поля
+
+    Работает только для чтения: запросы на запись получают все поля.
+    '''
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = parse_names(request.query_params.get(FIELDS_PARAM, ''))
+    omit = parse_names(request.query_params.get(OMIT_PARAM, ''))
+    if not (fields or omit):
+        return None
+    errors = {}
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = (
+                f'Неизвестные поля: {", ".join(unknown)}. '
+                f'Доступны: {", ".join(available)}'
+            )
+    if errors:
+        raise ValidationError(errors)
+    selected = set(fields or available) - set(omit)
+    return [name for name in available if name in selected]
+
+
+class SparseFieldsetMixin:
+    '''Сериализатор отдаёт только поля из ?fields= без полей из ?omit='''
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = get_sparse_fields(self.context.get('request'), list(fields))
+        if selected is None:
+            return fields
+        return OrderedDict((name, fields[name]) for name in selected)
+
+
+class SparseFieldsetViewMixin:
+    '''Не загружает связи и колонки для полей, которых нет в ответе'''
+    # Поле сериализатора и связь, которая нужна только ему
+    sparse_select_related = {}
+    sparse_prefetch_related = {}
+    # Колонки, которые читаются всегда, например для курсора пагинации
+    sparse_required_columns = ('id',)
+
+    def get_sparse_fields(self):
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsetMixin):
+            return None
+        return get_sparse_fields(self.request, list(serializer_class().fields))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        for field, lookup in self.sparse_select_related.items():
+            if fields is None or field in fields:
+                queryset = queryset.select_related(lookup)
+        for field, lookup in self.sparse_prefetch_related.items():
+            if fields is None or field in fields:
+                queryset = queryset.prefetch_related(lookup)
+        if fields is None:
+            return queryset
+        return queryset.only(*self.get_sparse_columns(queryset.model, fields))
+
+    def get_sparse_columns(self, model, fields):
+        '''Колонки модели, которые читают выбранные поля сериализатора'''
+        serializer_fields = self.get_serializer_class()().fields
+        columns = {field.name for field in model._meta.concrete_fields}
+        return list(self.sparse_required_columns) + [
+            serializer_fields[name].source for name in fields
+            if serializer_fields[name].source in columns
+        ]
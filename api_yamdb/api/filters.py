@@ -1,13 +1,62 @@
+import operator
+from functools import reduce
+
+from django.db.models import Q
 from django_filters import CharFilter, rest_framework
 
-from reviews.models import Title
+from reviews.models import Genres, Title
+
+from .search import search_titles
+
+TitleGenre = Title.genre.through
+
+
+def filter_by_genres(queryset, slugs, match_all=False):
+    '''Произведения с любым или со всеми жанрами без соединения со связью
+
+    Биты жанров читаются одним запросом по уникальному слагу и
+    проверяются в маске произведения одним условием, которое на
+    PostgreSQL проходит по GIN-индексу. Жанры, которым не хватило
+    бита, ищутся подзапросом по связи.
+    '''
+    slugs = {slug.strip() for slug in slugs} - {''}
+    masks = dict(
+        Genres.objects.filter(slug__in=slugs).order_by().values_list(
+            'slug', 'mask'
+        )
+    )
+    if not masks or match_all and len(masks) < len(slugs):
+        return queryset.none()
+    conditions = []
+    mask = sum(mask for mask in masks.values() if mask is not None)
+    if mask:
+        lookup = 'has_bits' if match_all else 'has_any_bits'
+        conditions.append(Q(**{f'genre_mask__{lookup}': mask}))
+    for slug in sorted(slug for slug, mask in masks.items() if mask is None):
+        conditions.append(Q(pk__in=TitleGenre.objects.filter(
+            genres__slug=slug
+        ).values('title_id')))
+    return queryset.filter(
+        reduce(operator.and_ if match_all else operator.or_, conditions)
+    )
 
 
 class TitleFilter(rest_framework.FilterSet):
     category = CharFilter(field_name='category__slug')
-    genre = CharFilter(field_name='genre__slug')
+    genre = CharFilter(method='filter_genre')
+    genre_all = CharFilter(method='filter_genre')
     name = CharFilter(field_name='name', lookup_expr='icontains')
+    search = CharFilter(method='filter_search')
 
     class Meta:
         model = Title
         fields = ('name', 'year', 'category__slug', 'genre__slug')
+
+    def filter_genre(self, queryset, name, value):
+        '''genre: любой из жанров через запятую, genre_all: все жанры'''
+        return filter_by_genres(
+            queryset, value.split(','), match_all=name == 'genre_all'
+        )
+
+    def filter_search(self, queryset, name, value):
+        return search_titles(queryset, value)
@@ -0,0 +1,315 @@
+import json
+import platform
+import random
+import statistics
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Genres, Review, Title
+
+User = get_user_model()
+
+ENDPOINTS = (
+    'titles_list', 'titles_filter_genre', 'titles_filter_name',
+    'title_detail', 'reviews_page', 'reviews_cursor', 'comments_page',
+    'signup', 'token', 'review_create',
+)
+
+
+class QueryTimer:
+    '''Считает SQL-запросы и их время через execute_wrapper'''
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный бенчмарк API на сгенерированных данных. Для каждого '
+        'эндпоинта выводит p50/p95/p99 задержки, пропускную способность, '
+        'число и время SQL-запросов и сохраняет результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'endpoints',
+            nargs='*',
+            help=f'Эндпоинты для замера: {", ".join(ENDPOINTS)}. '
+                 'По умолчанию все'
+        )
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Число замеряемых запросов на эндпоинт'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Число прогревочных запросов на эндпоинт'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Не пересоздавать тестовую БД между запусками'
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='JSON прошлого запуска для сравнения'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Порог регрессии p95 в процентах для --compare'
+        )
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'] or list(ENDPOINTS)
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}'
+            )
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            self.prepare_data()
+            results = {
+                endpoint: self.measure(endpoint) for endpoint in endpoints
+            }
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+
+        report = {
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cold': options['cold'],
+                'dataset': {
+                    key: options[key]
+                    for key in ('users', 'titles', 'reviews', 'comments',
+                                'seed')
+                },
+            },
+            'results': results,
+        }
+        self.print_report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f)['results'], results)
+
+    def prepare_data(self):
+        if not Title.objects.exists():
+            call_command(
+                'dbgenerate',
+                users=self.options['users'],
+                titles=self.options['titles'],
+                reviews=self.options['reviews'],
+                comments=self.options['comments'],
+                seed=self.options['seed'],
+                stdout=self.stdout,
+            )
+        self.title_ids = list(Title.objects.values_list('pk', flat=True))
+        self.popular_title = Title.objects.order_by('-review_count').first()
+        self.popular_review = Review.objects.annotate(
+            comments_count=Count('comments')
+        ).order_by('-comments_count').first()
+        self.genre_slugs = list(Genres.objects.values_list('slug', flat=True))
+        self.name_prefixes = list({
+            name.split()[0]
+            for name in Title.objects.values_list('name', flat=True)[:100]
+        })
+        self.token_user, _ = User.objects.get_or_create(
+            username='bench_token',
+            defaults={'email': 'bench_token@yamdb.fake',
+                      'confirmation_code': 'bench'}
+        )
+        self.counter = 0
+
+    def next_id(self):
+        self.counter += 1
+        return self.counter
+
+    def get_request(self, endpoint):
+        '''Возвращает (method, path, data, extra) очередного запроса'''
+        return getattr(self, f'request_{endpoint}')()
+
+    def request_titles_list(self):
+        page = self.rng.randint(1, max(len(self.title_ids) // 10, 1))
+        return 'get', f'/api/v1/titles/?page={page}', None, {}
+
+    def request_titles_filter_genre(self):
+        slug = self.rng.choice(self.genre_slugs)
+        return 'get', f'/api/v1/titles/?genre={slug}', None, {}
+
+    def request_titles_filter_name(self):
+        prefix = self.rng.choice(self.name_prefixes)
+        return 'get', f'/api/v1/titles/?name={prefix}', None, {}
+
+    def request_title_detail(self):
+        title_id = self.rng.choice(self.title_ids)
+        return 'get', f'/api/v1/titles/{title_id}/', None, {}
+
+    def request_reviews_page(self):
+        title = self.popular_title
+        page = self.rng.randint(1, max(title.review_count // 10, 1))
+        return 'get', (
+            f'/api/v1/titles/{title.pk}/reviews/?page={page}'
+        ), None, {}
+
+    def request_reviews_cursor(self):
+        return 'get', (
+            f'/api/v1/titles/{self.popular_title.pk}/reviews/'
+            '?pagination=cursor'
+        ), None, {}
+
+    def request_comments_page(self):
+        review = self.popular_review
+        return 'get', (
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+        ), None, {}
+
+    def request_signup(self):
+        number = self.next_id()
+        return 'post', '/api/v1/auth/signup/', {
+            'username': f'bench_signup{number}',
+            'email': f'bench_signup{number}@yamdb.fake',
+        }, {}
+
+    def request_token(self):
+        return 'post', '/api/v1/auth/token/', {
+            'username': self.token_user.username,
+            'confirmation_code': self.token_user.confirmation_code,
+        }, {}
+
+    def request_review_create(self):
+        number = self.next_id()
+        author = User.objects.create(
+            username=f'bench_author{number}',
+            email=f'bench_author{number}@yamdb.fake'
+        )
+        token = AccessToken.for_user(author)
+        return 'post', f'/api/v1/titles/{self.popular_title.pk}/reviews/', {
+            'text': 'Отзыв из бенчмарка', 'score': self.rng.randint(1, 10),
+        }, {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def measure(self, endpoint):
+        client = Client()
+        timer = QueryTimer()
+        latencies, queries, sql_times = [], [], []
+        total = self.options['warmup'] + self.options['requests']
+        self.stdout.write(self.style.MIGRATE_LABEL(f'Замер {endpoint}'))
+        # Подготовка запросов (создание авторов и токенов) не замеряется
+        requests = [self.get_request(endpoint) for _ in range(total)]
+        for number, (method, path, data, extra) in enumerate(requests):
+            if self.options['cold']:
+                cache.clear()
+            timer.count, timer.time = 0, 0.0
+            if data is not None:
+                extra = dict(
+                    extra, data=json.dumps(data),
+                    content_type='application/json'
+                )
+            with connection.execute_wrapper(timer):
+                request_started = time.perf_counter()
+                response = getattr(client, method)(path, **extra)
+                elapsed = time.perf_counter() - request_started
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{endpoint}: {method.upper()} {path} вернул '
+                    f'{response.status_code}'
+                )
+            if number >= self.options['warmup']:
+                latencies.append(elapsed * 1000)
+                queries.append(timer.count)
+                sql_times.append(timer.time * 1000)
+        duration = sum(latencies) / 1000
+        return {
+            'requests': len(latencies),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.mean(latencies), 3),
+            'throughput_rps': round(len(latencies) / duration, 1),
+            'queries': round(statistics.mean(queries), 2),
+            'sql_ms': round(statistics.mean(sql_times), 3),
+        }
+
+    def print_report(self, results):
+        header = (
+            f'{"endpoint":<22}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"rps":>9}{"queries":>9}{"sql_ms":>9}'
+        )
+        self.stdout.write(header)
+        for endpoint, result in results.items():
+            self.stdout.write(
+                f'{endpoint:<22}{result["p50_ms"]:>9.2f}'
+                f'{result["p95_ms"]:>9.2f}{result["p99_ms"]:>9.2f}'
+                f'{result["throughput_rps"]:>9.1f}'
+                f'{result["queries"]:>9.2f}{result["sql_ms"]:>9.2f}'
+            )
+
+    def print_comparison(self, baseline, results):
+        self.stdout.write(self.style.MIGRATE_LABEL('Сравнение с базовым'))
+        for endpoint, result in results.items():
+            if endpoint not in baseline:
+                continue
+            before = baseline[endpoint]
+            change = (
+                (result['p95_ms'] - before['p95_ms'])
+                / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            )
+            line = (
+                f'{endpoint:<22} p95 {before["p95_ms"]:.2f} -> '
+                f'{result["p95_ms"]:.2f} мс ({change:+.1f}%), '
+                f'запросов {before["queries"]} -> {result["queries"]}'
+            )
+            if change > self.options['threshold'] or (
+                result['queries'] > before['queries']
+            ):
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
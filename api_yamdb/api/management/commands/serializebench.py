@@ -0,0 +1,124 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.compiled import compile_serializer
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleReadSerializer)
+from reviews.models import Comments, Review, Title
+
+RESOURCES = {
+    'titles': (
+        TitleReadSerializer,
+        lambda: Title.objects.order_by('-year', 'id'),
+        lambda queryset: queryset.select_related(
+            'category'
+        ).prefetch_related('genre'),
+    ),
+    'reviews': (
+        ReviewSerializer,
+        lambda: Review.objects.order_by('id'),
+        lambda queryset: queryset.select_related('author'),
+    ),
+    'comments': (
+        CommentSerializer,
+        lambda: Comments.objects.order_by('id'),
+        lambda queryset: queryset.select_related('author'),
+    ),
+}
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает сериализаторы DRF и скомпилированные сериализаторы '
+        'списков на строках текущей БД. Для каждого ресурса выводит время '
+        'чтения и сериализации одной строки и ускорение.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'resources', nargs='*',
+            help=f'Ресурсы: {", ".join(RESOURCES)}. По умолчанию все'
+        )
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Число строк в одном прогоне'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Число прогонов, в отчёт идёт медиана'
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        resources = options['resources'] or list(RESOURCES)
+        unknown = set(resources) - set(RESOURCES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные ресурсы: {", ".join(sorted(unknown))}'
+            )
+        results = [
+            self.bench(resource, options['rows'], options['repeat'])
+            for resource in resources
+        ]
+        self.stdout.write(
+            f'{"resource":<10}{"rows":>7}{"drf us/row":>12}'
+            f'{"compiled us/row":>17}{"speedup":>9}'
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result["resource"]:<10}{result["rows"]:>7}'
+                f'{result["drf_us_per_row"]:>12.1f}'
+                f'{result["compiled_us_per_row"]:>17.1f}'
+                f'{result["speedup"]:>8.1f}x'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'results': results}, f, indent=2)
+
+    def bench(self, resource, rows, repeat):
+        serializer_class, get_queryset, optimize = RESOURCES[resource]
+        compiled = compile_serializer(serializer_class)
+        queryset = get_queryset()[:rows]
+        count = queryset.count()
+        if not count:
+            raise CommandError(
+                f'Нет строк {resource}, заполните БД командой dbgenerate'
+            )
+
+        def drf():
+            return serializer_class(optimize(get_queryset())[:rows],
+                                    many=True).data
+
+        def fast():
+            return compiled.to_representation(
+                get_queryset().values(*compiled.paths())[:rows]
+            )
+
+        drf_time, expected = measure(drf, repeat)
+        compiled_time, data = measure(fast, repeat)
+        renderer = JSONRenderer()
+        if renderer.render(data) != renderer.render(expected):
+            raise CommandError(
+                f'Ответ скомпилированного сериализатора {resource} '
+                'отличается от ответа DRF'
+            )
+        return {
+            'resource': resource,
+            'rows': count,
+            'drf_us_per_row': round(drf_time / count * 1e6, 1),
+            'compiled_us_per_row': round(compiled_time / count * 1e6, 1),
+            'speedup': round(drf_time / compiled_time, 1),
+        }
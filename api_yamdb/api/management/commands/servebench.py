@@ -0,0 +1,286 @@
+import asyncio
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .apibench import percentile
+
+SERVERS = {
+    'wsgi': lambda options: [
+        sys.executable, '-m', 'gunicorn', 'api_yamdb.wsgi:application',
+        '--bind', f'127.0.0.1:{options["port"]}',
+        '--workers', str(options['workers']),
+        '--log-level', 'warning',
+    ],
+    # Воркеры и потоки из gunicorn.conf.py, как в контейнере
+    'gthread': lambda options: [
+        sys.executable, '-m', 'gunicorn', 'api_yamdb.wsgi:application',
+        '--config', 'gunicorn.conf.py',
+        '--bind', f'127.0.0.1:{options["port"]}',
+        '--log-level', 'warning',
+    ],
+    'asgi': lambda options: [
+        sys.executable, '-m', 'uvicorn', 'api_yamdb.asgi:application',
+        '--host', '127.0.0.1', '--port', str(options['port']),
+        '--no-access-log', '--log-level', 'warning',
+    ],
+}
+
+
+def get_tree_rss(pid):
+    '''Суммарная RSS процесса и его потомков в КБ по данным /proc'''
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, ()))
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI (gunicorn, sync- или gthread-воркеры) и ASGI '
+        '(uvicorn, пул потоков) под параллельной нагрузкой: пропускную '
+        'способность, задержки и память сервера на запрос в обработке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes', default='wsgi,asgi',
+            help=f'Режимы через запятую: {", ".join(SERVERS)}'
+        )
+        parser.add_argument(
+            '--cores', default='',
+            help='Число ядер сервера через запятую, например 1,2,4. Сервер '
+                 'закрепляется на первых ядрах, а gthread берёт число '
+                 'воркеров из gunicorn.conf.py по этому числу'
+        )
+        parser.add_argument(
+            '--concurrency', default='8,32,128',
+            help='Число одновременных клиентов через запятую'
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь для запросов, можно указать несколько раз. '
+                 'По умолчанию списки каталога'
+        )
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument(
+            '--warmup', type=float, default=3.0,
+            help='Прогрев сервера в секундах перед замерами'
+        )
+        parser.add_argument(
+            '--slow-ms', type=int, default=0,
+            help='Пауза клиента между строкой запроса и заголовками, '
+                 'имитирует медленную сеть'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число sync-воркеров gunicorn'
+        )
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Размер пула потоков ASGI (ASGI_THREADS)'
+        )
+        parser.add_argument('--port', type=int, default=8700)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir('/proc'):
+            raise CommandError('Замер памяти требует Linux и /proc')
+        modes = options['modes'].split(',')
+        unknown = set(modes) - set(SERVERS)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные режимы: {", ".join(sorted(unknown))}'
+            )
+        self.options = options
+        self.paths = options['paths'] or [
+            '/api/v1/titles/', '/api/v1/genres/', '/api/v1/categories/',
+        ]
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        self.cpus = sorted(os.sched_getaffinity(0))
+        cores_levels = [
+            int(cores) for cores in options['cores'].split(',') if cores
+        ]
+        if any(cores > len(self.cpus) for cores in cores_levels):
+            raise CommandError(f'Доступно ядер: {len(self.cpus)}')
+
+        results = []
+        for cores, mode in itertools.product(cores_levels or [None], modes):
+            server = self.start_server(mode, cores)
+            try:
+                # Кэш и соединения у каждого воркера свои
+                asyncio.run(self.load(
+                    server.pid, self.options['workers'] * 2,
+                    self.options['warmup']
+                ))
+                idle_rss = get_tree_rss(server.pid)
+                for concurrency in levels:
+                    self.stdout.write(self.style.MIGRATE_LABEL(
+                        f'{mode}, ядер {cores or len(self.cpus)}: '
+                        f'{concurrency} клиентов'
+                    ))
+                    result = asyncio.run(self.load(
+                        server.pid, concurrency, self.options['duration']
+                    ))
+                    result.update(
+                        mode=mode,
+                        cores=cores or len(self.cpus),
+                        concurrency=concurrency,
+                        idle_rss_mb=round(idle_rss / 1024, 1),
+                        rss_per_request_kb=round(
+                            (result['peak_rss_kb'] - idle_rss) / concurrency,
+                            1
+                        ),
+                    )
+                    results.append(result)
+            finally:
+                server.terminate()
+                server.wait(timeout=10)
+
+        self.print_report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'meta': {
+                        key: options[key] for key in (
+                            'duration', 'warmup', 'slow_ms', 'workers',
+                            'threads', 'cores'
+                        )
+                    },
+                    'paths': self.paths,
+                    'results': results,
+                }, f, indent=2)
+
+    def start_server(self, mode, cores=None):
+        env = dict(os.environ, ASGI_THREADS=str(self.options['threads']))
+        cpus = self.cpus[:cores] if cores is not None else self.cpus
+        if cores is not None:
+            env['GUNICORN_CPUS'] = str(cores)
+        if mode == 'gthread' and settings.CACHES['default'][
+            'BACKEND'
+        ].endswith('.LocMemCache'):
+            # gunicorn.conf.py не запускает воркеры без общего кэша
+            env['CACHE_BACKEND'] = (
+                'django.core.cache.backends.filebased.FileBasedCache'
+            )
+            env['CACHE_LOCATION'] = tempfile.mkdtemp(prefix='servebench-')
+        server = subprocess.Popen(
+            SERVERS[mode](self.options), cwd=settings.BASE_DIR, env=env,
+            preexec_fn=lambda: os.sched_setaffinity(0, cpus)
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Сервер {mode} завершился при запуске')
+            try:
+                socket.create_connection(
+                    ('127.0.0.1', self.options['port']), timeout=1
+                ).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Сервер {mode} не запустился за 30 секунд')
+
+    async def load(self, pid, concurrency, duration):
+        deadline = time.monotonic() + duration
+        latencies, errors = [], [0]
+        peak_rss = [0]
+
+        async def sample_memory():
+            while time.monotonic() < deadline:
+                peak_rss[0] = max(peak_rss[0], get_tree_rss(pid))
+                await asyncio.sleep(0.1)
+
+        async def client(number):
+            position = number
+            while time.monotonic() < deadline:
+                path = self.paths[position % len(self.paths)]
+                position += 1
+                started = time.perf_counter()
+                try:
+                    status = await self.request(path)
+                except (OSError, asyncio.IncompleteReadError):
+                    status = None
+                if status is None or status >= 500:
+                    errors[0] += 1
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.monotonic()
+        await asyncio.gather(
+            sample_memory(),
+            *(client(number) for number in range(concurrency))
+        )
+        elapsed = time.monotonic() - started
+        return {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': percentile(latencies, 50) if latencies else None,
+            'p99_ms': percentile(latencies, 99) if latencies else None,
+            'mean_ms': statistics.mean(latencies) if latencies else None,
+            'peak_rss_kb': peak_rss[0],
+        }
+
+    async def request(self, path):
+        reader, writer = await asyncio.open_connection(
+            '127.0.0.1', self.options['port']
+        )
+        try:
+            writer.write(f'GET {path} HTTP/1.1\r\n'.encode())
+            if self.options['slow_ms']:
+                await writer.drain()
+                await asyncio.sleep(self.options['slow_ms'] / 1000)
+            writer.write(
+                b'Host: localhost\r\nConnection: close\r\n'
+                b'Accept: application/json\r\n\r\n'
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+    def print_report(self, results):
+        self.stdout.write(
+            f'{"mode":<8}{"cores":>6}{"clients":>8}{"rps":>9}{"p50":>9}'
+            f'{"p99":>9}{"errors":>8}{"idle_mb":>9}{"kb/req":>9}'
+        )
+        for result in results:
+            self.stdout.write(
+                f'{result["mode"]:<8}{result["cores"]:>6}'
+                f'{result["concurrency"]:>8}'
+                f'{result["throughput_rps"]:>9.1f}'
+                f'{result["p50_ms"] or 0:>9.1f}{result["p99_ms"] or 0:>9.1f}'
+                f'{result["errors"]:>8}{result["idle_rss_mb"]:>9.1f}'
+                f'{result["rss_per_request_kb"]:>9.1f}'
+            )
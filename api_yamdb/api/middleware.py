@@ -0,0 +1,242 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.text import compress_string
+
+from .conditional import gzip_etag
+
+# Верхние границы корзин гистограммы в миллисекундах, последняя — бесконечность
+BUCKETS_MS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf')
+)
+UNRESOLVED = '<unresolved>'
+
+
+class QueryCounter:
+    '''Считает SQL-запросы запроса и их суммарное время'''
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+
+
+class EndpointStats:
+    '''Агрегаты одного эндпоинта с памятью, не зависящей от числа запросов'''
+
+    __slots__ = (
+        'requests', 'errors', 'wall_ms', 'max_wall_ms', 'queries',
+        'sql_ms', 'bytes', 'histogram',
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.wall_ms = 0.0
+        self.max_wall_ms = 0.0
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.bytes = 0
+        self.histogram = [0] * len(BUCKETS_MS)
+
+    def add(self, wall_ms, queries, sql_ms, size, status_code):
+        self.requests += 1
+        self.errors += status_code >= 500
+        self.wall_ms += wall_ms
+        self.max_wall_ms = max(self.max_wall_ms, wall_ms)
+        self.queries += queries
+        self.sql_ms += sql_ms
+        self.bytes += size
+        self.histogram[bisect.bisect_left(BUCKETS_MS, wall_ms)] += 1
+
+    def percentile(self, percent):
+        '''Верхняя граница корзины, в которую попадает перцентиль'''
+        rank = percent / 100 * self.requests
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.histogram):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max_wall_ms)
+        return self.max_wall_ms
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'mean_ms': round(self.wall_ms / requests, 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'max_ms': round(self.max_wall_ms, 3),
+            'queries': round(self.queries / requests, 2),
+            'sql_ms': round(self.sql_ms / requests, 3),
+            'sql_ms_total': round(self.sql_ms, 3),
+            'bytes': round(self.bytes / requests),
+            'histogram': {
+                ('inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(BUCKETS_MS, self.histogram)
+            },
+        }
+
+
+class RequestStats:
+    '''Статистика запросов процесса, сгруппированная по эндпоинтам'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+            self.started = time.time()
+
+    def add(self, method, view_name, *args):
+        key = (view_name, method)
+        with self.lock:
+            endpoint = self.endpoints.get(key)
+            if endpoint is None:
+                endpoint = self.endpoints[key] = EndpointStats()
+            endpoint.add(*args)
+
+    def snapshot(self):
+        with self.lock:
+            endpoints = [
+                dict(view=view_name, method=method, **endpoint.as_dict())
+                for (view_name, method), endpoint in self.endpoints.items()
+            ]
+            started = self.started
+        endpoints.sort(key=lambda item: item['sql_ms_total'], reverse=True)
+        return {
+            'since': time.strftime(
+                '%Y-%m-%dT%H:%M:%SZ', time.gmtime(started)
+            ),
+            'buckets_ms': [str(bound) for bound in BUCKETS_MS],
+            'endpoints': endpoints,
+        }
+
+
+request_stats = RequestStats()
+
+
+class RequestStatsMiddleware:
+    '''Время, SQL-запросы и размер ответа для каждого запроса
+
+    Включается настройкой API_REQUEST_STATS. Агрегаты доступны
+    администратору по /api/v1/stats/, а время каждого ответа
+    дублируется в заголовок Server-Timing.
+    '''
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'API_REQUEST_STATS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+        sql_ms = counter.time * 1000
+
+        match = request.resolver_match
+        request_stats.add(
+            request.method,
+            match.view_name if match else UNRESOLVED,
+            wall_ms,
+            counter.count,
+            sql_ms,
+            0 if response.streaming else len(response.content),
+            response.status_code,
+        )
+        response['Server-Timing'] = (
+            f'app;dur={wall_ms:.1f}, '
+            f'db;dur={sql_ms:.1f};desc="{counter.count} queries"'
+        )
+        return response
+
+
+def accepts_gzip(header):
+    '''Разрешает ли Accept-Encoding gzip с учётом q=0 и *'''
+    weights = {}
+    for item in header.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding.lower()] = weight
+    return weights.get('gzip', weights.get('*', 0)) > 0
+
+
+def is_json(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return content_type == 'application/json' or content_type.endswith(
+        '+json'
+    )
+
+
+class CompressionMiddleware:
+    '''Сжимает gzip ответы JSON от API_GZIP_MIN_SIZE байт
+
+    Потоковые ответы и ответы с Content-Encoding не трогает. Сжатый
+    ответ получает ETag с суффиксом ;gzip: сильный ETag обещает
+    одинаковые байты. ConditionalMixin принимает его в If-Match и
+    If-None-Match, а ответ 304 возвращает тот ETag, что прислал клиент.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'API_GZIP_MIN_SIZE', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.status_code == 304 and response.has_header('ETag'):
+            return self.not_modified(request, response)
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or not is_json(response)
+            or len(response.content) < self.min_size
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return response
+        compressed = compress_string(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = 'gzip'
+        if response.has_header('ETag'):
+            response['ETag'] = gzip_etag(response['ETag'])
+        return response
+
+    def not_modified(self, request, response):
+        '''ETag ответа 304 того представления, что есть у клиента'''
+        patch_vary_headers(response, ('Accept-Encoding',))
+        etag = gzip_etag(response['ETag'])
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response['ETag'] = etag
+        return response
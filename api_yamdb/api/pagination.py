@@ -0,0 +1,141 @@
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+
+class CountedPaginator(Paginator):
+    '''Paginator, который считает строки по отдельному queryset'''
+
+    def __init__(self, object_list, per_page, count_queryset=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_queryset = count_queryset
+
+    @cached_property
+    def count(self):
+        if self.count_queryset is None:
+            return super().count
+        return self.count_queryset.count()
+
+
+class CountedPageNumberPagination(PageNumberPagination):
+    '''Постраничная пагинация с COUNT(*) по переданному queryset
+
+    Список из values() с соединениями для колонок ответа считается
+    по исходному queryset: соединения для подсчёта не нужны.
+    '''
+    count_queryset = None
+
+    def paginate_queryset(self, queryset, request, view=None,
+                          count_queryset=None):
+        self.count_queryset = count_queryset
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountedPaginator(
+            object_list, per_page, count_queryset=self.count_queryset
+        )
+
+
+class PubDateCursorPagination(CursorPagination):
+    '''Курсорная пагинация по ключу (pub_date, id) без COUNT и OFFSET
+
+    Курсор хранит pub_date и id крайней записи страницы, соседняя
+    страница выбирается условием (pub_date, id) > курсор по индексу
+    (fk, pub_date, id), поэтому смещение в курсоре не нужно.
+    '''
+    ordering = ('pub_date', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self.cursor and self.cursor.position
+        if reverse:
+            queryset = queryset.order_by('-pub_date', '-id')
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position:
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = bool(position), has_following
+        else:
+            self.has_next, self.has_previous = has_following, bool(position)
+        # Пустая страница за краем списка возвращает к самому курсору
+        self.first_position = self.last_position = position
+        if self.page:
+            self.first_position = self.get_position(self.page[0])
+            self.last_position = self.get_position(self.page[-1])
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def keyset_filter(self, position, reverse):
+        '''Условие (pub_date, id) > курсор или < курсор для previous
+
+        Отдельное условие pub_date >= курсор становится границей
+        поиска по индексу, а не фильтром по всем строкам списка.
+        '''
+        try:
+            pub_date, pk = position.split(',')
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'lt' if reverse else 'gt'
+        return Q(**{f'pub_date__{lookup}e': pub_date}) & (
+            Q(**{f'pub_date__{lookup}': pub_date})
+            | Q(**{f'id__{lookup}': pk})
+        )
+
+    def get_position(self, instance):
+        '''Ключ записи: объект модели или строка values()'''
+        if isinstance(instance, dict):
+            pub_date, pk = instance['pub_date'], instance['id']
+        else:
+            pub_date, pk = instance.pub_date, instance.pk
+        return f'{pub_date.isoformat()},{pk}'
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.last_position)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.first_position)
+        )
+
+
+class OptionalCursorPaginationMixin:
+    '''Включает курсорную пагинацию по ?pagination=cursor или ?cursor='''
+    cursor_pagination_class = PubDateCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.uses_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+    def uses_cursor_pagination(self):
+        params = self.request.query_params
+        return (
+            params.get('pagination') == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
@@ -0,0 +1,77 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connections
+from django.db.models import (Case, CharField, F, FloatField, Func, Q, Value,
+                              When)
+from django.db.models.functions import Lower
+
+SEARCH_CONFIG = 'russian'
+# Веса совпадений в названии и описании, как у setweight 'A' и 'B'
+NAME_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+
+def casefold(value):
+    '''Приводит строку к виду для сравнения без учёта регистра и ё'''
+    if value is None:
+        return None
+    return value.casefold().replace('ё', 'е')
+
+
+def register_search_functions(sender, connection, **kwargs):
+    '''Добавляет в SQLite функцию YAMDB_CASEFOLD для поиска'''
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'YAMDB_CASEFOLD', 1, casefold, deterministic=True
+        )
+
+
+class Casefold(Func):
+    function = 'YAMDB_CASEFOLD'
+    output_field = CharField()
+
+
+def search_titles(queryset, query):
+    '''Фильтрует произведения по названию и описанию с ранжированием'''
+    query = ' '.join(casefold(query).split())
+    if not query:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        return postgresql_search(queryset, query)
+    return fallback_search(queryset, query)
+
+
+def postgresql_search(queryset, query):
+    '''Полнотекстовый поиск по search_vector и триграммы по названию
+
+    Опечатки в названии находятся через триграммы, оба условия
+    обслуживаются GIN-индексами из миграции reviews 0006.
+    '''
+    search_query = SearchQuery(query, config=SEARCH_CONFIG)
+    return queryset.annotate(
+        search_rank=SearchRank(F('search_vector'), search_query),
+        name_similarity=TrigramSimilarity('name', query),
+    ).filter(
+        Q(search_vector=search_query) | Q(name__trigram_similar=query)
+    ).order_by('-search_rank', '-name_similarity', 'pk')
+
+
+def fallback_search(queryset, query):
+    '''Поиск подстрок для SQLite: каждое слово в названии или описании'''
+    vendor = connections[queryset.db].vendor
+    fold = Casefold if vendor == 'sqlite' else Lower
+    queryset = queryset.annotate(
+        folded_name=fold('name'), folded_description=fold('description')
+    )
+    rank = Value(0.0, output_field=FloatField())
+    for term in query.split():
+        queryset = queryset.filter(
+            Q(folded_name__contains=term)
+            | Q(folded_description__contains=term)
+        )
+        rank = rank + Case(
+            When(folded_name__contains=term, then=Value(NAME_WEIGHT)),
+            default=Value(DESCRIPTION_WEIGHT),
+            output_field=FloatField(),
+        )
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', 'pk')
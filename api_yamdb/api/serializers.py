@@ -1,12 +1,17 @@
 import datetime as dt
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+from reviews.genre_masks import mask_of
 from reviews.models import Categories, Comments, Genres, Review, Title
 
+from .fieldsets import SparseFieldsetMixin
+
 User = get_user_model()
 
 
@@ -40,11 +45,42 @@ class GenreSerializer(serializers.ModelSerializer):
     )
 
     class Meta:
-        exclude = ['id']
+        exclude = ['id', 'mask']
         model = Genres
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class SlugListField(serializers.ListField):
+    '''Список слагов, который разрешается в объекты одним запросом'''
+    child = serializers.CharField()
+    default_error_messages = {
+        'does_not_exist': _('Object with {slug_name}={value} does not exist.'),
+    }
+
+    def __init__(self, queryset, slug_field='slug', **kwargs):
+        self.queryset = queryset
+        self.slug_field = slug_field
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        slugs = list(dict.fromkeys(super().to_internal_value(data)))
+        objects = {
+            getattr(obj, self.slug_field): obj
+            for obj in self.queryset.all().filter(
+                **{f'{self.slug_field}__in': slugs}
+            )
+        }
+        for slug in slugs:
+            if slug not in objects:
+                self.fail(
+                    'does_not_exist', slug_name=self.slug_field, value=slug
+                )
+        return [objects[slug] for slug in slugs]
+
+    def to_representation(self, data):
+        return [getattr(obj, self.slug_field) for obj in data.all()]
+
+
+class TitleReadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
     rating = serializers.FloatField(
@@ -65,12 +101,13 @@ class TitleWriteSerializer(TitleReadSerializer):
     category = serializers.SlugRelatedField(
         slug_field='slug',
         queryset=Categories.objects.all(),
+        write_only=True,
     )
-    genre = serializers.SlugRelatedField(
-        slug_field='slug',
+    genre = SlugListField(
         queryset=Genres.objects.all(),
-        many=True,
+        write_only=True,
     )
+    resolved_genres = None
 
     class Meta:
         model = Title
@@ -93,25 +130,61 @@ class TitleWriteSerializer(TitleReadSerializer):
             )
         return value
 
+    def create(self, validated_data):
+        genres = validated_data.pop('genre', [])
+        with transaction.atomic():
+            title = Title.objects.create(
+                genre_mask=mask_of(genres), **validated_data
+            )
+            self.write_genres(title, genres)
+        self.resolved_genres = genres
+        return title
+
+    def update(self, instance, validated_data):
+        genres = validated_data.pop('genre', None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if genres is not None:
+                self.write_genres(
+                    instance, genres,
+                    existing={genre.pk for genre in instance.genre.all()}
+                )
+        self.resolved_genres = genres
+        return instance
+
+    @staticmethod
+    def write_genres(title, genres, existing=frozenset()):
+        '''Пишет в M2M-таблицу только разницу с текущими жанрами
+
+        Запись идёт мимо m2m_changed, поэтому маска жанров произведения
+        обновляется здесь же.
+        '''
+        through = Title.genre.through
+        wanted = {genre.pk for genre in genres}
+        removed = existing - wanted
+        if removed:
+            through.objects.filter(
+                title_id=title.pk, genres_id__in=removed
+            ).delete()
+        through.objects.bulk_create([
+            through(title_id=title.pk, genres_id=genre_id)
+            for genre_id in wanted - existing
+        ])
+        mask = mask_of(genres)
+        if title.genre_mask != mask:
+            Title.objects.filter(pk=title.pk).update(genre_mask=mask)
+            title.genre_mask = mask
+
     def to_representation(self, instance):
-        '''Вместо слага возвращает десериализованный объект'''
+        '''Вместо слагов возвращает уже загруженные объекты'''
         ret = super().to_representation(instance)
-
-        if 'category' in ret and isinstance(ret['category'], str):
-            category_slug = ret.pop('category')
-            category = Categories.objects.get(slug=category_slug)
-            categorySerializer = CategorySerializer(category)
-            ret['category'] = categorySerializer.data
-
-        if 'genre' in ret and isinstance(ret['genre'], list):
-            genre_slugs = ret.pop('genre')
-            genres = []
-            for genre_slug in genre_slugs:
-                genre = Genres.objects.get(slug=genre_slug)
-                genreSerializer = GenreSerializer(genre)
-                genres.append(genreSerializer.data)
-            ret['genre'] = genres
-
+        genres = instance.genre.all()
+        if self.resolved_genres is not None:
+            genres = sorted(self.resolved_genres, key=lambda genre: genre.pk)
+        ret['category'] = None
+        if instance.category is not None:
+            ret['category'] = CategorySerializer(instance.category).data
+        ret['genre'] = GenreSerializer(genres, many=True).data
         return ret
 
 
@@ -204,32 +277,24 @@ class ConfirmationCodeSerializer(serializers.Serializer):
     username = serializers.CharField(required=True, max_length=150)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = SlugRelatedField(
         slug_field='username',
         read_only=True,
         default=serializers.CurrentUserDefault()
     )
 
+    default_error_messages = {
+        # Проверяется ограничением unique_title_author при записи
+        'unique_title_author': (
+            'Автор может оставлять только один отзыв '
+            'на определённое произведение'
+        ),
+    }
+
     class Meta:
         model = Review
-        exclude = ('title',)
-
-    def validate(self, data):
-        request = self.context.get('request')
-        if request.method == "POST":
-            reviews = Review.objects.filter(
-                author=request.user.id,
-                title=request.parser_context.get('kwargs').get('title_id'),
-            )
-
-            if reviews.exists():
-                raise serializers.ValidationError(
-                    'Автор может оставлять только один отзыв '
-                    'на определённое произведение'
-                )
-
-        return data
+        fields = ('id', 'author', 'text', 'score', 'pub_date')
 
     def validate_score(self, value):
         if value < 0:
@@ -245,7 +310,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         return value
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = SlugRelatedField(
         slug_field='username',
         read_only=True
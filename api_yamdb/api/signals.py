@@ -0,0 +1,78 @@
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from reviews.models import Categories, Comments, Genres, Review, Title
+from reviews.ratings import rating_changed
+from users.models import User
+
+from .authentication import cache_token_version
+from .autocomplete import TYPE_NAMES, prefix_index
+from .cache import bump_versions, nested_resource
+from .connections import checkout_connections, release_connections
+from .search import register_search_functions
+
+CACHE_DEPENDENCIES = {
+    Categories: ('categories', 'titles', 'autocomplete'),
+    Genres: ('genres', 'titles', 'autocomplete'),
+    Title: ('titles', 'autocomplete'),
+}
+# Вложенные списки: имя ресурса и поле родителя
+NESTED_DEPENDENCIES = {
+    Review: ('reviews', 'title_id'),
+    Comments: ('comments', 'review_id'),
+}
+
+
+def invalidate_cache(sender, **kwargs):
+    '''Сбрасывает кэш ответов после фиксации транзакции'''
+    resources = CACHE_DEPENDENCIES[sender]
+    transaction.on_commit(lambda: bump_versions(*resources))
+
+
+def invalidate_ratings(sender, count, **kwargs):
+    '''Каталог показывает из отзывов только рейтинг произведений'''
+    if count:
+        transaction.on_commit(lambda: bump_versions('titles'))
+
+
+def invalidate_nested_list(sender, instance, **kwargs):
+    '''Меняет версию, то есть ETag, списка родителя объекта'''
+    name, parent_field = NESTED_DEPENDENCIES[sender]
+    resource = nested_resource(name, getattr(instance, parent_field))
+    transaction.on_commit(lambda: bump_versions(resource))
+
+
+def update_prefix_index(sender, instance, signal, **kwargs):
+    '''Вносит изменение в индекс автодополнения после сброса версии'''
+    deleted = signal is post_delete
+    transaction.on_commit(lambda: prefix_index.update(instance, deleted))
+
+
+def update_token_version(sender, instance, **kwargs):
+    '''Другие запросы процесса сразу видят новую версию токенов'''
+    if 'token_version' not in instance.get_deferred_fields():
+        transaction.on_commit(lambda: cache_token_version(instance))
+
+
+def invalidate_title_genres(sender, action, **kwargs):
+    if action.startswith('post_'):
+        transaction.on_commit(lambda: bump_versions('titles'))
+
+
+for model in CACHE_DEPENDENCIES:
+    post_save.connect(invalidate_cache, sender=model)
+    post_delete.connect(invalidate_cache, sender=model)
+for model in NESTED_DEPENDENCIES:
+    post_save.connect(invalidate_nested_list, sender=model)
+    post_delete.connect(invalidate_nested_list, sender=model)
+for model in TYPE_NAMES:
+    post_save.connect(update_prefix_index, sender=model)
+    post_delete.connect(update_prefix_index, sender=model)
+post_save.connect(update_token_version, sender=User)
+m2m_changed.connect(invalidate_title_genres, sender=Title.genre.through)
+rating_changed.connect(invalidate_ratings, sender=Title)
+connection_created.connect(register_search_functions)
+request_started.connect(checkout_connections)
+request_finished.connect(release_connections)
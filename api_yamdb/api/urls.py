@@ -2,8 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (CategoryViewSet, CommentViewSet, GenreViewSet,
-                       ReviewViewSet, TitleViewSet, UserViewSet,
-                       get_confirmation_code, get_user_token)
+                       ReviewViewSet, TitleViewSet, UserViewSet, autocomplete,
+                       export, get_confirmation_code, get_request_stats,
+                       get_user_token)
 
 router = DefaultRouter()
 router.register('v1/users', UserViewSet, basename='users')
@@ -20,4 +21,7 @@ urlpatterns = [
     path('', include(router.urls), name='api'),
     path('v1/auth/token/', get_user_token, name='signup'),
     path('v1/auth/signup/', get_confirmation_code, name='token'),
+    path('v1/autocomplete/', autocomplete, name='autocomplete'),
+    path('v1/stats/', get_request_stats, name='stats'),
+    path('v1/export/<str:resource>/', export, name='export'),
 ]
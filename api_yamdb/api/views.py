@@ -1,22 +1,39 @@
 import uuid
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view,
+                                       authentication_classes,
+                                       permission_classes)
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import (LimitOffsetPagination,
                                        PageNumberPagination)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
 
 from api_yamdb.settings import EMAIL_SENDER
 from reviews.models import Categories, Comments, Genres, Review, Title
+from users.outbox import enqueue_email
 
+from .authentication import issue_token
+from .autocomplete import prefix_index
+from .bulk import (BulkWriteMixin, CategoryBulkWriter, GenreBulkWriter,
+                   TitleBulkWriter)
+from .cache import CachedListMixin, CachedRetrieveMixin, nested_resource
+from .compiled import CompiledListMixin
+from .conditional import ConditionalMixin
+from .connections import connection_stats
+from .export import (EXPORT_FORMATS, EXPORTERS, export_response,
+                     parse_updated_since)
+from .fieldsets import SparseFieldsetViewMixin
 from .filters import TitleFilter
+from .middleware import request_stats
+from .pagination import (CountedPageNumberPagination,
+                         OptionalCursorPaginationMixin)
 from .permissions import (IsAdmin, IsAmdinOrReadOnly, WriteAdmin,
                           WriteOwnerOrPersonal)
 from .serializers import (CategorySerializer, CommentSerializer,
@@ -27,6 +44,44 @@ from .serializers import (CategorySerializer, CommentSerializer,
 
 User = get_user_model()
 
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+
+# SQLSTATE нарушений ограничений в PostgreSQL
+FOREIGN_KEY_VIOLATION = '23503'
+UNIQUE_VIOLATION = '23505'
+
+
+def is_foreign_key_violation(error):
+    '''Нарушение внешнего ключа: SQLSTATE в PostgreSQL, текст в SQLite'''
+    cause = error.__cause__
+    if getattr(cause, 'pgcode', None) is not None:
+        return cause.pgcode == FOREIGN_KEY_VIOLATION
+    return str(error) == 'FOREIGN KEY constraint failed'
+
+
+def is_unique_violation(error, model, name):
+    '''Нарушение ограничения уникальности name модели model
+
+    SQLite не сообщает имя ограничения, поэтому сравниваются колонки.
+    '''
+    cause = error.__cause__
+    if getattr(cause, 'pgcode', None) is not None:
+        return (
+            cause.pgcode == UNIQUE_VIOLATION
+            and cause.diag.constraint_name == name
+        )
+    constraint, = (
+        constraint for constraint in model._meta.constraints
+        if constraint.name == name
+    )
+    columns = ', '.join(
+        f'{model._meta.db_table}.{model._meta.get_field(field).column}'
+        for field in constraint.fields
+    )
+    return str(error) == f'UNIQUE constraint failed: {columns}'
+
 
 class ListCreateDestroyViewSet(mixins.ListModelMixin,
                                mixins.CreateModelMixin,
@@ -35,7 +90,11 @@ class ListCreateDestroyViewSet(mixins.ListModelMixin,
     pass
 
 
-class CategoryViewSet(ListCreateDestroyViewSet):
+class CategoryViewSet(ConditionalMixin, CachedListMixin, BulkWriteMixin,
+                      ListCreateDestroyViewSet):
+    bulk_writer_class = CategoryBulkWriter
+    cache_resource = 'categories'
+    versioned_actions = ('list',)
     queryset = Categories.objects.all()
     serializer_class = CategorySerializer
     pagination_class = PageNumberPagination
@@ -45,7 +104,11 @@ class CategoryViewSet(ListCreateDestroyViewSet):
     lookup_field = 'slug'
 
 
-class GenreViewSet(ListCreateDestroyViewSet):
+class GenreViewSet(ConditionalMixin, CachedListMixin, BulkWriteMixin,
+                   ListCreateDestroyViewSet):
+    bulk_writer_class = GenreBulkWriter
+    cache_resource = 'genres'
+    versioned_actions = ('list',)
     queryset = Genres.objects.all()
     serializer_class = GenreSerializer
     pagination_class = PageNumberPagination
@@ -55,13 +118,20 @@ class GenreViewSet(ListCreateDestroyViewSet):
     lookup_field = 'slug'
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(ConditionalMixin, CachedListMixin, CachedRetrieveMixin,
+                   BulkWriteMixin, CompiledListMixin,
+                   SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    bulk_writer_class = TitleBulkWriter
+    cache_resource = 'titles'
+    versioned_actions = ('list',)
     queryset = Title.objects.all()
-    pagination_class = PageNumberPagination
+    pagination_class = CountedPageNumberPagination
     permission_classes = [WriteAdmin]
     filter_backends = (DjangoFilterBackend, )
     filterset_class = TitleFilter
     filterset_fields = ('name', 'year', 'category__slug', 'genre__slug')
+    sparse_select_related = {'category': 'category'}
+    sparse_prefetch_related = {'genre': 'genre'}
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -69,9 +139,7 @@ class TitleViewSet(viewsets.ModelViewSet):
         return TitleReadSerializer
 
     def get_queryset(self):
-        return super().get_queryset().annotate(
-            rating=Avg('reviews__score')
-        ).order_by('-year')
+        return super().get_queryset().order_by('-year', 'id')
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -102,6 +170,8 @@ class UserViewSet(viewsets.ModelViewSet):
     def me(self, request):
         serializer = UserInfoSerializer(request.user)
         if request.method == 'PATCH':
+            # Пользователь из токена мог устареть, правка идёт по БД
+            request.user.refresh_from_db()
             serializer = UserInfoSerializer(
                 request.user, data=request.data, partial=True
             )
@@ -118,18 +188,18 @@ def get_confirmation_code(request):
     email = serializer.validated_data['email']
     username = serializer.validated_data['username']
     confirmation_code = uuid.uuid3(uuid.NAMESPACE_DNS, email)
-    User.objects.create(
-        username=username,
-        email=email,
-        confirmation_code=confirmation_code,
-    )
-    send_mail(
-        'Код доступа',
-        f'Отправили код доступа: {confirmation_code}',
-        EMAIL_SENDER,
-        [email],
-        fail_silently=False,
-    )
+    with transaction.atomic():
+        User.objects.create(
+            username=username,
+            email=email,
+            confirmation_code=confirmation_code,
+        )
+        enqueue_email(
+            'Код доступа',
+            f'Отправили код доступа: {confirmation_code}',
+            EMAIL_SENDER,
+            [email],
+        )
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -146,50 +216,130 @@ def get_user_token(request):
             {'confirmation_code': 'Код неверный'},
             status=status.HTTP_400_BAD_REQUEST
         )
-    token = AccessToken.for_user(user)
+    token = issue_token(user)
 
     return Response({f'token: {token}'}, status=status.HTTP_200_OK)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def autocomplete(request):
+    '''Подсказки по префиксу среди произведений, жанров и категорий'''
+    try:
+        limit = min(
+            int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)),
+            AUTOCOMPLETE_MAX_LIMIT
+        )
+    except ValueError:
+        return Response(
+            {'limit': 'Ожидается целое число'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    types = request.query_params.get('type')
+    return Response(prefix_index.lookup(
+        request.query_params.get('q', ''),
+        limit=max(limit, 0),
+        types=types.split(',') if types else None,
+    ), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def export(request, resource):
+    '''Потоковая выгрузка произведений, отзывов или комментариев'''
+    if resource not in EXPORTERS:
+        raise NotFound('Выгрузка доступна для titles, reviews и comments')
+    output = request.query_params.get('output', 'ndjson')
+    if output not in EXPORT_FORMATS:
+        return Response(
+            {'output': f'Поддерживаются форматы: {", ".join(EXPORT_FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return export_response(
+        resource, output,
+        parse_updated_since(request.query_params.get('updated_since')),
+        settings.API_EXPORT_CHUNK_SIZE
+    )
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdmin])
+def get_request_stats(request):
+    '''Статистика запросов и соединений с БД текущего процесса'''
+    if request.method == 'DELETE':
+        request_stats.reset()
+        connection_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    stats = request_stats.snapshot()
+    stats['connections'] = connection_stats.snapshot()
+    return Response(stats, status=status.HTTP_200_OK)
+
+
+class ReviewViewSet(ConditionalMixin, OptionalCursorPaginationMixin,
+                    CompiledListMixin, SparseFieldsetViewMixin,
+                    viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [WriteOwnerOrPersonal]
-    pagination_class = PageNumberPagination
+    pagination_class = CountedPageNumberPagination
+    sparse_select_related = {'author': 'author'}
+    sparse_required_columns = ('id', 'pub_date')
+    versioned_actions = ('list',)
 
     def get_queryset(self):
         return super().get_queryset().filter(
             title_id=self.kwargs['title_id']
         )
 
+    def get_version_resource(self):
+        return nested_resource('reviews', self.kwargs['title_id'])
+
     def perform_create(self, serializer):
-        title = get_object_or_404(
-            Title,
-            id=self.kwargs.get('title_id')
-        )
-        serializer.save(
-            title=title,
-            author=self.request.user
-        )
+        '''Уникальность и наличие произведения проверяют ограничения БД'''
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    title_id=self.kwargs['title_id'],
+                    author=self.request.user
+                )
+        except IntegrityError as error:
+            if is_foreign_key_violation(error):
+                raise NotFound
+            if not is_unique_violation(error, Review, 'unique_title_author'):
+                raise
+            raise ValidationError({'non_field_errors': [
+                ReviewSerializer.default_error_messages['unique_title_author']
+            ]})
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalMixin, OptionalCursorPaginationMixin,
+                     CompiledListMixin, SparseFieldsetViewMixin,
+                     viewsets.ModelViewSet):
     queryset = Comments.objects.all()
     serializer_class = CommentSerializer
     permission_classes = [WriteOwnerOrPersonal]
-    pagination_class = PageNumberPagination
+    pagination_class = CountedPageNumberPagination
+    sparse_select_related = {'author': 'author'}
+    sparse_required_columns = ('id', 'pub_date')
+    versioned_actions = ('list',)
 
     def get_queryset(self):
         return super().get_queryset().filter(
             review_id=self.kwargs['review_id']
         )
 
+    def get_version_resource(self):
+        return nested_resource('comments', self.kwargs['review_id'])
+
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id')
-        )
-        serializer.save(
-            review=review,
-            author=self.request.user
-        )
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    review_id=self.kwargs['review_id'],
+                    author=self.request.user
+                )
+        except IntegrityError as error:
+            if is_foreign_key_violation(error):
+                raise NotFound
+            raise
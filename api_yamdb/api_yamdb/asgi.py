@@ -1,7 +1,200 @@
+import asyncio
 import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from django.core.asgi import get_asgi_application
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
-application = get_asgi_application()
+# Потоки для Django и ORM: в Django 2.2 нет асинхронных view и драйверов БД
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=8))
+# Фрагментов потокового ответа в очереди к клиенту
+STREAM_QUEUE_SIZE = 8
+
+
+class ThreadPoolASGIHandler:
+    '''ASGI-приложение поверх WSGIHandler с ограниченным пулом потоков
+
+    Чтение запроса и отправка ответа идут в цикле событий, поэтому
+    медленный клиент не занимает поток. Поток нужен только на время
+    работы view и запросов к БД. Тело запроса, как в ASGIHandler
+    Django, копится в памяти до FILE_UPLOAD_MAX_MEMORY_SIZE, а дальше
+    во временном файле. Отключение клиента прекращает чтение
+    потокового ответа.
+    '''
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b'
+        )
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body', False):
+                    break
+            await self.respond(scope, body, receive, send)
+        finally:
+            body.close()
+
+    async def respond(self, scope, body, receive, send):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stop = threading.Event()
+        worker = loop.run_in_executor(
+            self.executor, self.run_wsgi, self.get_environ(scope, body),
+            queue, loop, stop
+        )
+        disconnected = asyncio.ensure_future(self.disconnect(receive))
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    {getter, disconnected},
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnected.done():
+                    getter.cancel()
+                    break
+                message = getter.result()
+                if message is None:
+                    break
+                await send(message)
+        finally:
+            stop.set()
+            disconnected.cancel()
+            # Освобождаем место в очереди, пока поток не закроет ответ
+            while not worker.done():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    {getter, worker}, return_when=asyncio.FIRST_COMPLETED
+                )
+                getter.cancel()
+        await worker
+
+    async def disconnect(self, receive):
+        '''Ждёт http.disconnect, пока ответ отправляется клиенту'''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+    def run_wsgi(self, environ, queue, loop, stop):
+        '''Выполняет запрос и читает ответ целиком в одном потоке пула
+
+        Курсор БД потокового ответа и сигналы request_started и
+        request_finished принадлежат потоку, который вызвал Django.
+        Сообщения ASGI уходят в цикл событий через ограниченную очередь:
+        медленный клиент приостанавливает чтение, а не копит ответ в памяти.
+        '''
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        def put(message):
+            asyncio.run_coroutine_threadsafe(
+                queue.put(message), loop
+            ).result()
+
+        try:
+            result = self.wsgi_application(environ, start_response)
+            try:
+                put({
+                    'type': 'http.response.start',
+                    'status': response['status'],
+                    'headers': response['headers'],
+                })
+                if not getattr(result, 'streaming', False):
+                    put({
+                        'type': 'http.response.body',
+                        'body': b''.join(result),
+                    })
+                    return
+                for chunk in result:
+                    if stop.is_set():
+                        return
+                    put({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+                put({'type': 'http.response.body'})
+            finally:
+                # Сигнал request_finished закрывает соединение с БД потока
+                result.close()
+        finally:
+            put(None)
+
+    def get_environ(self, scope, body):
+        length = body.seek(0, os.SEEK_END)
+        body.seek(0)
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+            'QUERY_STRING': scope['query_string'].decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': client[0],
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            # Тело уже прочитано целиком, даже если пришло чанками
+            'CONTENT_LENGTH': str(length),
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin1').upper().replace('-', '_')
+            value = value.decode('latin1')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            if name == 'CONTENT_LENGTH':
+                continue
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        return environ
+
+
+application = ThreadPoolASGIHandler(get_wsgi_application(), ASGI_THREADS)
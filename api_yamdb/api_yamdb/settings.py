@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'rest_framework',
     'reviews',
@@ -28,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestStatsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,10 +69,48 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Секунд жизни соединения потока, 0 закрывает его после запроса
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
     }
 }
 
+# Проверка постоянного соединения с БД в начале запроса, если оно
+# простаивало дольше DB_CONN_HEALTH_CHECK_IDLE секунд
+DB_CONN_HEALTH_CHECKS = (
+    os.getenv('DB_CONN_HEALTH_CHECKS', default='True') == 'True'
+)
+DB_CONN_HEALTH_CHECK_IDLE = float(
+    os.getenv('DB_CONN_HEALTH_CHECK_IDLE', default=10)
+)
+# Постоянных соединений с БД на процесс. Это не предел числа
+# соединений: сверх него соединение закрывается после запроса
+DB_PERSISTENT_CONNECTIONS = int(
+    os.getenv('DB_PERSISTENT_CONNECTIONS', default=8)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='yamdb'),
+    }
+}
+
+# Время жизни кэша ответов каталога, сброс выполняется по версии ресурса
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', default=300))
+
+# Размер пачки для эндпоинтов .../bulk/, каждая пачка пишется в своей транзакции
+API_BULK_BATCH_SIZE = int(os.getenv('API_BULK_BATCH_SIZE', default=1000))
+
+# Строк на выборку курсора и на фрагмент ответа в /api/v1/export/
+API_EXPORT_CHUNK_SIZE = int(os.getenv('API_EXPORT_CHUNK_SIZE', default=2000))
+
+# Сбор времени и числа SQL-запросов по эндпоинтам, см. /api/v1/stats/
+API_REQUEST_STATS = os.getenv('API_REQUEST_STATS', default='False') == 'True'
+
+# Ответы JSON меньше этого размера в байтах отдаются без сжатия
+API_GZIP_MIN_SIZE = int(os.getenv('API_GZIP_MIN_SIZE', default=1024))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +142,8 @@ STATIC_URL = '/static/'
 # STATICFILES_DIRS необходимо закомментировать или удалить
 # STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic сохраняет рядом с файлами сжатые копии .gz для nginx
+STATICFILES_STORAGE = 'api_yamdb.storage.GzipStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -109,13 +152,13 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static/'),)
 
-# SEED_DIR = os.path.join(BASE_DIR, 'static/data/')
+SEED_DIR = os.path.join(BASE_DIR, 'static/data/')
 
 
 AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
@@ -0,0 +1,46 @@
+import gzip
+import os
+import shutil
+
+from django.contrib.staticfiles.storage import StaticFilesStorage
+
+# Расширения текстовых файлов, которые имеет смысл сжимать
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+    '.ttf', '.eot', '.otf',
+)
+# Файлы меньше этого размера nginx отдаёт быстрее без сжатия
+MIN_SIZE = 256
+
+
+class GzipStaticFilesStorage(StaticFilesStorage):
+    '''Сохраняет рядом с собранной статикой копии .gz для gzip_static nginx
+
+    Сжатие выполняется один раз при collectstatic, копия обновляется,
+    только если исходный файл новее. Время изменения копии совпадает
+    с исходным, чтобы nginx отдавал одинаковые Last-Modified и ETag.
+    '''
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name in paths:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = self.path(name)
+            compressed = f'{path}.gz'
+            stat = os.stat(path)
+            if stat.st_size < MIN_SIZE or (
+                os.path.exists(compressed)
+                and os.stat(compressed).st_mtime >= stat.st_mtime
+            ):
+                continue
+            with open(path, 'rb') as source, gzip.GzipFile(
+                compressed, 'wb', compresslevel=9, mtime=stat.st_mtime
+            ) as target:
+                shutil.copyfileobj(source, target)
+            if os.stat(compressed).st_size >= stat.st_size:
+                os.remove(compressed)
+                continue
+            os.utime(compressed, (stat.st_atime, stat.st_mtime))
+            yield name, f'{name}.gz', True
@@ -0,0 +1,114 @@
+'''Настройки gunicorn для контейнера web
+
+Число воркеров и потоков считается по доступным процессору ядрам с
+учётом cpuset и квоты cgroup контейнера. Любое значение можно задать
+переменной среды GUNICORN_*.
+'''
+import math
+import os
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def cgroup_cpu_limit():
+    '''Квота процессора cgroup v2 или v1 в ядрах, None без ограничения'''
+    sources = (
+        ('/sys/fs/cgroup/cpu.max', None),
+        (
+            '/sys/fs/cgroup/cpu/cpu.cfs_quota_us',
+            '/sys/fs/cgroup/cpu/cpu.cfs_period_us',
+        ),
+    )
+    for quota_path, period_path in sources:
+        try:
+            with open(quota_path) as f:
+                values = f.read().split()
+            if period_path is not None:
+                with open(period_path) as f:
+                    values.append(f.read().strip())
+        except OSError:
+            continue
+        quota, period = values[0], values[1]
+        if quota in ('max', '-1'):
+            return None
+        return max(1, math.ceil(int(quota) / int(period)))
+    return None
+
+
+def available_cpus():
+    '''Ядра, на которых процесс может выполняться'''
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    return min(cpus, limit) if limit else cpus
+
+
+CPUS = env_int('GUNICORN_CPUS', available_cpus())
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# gthread: потоки воркера ждут БД параллельно, память процесса общая.
+# Для sync каждый запрос занимает процесс, поэтому процессов больше.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = env_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+workers = env_int(
+    'GUNICORN_WORKERS',
+    CPUS + 1 if worker_class == 'gthread' else CPUS * 2 + 1
+)
+
+# Версии кэша ответов сдвигаются cache.incr(). LocMemCache у каждого
+# процесса свой: сброс кэша и отзыв токенов в одном воркере не видны
+# остальным. incr FileBasedCache читает и пишет файл без блокировки,
+# и одновременные сбросы теряются.
+cache_backend = os.getenv(
+    'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+)
+if workers > 1 and cache_backend.endswith('.LocMemCache'):
+    raise RuntimeError(
+        f'{workers} воркеров gunicorn с LocMemCache не видят изменений '
+        f'кэша друг друга. Задайте общий CACHE_BACKEND или '
+        f'GUNICORN_WORKERS=1'
+    )
+if cache_backend.endswith('.FileBasedCache'):
+    raise RuntimeError(
+        'incr() FileBasedCache не атомарен, сбросы кэша ответов теряются. '
+        'Задайте CACHE_BACKEND с атомарным incr(): Memcached или Redis'
+    )
+
+# Приложение импортируется до fork, код и данные делятся между
+# воркерами копированием при записи
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+# Перезапуск воркера после max_requests запросов ограничивает утечки
+# памяти, разброс не даёт всем воркерам перезапуститься одновременно
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env_int(
+    'GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10
+)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    '''Соединения с БД мастера нельзя делить между воркерами'''
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def on_starting(server):
+    server.log.info(
+        '%s CPU: %s воркеров %s по %s потоков', CPUS, server.cfg.workers,
+        server.cfg.worker_class_str, server.cfg.threads
+    )
@@ -26,9 +26,10 @@ class GenresAdmin(admin.ModelAdmin):
 class TitleAdmin(admin.ModelAdmin):
     list_display = (
         'pk', 'name', 'year',
-        'description',
+        'description', 'rating', 'review_count',
     )
     list_editable = ('name', 'year')
+    readonly_fields = ('rating', 'review_count', 'score_sum')
     search_fields = ('name', 'year')
 
 
@@ -0,0 +1,46 @@
+from django.db.models import BigIntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Genres, Title
+
+TitleGenre = Title.genre.through
+
+
+def titles_with_mask(mask):
+    '''Произведения, в маске которых есть бит жанра'''
+    return Title.objects.filter(genre_mask__has_bits=mask)
+
+
+def mask_of(genres):
+    '''Маска произведения по его жанрам, жанры без бита не учитываются'''
+    return sum(genre.mask or 0 for genre in genres)
+
+
+def recalculate_genre_masks(titles=None, **fields):
+    '''Пересчитывает маски жанров произведений по связи с жанрами
+
+    fields обновляются тем же запросом, например дата изменения.
+    '''
+    if titles is None:
+        titles = Title.objects.all()
+    masks = TitleGenre.objects.filter(
+        title=OuterRef('pk'), genres__mask__isnull=False
+    ).order_by().values('title').annotate(
+        mask=Sum('genres__mask', output_field=BigIntegerField())
+    ).values('mask')
+    return titles.update(
+        genre_mask=Coalesce(Subquery(masks), Value(0)), **fields
+    )
+
+
+def assign_genre_masks():
+    '''Выдаёт биты жанрам, созданным в обход save(), и пересчитывает маски'''
+    genres = list(Genres.objects.filter(mask=None).order_by('pk'))
+    assigned = []
+    for genre, mask in zip(genres, Genres.free_masks()):
+        genre.mask = mask
+        assigned.append(genre)
+    if assigned:
+        Genres.objects.bulk_update(assigned, ['mask'])
+        recalculate_genre_masks(Title.objects.filter(genre__in=assigned))
+    return len(assigned)
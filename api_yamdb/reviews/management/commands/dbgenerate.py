@@ -0,0 +1,302 @@
+import csv
+import datetime as dt
+import os
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from reviews.management.commands.dbseed import Command as DbseedCommand
+from reviews.models import Categories, Comments, Genres, Review, Title
+
+User = get_user_model()
+TitleGenre = Title.genre.through
+
+CATEGORIES = (
+    ('Фильм', 'movie'), ('Книга', 'book'), ('Музыка', 'music'),
+    ('Сериал', 'series'), ('Игра', 'game'),
+)
+GENRES = (
+    ('Драма', 'drama'), ('Комедия', 'comedy'), ('Вестерн', 'western'),
+    ('Фэнтези', 'fantasy'), ('Фантастика', 'sci-fi'),
+    ('Детектив', 'detective'), ('Триллер', 'thriller'),
+    ('Сказка', 'tale'), ('Гонзо', 'gonzo'), ('Роман', 'roman'),
+    ('Баллада', 'ballad'), ('Рок-н-ролл', 'rock-n-roll'),
+    ('Классика', 'classical'), ('Рок', 'rock'), ('Шансон', 'chanson'),
+)
+ADJECTIVES = (
+    'Белый', 'Тихий', 'Последний', 'Зелёный', 'Далёкий', 'Железный',
+    'Золотой', 'Старый', 'Ночной', 'Северный', 'Странный', 'Красный',
+    'Одинокий', 'Большой', 'Новый', 'Тёмный', 'Вечный', 'Первый',
+    'Забытый', 'Летний', 'Морской', 'Горный', 'Синий', 'Дикий',
+)
+NOUNS = (
+    'ветер', 'город', 'путь', 'берег', 'сад', 'дом', 'мост', 'лес',
+    'остров', 'поезд', 'маяк', 'ключ', 'снег', 'огонь', 'час', 'голос',
+    'корабль', 'рассвет', 'сон', 'шторм', 'вальс', 'край', 'след', 'дождь',
+)
+SENTENCES = (
+    'Смотрел на одном дыхании.', 'Сюжет предсказуем, но актёры хороши.',
+    'Перечитываю каждый год.', 'Не понял, почему все так хвалят.',
+    'Музыка великолепна.', 'Слишком затянуто во второй половине.',
+    'Финал оставил сильное впечатление.', 'Рекомендую друзьям.',
+    'Ожидал большего.', 'Классика, которую нужно знать.',
+    'Полностью согласен.', 'Не соглашусь с автором отзыва.',
+)
+DATES_START = dt.datetime(2010, 1, 1, tzinfo=dt.timezone.utc)
+DATES_SPAN = dt.timedelta(days=365 * 12)
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда для генерации большого синтетического набора данных. '
+        'Данные детерминированы зерном --seed, популярность произведений '
+        'распределена по закону Ципфа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=3)
+        parser.add_argument('--genres', type=int, default=15)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Показатель Ципфа для популярности произведений'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--progress-every', type=int, default=100000)
+        parser.add_argument(
+            '--csv',
+            metavar='DIR',
+            help=(
+                'Записать CSV-файлы в формате dbseed в каталог DIR '
+                'вместо записи в базу данных'
+            )
+        )
+
+    def handle(self, *args, **options):
+        if options['categories'] > len(CATEGORIES):
+            raise CommandError(
+                f'Можно сгенерировать не больше {len(CATEGORIES)} категорий'
+            )
+        if options['genres'] > len(GENRES):
+            raise CommandError(
+                f'Можно сгенерировать не больше {len(GENRES)} жанров'
+            )
+        if options['users'] < 1 or options['titles'] < 1:
+            raise CommandError(
+                'Нужен хотя бы один пользователь и одно произведение'
+            )
+
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.to_csv = options['csv'] is not None
+        self.start_ids = self.get_start_ids()
+
+        self.write('users', self.generate_users())
+        self.category_ids = self.write_lookup(
+            'category', Categories, CATEGORIES[:options['categories']]
+        )
+        self.genre_ids = self.write_lookup(
+            'genre', Genres, GENRES[:options['genres']]
+        )
+        review_counts = self.get_review_counts()
+        first_review = self.start_ids['review']
+        self.reviews_range = (first_review, first_review + sum(review_counts))
+        self.write('titles', self.generate_titles())
+        self.write('genre_title', self.generate_genre_titles())
+        self.write('review', self.generate_reviews(review_counts))
+        self.write('comments', self.generate_comments())
+
+    def get_start_ids(self):
+        '''Первые свободные id таблиц, чтобы не пересечься с данными БД'''
+        models = {
+            'users': User, 'titles': Title, 'genre_title': TitleGenre,
+            'review': Review, 'comments': Comments,
+        }
+        if self.to_csv:
+            return {table: 1 for table in models}
+        return {
+            table: (model.objects.aggregate(max_id=Max('pk'))['max_id']
+                    or 0) + 1
+            for table, model in models.items()
+        }
+
+    def write(self, table, rows):
+        if self.to_csv:
+            self.write_csv(table, rows)
+            return
+
+        self.stdout.write(
+            self.style.MIGRATE_LABEL(f'Генерация {table}')
+        )
+        seeder = DbseedCommand(stdout=self.stdout, stderr=self.stderr)
+        getattr(seeder, f'bulk_seed_{table}')(
+            rows, self.options['batch_size'], self.options['progress_every']
+        )
+
+    def write_csv(self, table, rows):
+        os.makedirs(self.options['csv'], exist_ok=True)
+        path = os.path.join(self.options['csv'], f'{table}.csv')
+        with open(path, 'w', newline='') as f:
+            writer = None
+            count = 0
+            for row in rows:
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'{path}: записано {count} строк')
+        )
+
+    def write_lookup(self, table, model, items):
+        '''Категории и жанры: в БД переиспользуются уже существующие'''
+        if not self.to_csv:
+            existing = dict(model.objects.values_list('slug', 'pk'))
+            if existing:
+                return list(existing.values())
+            start = (model.objects.aggregate(max_id=Max('pk'))['max_id']
+                     or 0) + 1
+        else:
+            start = 1
+        rows = [
+            {'id': start + i, 'name': name, 'slug': slug}
+            for i, (name, slug) in enumerate(items)
+        ]
+        self.write(table, rows)
+        return [row['id'] for row in rows]
+
+    def generate_users(self):
+        start = self.start_ids['users']
+        roles = ('user',) * 18 + ('moderator', 'admin')
+        for user_id in range(start, start + self.options['users']):
+            yield {
+                'id': user_id,
+                'username': f'synthetic{user_id}',
+                'email': f'synthetic{user_id}@yamdb.fake',
+                'role': self.rng.choice(roles),
+                'bio': '',
+                'first_name': '',
+                'last_name': '',
+            }
+
+    def get_review_counts(self):
+        '''Число отзывов на произведение по закону Ципфа
+
+        Одно произведение не может получить больше отзывов, чем есть
+        пользователей, излишек переходит к следующим произведениям.
+        '''
+        titles, users = self.options['titles'], self.options['users']
+        weights = [1 / rank ** self.options['skew']
+                   for rank in range(1, titles + 1)]
+        total_weight = sum(weights)
+        left = min(self.options['reviews'], titles * users)
+        counts = []
+        for index, weight in enumerate(weights):
+            share = weight / total_weight
+            total_weight -= weight
+            count = left if index == titles - 1 else round(left * share)
+            count = min(count, users, left)
+            counts.append(count)
+            left -= count
+        return counts
+
+    def generate_titles(self):
+        start = self.start_ids['titles']
+        used = set()
+        if not self.to_csv:
+            used = set(Title.objects.values_list('name', 'year'))
+        max_year = dt.date.today().year
+        for title_id in range(start, start + self.options['titles']):
+            year = self.rng.randint(1900, max_year)
+            base = (
+                f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)}'
+            )
+            name, suffix = base, 1
+            while (name, year) in used:
+                suffix += 1
+                name = f'{base} {suffix}'
+            used.add((name, year))
+            yield {
+                'id': title_id,
+                'name': name,
+                'year': year,
+                'category': self.rng.choice(self.category_ids),
+            }
+
+    def generate_genre_titles(self):
+        row_id = self.start_ids['genre_title']
+        start = self.start_ids['titles']
+        weights = [1 / rank for rank in range(1, len(self.genre_ids) + 1)]
+        for title_id in range(start, start + self.options['titles']):
+            genres = set(self.rng.choices(
+                self.genre_ids, weights=weights, k=self.rng.randint(1, 3)
+            ))
+            for genre_id in sorted(genres):
+                yield {
+                    'id': row_id,
+                    'title_id': title_id,
+                    'genre_id': genre_id,
+                }
+                row_id += 1
+
+    def generate_reviews(self, review_counts):
+        review_id = self.start_ids['review']
+        user_start = self.start_ids['users']
+        total = max(sum(review_counts), 1)
+        for index, count in enumerate(review_counts):
+            title_id = self.start_ids['titles'] + index
+            quality = self.rng.uniform(3, 9)
+            authors = self.rng.sample(range(self.options['users']), count)
+            for author in authors:
+                score = round(self.rng.gauss(quality, 1.5))
+                yield {
+                    'id': review_id,
+                    'title_id': title_id,
+                    'text': self.get_text(),
+                    'author': user_start + author,
+                    'score': min(max(score, 1), 10),
+                    'pub_date': self.get_date(
+                        review_id - self.start_ids['review'], total
+                    ),
+                }
+                review_id += 1
+
+    def generate_comments(self):
+        first, end = self.reviews_range
+        reviews = end - first
+        if not reviews:
+            return
+        user_start = self.start_ids['users']
+        comment_id = self.start_ids['comments']
+        for _ in range(self.options['comments']):
+            # Логарифмически равномерный номер: отзывы популярных
+            # произведений идут первыми и получают больше комментариев.
+            offset = int(reviews ** self.rng.random()) - 1
+            yield {
+                'id': comment_id,
+                'review_id': first + offset,
+                'text': self.get_text(),
+                'author': user_start + self.rng.randrange(
+                    self.options['users']
+                ),
+                'pub_date': self.get_date(offset, reviews, lag=True),
+            }
+            comment_id += 1
+
+    def get_text(self):
+        return ' '.join(self.rng.sample(SENTENCES, self.rng.randint(1, 3)))
+
+    def get_date(self, position, total, lag=False):
+        date = DATES_START + DATES_SPAN * (position / total)
+        if lag:
+            date += dt.timedelta(seconds=self.rng.randint(0, 30 * 86400))
+        return date.isoformat()
@@ -2,14 +2,62 @@ import copy
 import csv
 import os
 import re
+import time
+from contextlib import contextmanager
+from itertools import islice
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
 
+from api.cache import bump_versions
+from reviews.genre_masks import assign_genre_masks, recalculate_genre_masks
 from reviews.models import Categories, Comments, Genres, Review, Title
+from reviews.ratings import recalculate_ratings
 
 User = get_user_model()
+TitleGenre = Title.genre.through
+
+TABLES_ORDER = [
+    'users', 'category', 'genre', 'titles', 'genre_title', 'review',
+    'comments'
+]
+TABLE_MODELS = {
+    'users': User, 'category': Categories, 'genre': Genres, 'titles': Title,
+    'genre_title': TitleGenre, 'review': Review, 'comments': Comments,
+}
+
+
+@contextmanager
+def csv_dates(model):
+    '''Сохраняет даты из CSV: auto_now_add и auto_now перезаписали бы их'''
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def reset_sequences(*models):
+    '''Сдвигает последовательности id за максимальный id таблиц
+
+    Строки сидов вставляются с явными id, и без сдвига следующая
+    вставка через ORM на PostgreSQL получит уже занятый id.
+    '''
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
 
 
 class Command(BaseCommand):
@@ -29,6 +77,29 @@ class Command(BaseCommand):
                 'аргументе "__all__" применяются все файлы'
             )
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help=(
+                'Загружать записи пачками через bulk_create '
+                'в одной транзакции на таблицу'
+            )
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create (по умолчанию 1000)'
+        )
+        parser.add_argument(
+            '--progress-every',
+            type=int,
+            default=10000,
+            help=(
+                'Как часто выводить прогресс в режиме --bulk, '
+                'в строках (по умолчанию 10000)'
+            )
+        )
 
     def handle(self, *args, **options):
         tables_len = len(options['tables'])
@@ -36,9 +107,7 @@ class Command(BaseCommand):
 
         tables = []
         if tables_len == 1 and options['tables'][0] == '__all__':
-            tables = [
-                'users', 'category', 'genre', 'titles', 'review', 'comments'
-            ]
+            tables = copy.copy(TABLES_ORDER)
         else:
             tables = copy.deepcopy(options['tables'])
 
@@ -53,11 +122,13 @@ class Command(BaseCommand):
                 continue
 
             seed_method = f'seed_{table}'
+            if options['bulk']:
+                seed_method = f'bulk_seed_{table}'
             if not hasattr(self, seed_method):
                 self.stdout.write(
                     self.style.ERROR(
                         'Для команды dbseed не определен '
-                        f'метод seed_{table}'
+                        f'метод {seed_method}'
                     )
                 )
                 continue
@@ -67,7 +138,14 @@ class Command(BaseCommand):
                     f'Выполнение сида {table}'
                 )
             )
-            getattr(self, seed_method)(self.get_csv_file(table))
+            rows = self.get_csv_rows(table)
+            if options['bulk']:
+                getattr(self, seed_method)(
+                    rows, options['batch_size'], options['progress_every']
+                )
+            else:
+                getattr(self, seed_method)(rows)
+                reset_sequences(TABLE_MODELS[table])
 
     def seed_users(self, users):
         for user in users:
@@ -205,8 +283,40 @@ class Command(BaseCommand):
                     )
                 )
 
-    def seed_genre_title(self, titles):
-        pass
+    def seed_genre_title(self, genre_titles):
+        for genre_title in genre_titles:
+            try:
+                if TitleGenre.objects.filter(pk=genre_title['id']).exists():
+                    self.stdout.write(
+                        self.style.WARNING(
+                            (
+                                'Не удалось создать запись genre_title %s. '
+                                'Запись с таким id уже существует.'
+                            ) % genre_title['id']
+                        )
+                    )
+                    continue
+
+                TitleGenre.objects.create(
+                    id=genre_title['id'],
+                    title_id=genre_title['title_id'],
+                    genres_id=genre_title['genre_id']
+                )
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        'Запись genre_title %s успешно создана'
+                        % genre_title['id']
+                    )
+                )
+            except Exception:
+                self.stdout.write(
+                    self.style.ERROR(
+                        'Не удалось создать запись genre_title %s'
+                        % genre_title['id']
+                    )
+                )
+        recalculate_genre_masks()
+        bump_versions('titles')
 
     def seed_review(self, reviews):
         for review in reviews:
@@ -222,14 +332,16 @@ class Command(BaseCommand):
                     )
                     continue
 
-                new_review = Review.objects.create(
-                    id=review['id'],
-                    author_id=review['author'],
-                    title_id=review['title_id'],
-                    text=review['text'],
-                    score=review['score'],
-                    pub_date=review['pub_date']
-                )
+                with csv_dates(Review):
+                    new_review = Review.objects.create(
+                        id=review['id'],
+                        author_id=review['author'],
+                        title_id=review['title_id'],
+                        text=review['text'],
+                        score=review['score'],
+                        pub_date=review['pub_date'],
+                        updated=review['pub_date']
+                    )
                 self.stdout.write(
                     self.style.SUCCESS(
                         'Запись review "%s" успешно создана'
@@ -258,13 +370,15 @@ class Command(BaseCommand):
                     )
                     continue
 
-                new_comment = Comments.objects.create(
-                    id=comment['id'],
-                    author_id=comment['author'],
-                    review_id=comment['review_id'],
-                    text=comment['text'],
-                    pub_date=comment['pub_date']
-                )
+                with csv_dates(Comments):
+                    new_comment = Comments.objects.create(
+                        id=comment['id'],
+                        author_id=comment['author'],
+                        review_id=comment['review_id'],
+                        text=comment['text'],
+                        pub_date=comment['pub_date'],
+                        updated=comment['pub_date']
+                    )
                 self.stdout.write(
                     self.style.SUCCESS(
                         'Запись comment "%s" успешно создана'
@@ -298,29 +412,149 @@ class Command(BaseCommand):
 
         return tables
 
-    def get_csv_file(self, filename):
-        '''Получение содержимого CSV файла'''
+    def get_csv_rows(self, filename):
+        '''Построчно читает CSV файл, не загружая его целиком'''
         if filename is None:
             raise CommandError('Не указано название CSV-файла сида')
 
         file = f'{settings.SEED_DIR}/{filename}.csv'
-        table = []
         with open(file, newline='') as f:
-            reader = csv.reader(f)
-            coll = 0
-            fields = {}
-            for row in reader:
-                if coll == 0:
-                    for i in range(len(row)):
-                        fields[i] = row[i]
-                else:
-                    row_data = {}
-                    for i in range(len(row)):
-                        if i not in fields:
+            yield from csv.DictReader(f)
+
+    def bulk_seed_users(self, rows, batch_size, progress_every):
+        self.bulk_seed('users', User, rows, lambda user: User(
+            id=user['id'],
+            username=user['username'],
+            email=user['email'],
+            role=user['role'],
+            bio=user['bio'],
+            first_name=user['first_name'],
+            last_name=user['last_name']
+        ), batch_size, progress_every)
+
+    def bulk_seed_category(self, rows, batch_size, progress_every):
+        self.bulk_seed('category', Categories, rows, lambda category: (
+            Categories(
+                id=category['id'],
+                name=category['name'],
+                slug=category['slug']
+            )
+        ), batch_size, progress_every)
+        bump_versions('categories', 'titles', 'autocomplete')
+
+    def bulk_seed_genre(self, rows, batch_size, progress_every):
+        self.bulk_seed('genre', Genres, rows, lambda genre: Genres(
+            id=genre['id'],
+            name=genre['name'],
+            slug=genre['slug']
+        ), batch_size, progress_every)
+        assign_genre_masks()
+        bump_versions('genres', 'titles', 'autocomplete')
+
+    def bulk_seed_titles(self, rows, batch_size, progress_every):
+        self.bulk_seed('titles', Title, rows, lambda title: Title(
+            id=title['id'],
+            name=title['name'],
+            year=title['year'],
+            category_id=title['category'] or None
+        ), batch_size, progress_every)
+        bump_versions('titles', 'autocomplete')
+
+    def bulk_seed_genre_title(self, rows, batch_size, progress_every):
+        self.bulk_seed('genre_title', TitleGenre, rows, lambda genre_title: (
+            TitleGenre(
+                id=genre_title['id'],
+                title_id=genre_title['title_id'],
+                genres_id=genre_title['genre_id']
+            )
+        ), batch_size, progress_every)
+        recalculate_genre_masks()
+        bump_versions('titles')
+
+    def bulk_seed_review(self, rows, batch_size, progress_every):
+        with csv_dates(Review):
+            self.bulk_seed('review', Review, rows, lambda review: Review(
+                id=review['id'],
+                author_id=review['author'],
+                title_id=review['title_id'],
+                text=review['text'],
+                score=review['score'],
+                pub_date=review['pub_date'],
+                updated=review['pub_date']
+            ), batch_size, progress_every)
+        recalculate_ratings()
+        bump_versions('titles')
+
+    def bulk_seed_comments(self, rows, batch_size, progress_every):
+        with csv_dates(Comments):
+            self.bulk_seed('comments', Comments, rows, lambda comment: (
+                Comments(
+                    id=comment['id'],
+                    author_id=comment['author'],
+                    review_id=comment['review_id'],
+                    text=comment['text'],
+                    pub_date=comment['pub_date'],
+                    updated=comment['pub_date']
+                )
+            ), batch_size, progress_every)
+
+    def bulk_seed(self, table, model, rows, build, batch_size,
+                  progress_every):
+        '''Загружает таблицу пачками, пропуская уже существующие id'''
+        existing = set(model.objects.values_list('pk', flat=True))
+        started = time.monotonic()
+        created = skipped = reported = 0
+        try:
+            with transaction.atomic():
+                for chunk in self.get_batches(rows, batch_size):
+                    batch = []
+                    for row in chunk:
+                        obj = build(row)
+                        obj.pk = int(obj.pk)
+                        if obj.pk in existing:
+                            skipped += 1
                             continue
-                        row_data[fields[i]] = row[i]
-                    table.append(row_data)
+                        existing.add(obj.pk)
+                        batch.append(obj)
+                    model.objects.bulk_create(batch)
+                    created += len(batch)
+                    if created + skipped - reported >= progress_every:
+                        reported = created + skipped
+                        self.write_progress(table, created, skipped, started)
+                reset_sequences(model)
+        except (DatabaseError, ValueError) as error:
+            self.stdout.write(
+                self.style.ERROR(
+                    f'Не удалось загрузить таблицу {table}: {error}. '
+                    'Изменения таблицы отменены'
+                )
+            )
+            return
 
-                coll += 1
+        if created + skipped != reported:
+            self.write_progress(table, created, skipped, started)
+        if skipped:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Пропущено {skipped} записей {table}: '
+                    'записи с такими id уже существуют'
+                )
+            )
 
-        return table
+    def get_batches(self, rows, batch_size):
+        '''Разбивает поток строк на списки по batch_size'''
+        rows = iter(rows)
+        batch = list(islice(rows, batch_size))
+        while batch:
+            yield batch
+            batch = list(islice(rows, batch_size))
+
+    def write_progress(self, table, created, skipped, started):
+        elapsed = time.monotonic() - started
+        rate = (created + skipped) / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{table}: создано {created}, пропущено {skipped}, '
+                f'{rate:.0f} строк/с, {elapsed:.1f} с'
+            )
+        )
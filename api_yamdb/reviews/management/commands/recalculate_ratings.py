@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import Title
+from reviews.ratings import recalculate_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        'Команда для пересчёта рейтинга и количества отзывов произведений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'title_ids',
+            nargs='*',
+            type=int,
+            help=(
+                'id произведений для пересчёта. Без аргументов '
+                'пересчитываются все произведения'
+            )
+        )
+
+    def handle(self, *args, **options):
+        titles = Title.objects.all()
+        if options['title_ids']:
+            titles = titles.filter(pk__in=options['title_ids'])
+
+        updated = recalculate_ratings(titles)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Рейтинг пересчитан для {updated} произведений'
+            )
+        )
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_pub_date_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comments',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения комментария'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения отзыва'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения произведения'),
+        ),
+    ]
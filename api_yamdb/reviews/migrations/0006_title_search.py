@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:55
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_SEARCH = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    '''
+    CREATE OR REPLACE FUNCTION reviews_title_search_vector() RETURNS trigger
+    AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', translate(
+                coalesce(NEW.name, ''), 'Ёё', 'Ее')), 'A')
+            || setweight(to_tsvector('russian', translate(
+                coalesce(NEW.description, ''), 'Ёё', 'Ее')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER reviews_title_search_vector_update
+    BEFORE INSERT OR UPDATE ON reviews_title
+    FOR EACH ROW EXECUTE PROCEDURE reviews_title_search_vector()
+    ''',
+    'UPDATE reviews_title SET search_vector = NULL',
+    '''
+    CREATE INDEX title_search_vector_idx
+    ON reviews_title USING GIN (search_vector)
+    ''',
+    '''
+    CREATE INDEX title_name_trgm_idx
+    ON reviews_title USING GIN (name gin_trgm_ops)
+    ''',
+    # Фильтр name=... (icontains) сравнивает UPPER(name) через LIKE
+    '''
+    CREATE INDEX title_name_upper_trgm_idx
+    ON reviews_title USING GIN (UPPER(name::text) gin_trgm_ops)
+    ''',
+)
+DROP_SEARCH = (
+    'DROP INDEX IF EXISTS title_name_upper_trgm_idx',
+    'DROP INDEX IF EXISTS title_name_trgm_idx',
+    'DROP INDEX IF EXISTS title_search_vector_idx',
+    'DROP TRIGGER IF EXISTS reviews_title_search_vector_update '
+    'ON reviews_title',
+    'DROP FUNCTION IF EXISTS reviews_title_search_vector()',
+)
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_updated_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SEARCH), run_on_postgresql(DROP_SEARCH)
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+# Фильтр genre__slug идёт от жанра к произведениям, а индекс Django
+# по связи (title_id, genres_id) начинается с произведения
+CREATE_TITLE_GENRE_INDEX = '''
+CREATE INDEX title_genre_genre_title_idx
+    ON reviews_title_genre (genres_id, title_id);
+'''
+DROP_TITLE_GENRE_INDEX = 'DROP INDEX title_genre_genre_title_idx;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comments',
+            index=models.Index(fields=['review', 'id'], name='comment_review_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', 'id'], name='review_title_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['-year', 'id'], name='title_year_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', '-year', 'id'], name='title_category_year_id_idx'),
+        ),
+        migrations.RunSQL(CREATE_TITLE_GENRE_INDEX, DROP_TITLE_GENRE_INDEX),
+    ]
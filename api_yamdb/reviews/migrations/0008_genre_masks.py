@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:13
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+import reviews.models
+
+MASK_BITS = 63
+
+
+def fill_genre_masks(apps, schema_editor):
+    Genres = apps.get_model('reviews', 'Genres')
+    Title = apps.get_model('reviews', 'Title')
+    TitleGenre = Title.genre.through
+    genres = list(Genres.objects.order_by('pk')[:MASK_BITS])
+    for bit, genre in enumerate(genres):
+        genre.mask = 1 << bit
+    Genres.objects.bulk_update(genres, ['mask'])
+    masks = TitleGenre.objects.filter(
+        title=OuterRef('pk'), genres__mask__isnull=False
+    ).order_by().values('title').annotate(
+        mask=Sum('genres__mask', output_field=BigIntegerField())
+    ).values('mask')
+    Title.objects.update(genre_mask=Coalesce(Subquery(masks), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genres',
+            name='mask',
+            field=models.BigIntegerField(editable=False, null=True, unique=True, verbose_name='Бит жанра в масках произведений'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='genre_mask',
+            field=reviews.models.BitMaskField(default=0, editable=False, verbose_name='Маска жанров'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['genre_mask'], name='title_genre_mask_idx'),
+        ),
+        migrations.RunPython(fill_genre_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:12
+
+from django.db import migrations
+
+# B-tree по genre_mask не помогает условию (genre_mask & x) = x. На
+# PostgreSQL маска раскладывается в массив номеров битов, и фильтр по
+# жанрам сравнивает массивы (@>, &&) по GIN-индексу этого выражения
+CREATE_GENRE_BITS = (
+    '''
+    CREATE OR REPLACE FUNCTION reviews_mask_bits(mask bigint)
+    RETURNS integer[]
+    AS $$
+        SELECT coalesce(array_agg(n ORDER BY n), '{}')
+        FROM generate_series(0, 62) AS n
+        WHERE mask & (1::bigint << n) <> 0
+    $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    ''',
+    '''
+    CREATE INDEX title_genre_bits_idx
+    ON reviews_title USING GIN (reviews_mask_bits(genre_mask))
+    ''',
+)
+DROP_GENRE_BITS = (
+    'DROP INDEX IF EXISTS title_genre_bits_idx',
+    'DROP FUNCTION IF EXISTS reviews_mask_bits(bigint)',
+)
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_genre_masks'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_genre_mask_idx',
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_GENRE_BITS),
+            run_on_postgresql(DROP_GENRE_BITS)
+        ),
+    ]
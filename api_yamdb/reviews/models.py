@@ -1,9 +1,95 @@
+import threading
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 User = get_user_model()
 
 
+class TitleDeletion(threading.local):
+    '''Произведения, которые удаляет delete() в текущем потоке
+
+    Отзывы удаляются каскадом раньше произведения, поэтому пересчитывать
+    его рейтинг по каждому удалённому отзыву незачем.
+    '''
+
+    def __init__(self):
+        self.stack = []
+
+    @contextmanager
+    def active(self):
+        self.stack.append(set())
+        try:
+            yield
+        finally:
+            self.stack.pop()
+
+    def add(self, pk):
+        if self.stack:
+            self.stack[-1].add(pk)
+
+    def __contains__(self, pk):
+        return any(pk in deleting for deleting in self.stack)
+
+
+title_deletion = TitleDeletion()
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def delete(self):
+        with title_deletion.active():
+            return super().delete()
+
+
+class BitMaskField(models.BigIntegerField):
+    '''Набор битов в BIGINT с проверкой вида mask__has_bits=биты'''
+
+
+# Функция PostgreSQL: номера битов маски массивом, по ней строится
+# GIN-индекс title_genre_bits_idx (миграция 0009)
+MASK_BITS_FUNCTION = 'reviews_mask_bits'
+
+
+@BitMaskField.register_lookup
+class HasBits(models.Lookup):
+    '''В маске есть все биты правой части'''
+    lookup_name = 'has_bits'
+    array_operator = '@>'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (
+            f'({lhs} & {rhs}) = {rhs}',
+            [*lhs_params, *rhs_params, *rhs_params]
+        )
+
+    def as_postgresql(self, compiler, connection):
+        '''Сравнение массивов битов, которое может пройти по GIN-индексу'''
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (
+            f'{MASK_BITS_FUNCTION}({lhs}) {self.array_operator} '
+            f'{MASK_BITS_FUNCTION}({rhs})',
+            [*lhs_params, *rhs_params]
+        )
+
+
+@BitMaskField.register_lookup
+class HasAnyBits(HasBits):
+    '''В маске есть хотя бы один бит правой части'''
+    lookup_name = 'has_any_bits'
+    array_operator = '&&'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'({lhs} & {rhs}) <> 0', [*lhs_params, *rhs_params]
+
+
 class Categories(models.Model):
     name = models.CharField(
         max_length=256,
@@ -25,6 +111,9 @@ class Categories(models.Model):
 
 
 class Genres(models.Model):
+    # Старший бит BIGINT знаковый, без него маска всегда положительна
+    MASK_BITS = 63
+
     name = models.CharField(
         max_length=256,
         verbose_name='Название жанра')
@@ -33,6 +122,13 @@ class Genres(models.Model):
         max_length=50,
         verbose_name='Slug жанра'
     )
+    # Пусто, если жанр создан, когда свободных битов не осталось
+    mask = models.BigIntegerField(
+        null=True,
+        unique=True,
+        editable=False,
+        verbose_name='Бит жанра в масках произведений'
+    )
 
     class Meta:
         ordering = ['id']
@@ -42,8 +138,27 @@ class Genres(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        '''Новый жанр получает свободный бит маски'''
+        if self._state.adding and self.mask is None:
+            self.mask = next(self.free_masks(), None)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def free_masks(cls):
+        used = set(
+            cls.objects.exclude(mask=None).values_list('mask', flat=True)
+        )
+        return (
+            1 << bit for bit in range(cls.MASK_BITS)
+            if 1 << bit not in used
+        )
+
 
 class Title(models.Model):
+    RATING_FIELDS = ('rating', 'review_count', 'score_sum')
+    DATABASE_FIELDS = RATING_FIELDS + ('search_vector', 'genre_mask')
+
     name = models.CharField(
         max_length=256,
         db_index=True,
@@ -65,11 +180,51 @@ class Title(models.Model):
         related_name='titles', blank=False, null=True,
         verbose_name='Категория'
     )
+    rating = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Рейтинг'
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество отзывов'
+    )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Сумма оценок'
+    )
+    updated = models.DateTimeField(
+        'Дата изменения произведения',
+        auto_now=True
+    )
+    # Сумма масок жанров, ведётся сигналами связи с жанрами
+    genre_mask = BitMaskField(
+        default=0,
+        editable=False,
+        verbose_name='Маска жанров'
+    )
+    # Заполняется триггером PostgreSQL из названия и описания
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         ordering = ['-year']
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        indexes = [
+            models.Index(fields=['-year', 'id'], name='title_year_id_idx'),
+            models.Index(
+                fields=['category', '-year', 'id'],
+                name='title_category_year_id_idx'
+            ),
+            # Выгрузка изменённых с updated_since
+            models.Index(fields=['updated'], name='title_updated_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['name', 'year'],
@@ -80,8 +235,24 @@ class Title(models.Model):
     def __str__(self):
         return self.name
 
+    def delete(self, *args, **kwargs):
+        with title_deletion.active():
+            return super().delete(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        '''Не перезаписывает рейтинг, поисковый вектор и маску жанров'''
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DATABASE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Review(models.Model):
+    loaded_rating_values = None
+
     title = models.ForeignKey(
         Title,
         on_delete=models.CASCADE,
@@ -100,11 +271,23 @@ class Review(models.Model):
         'Дата публикации отзыва',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения отзыва',
+        auto_now=True
+    )
 
     class Meta:
         ordering = ['id']
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date', 'id'],
+                name='review_title_pub_date_idx'
+            ),
+            models.Index(fields=['title', 'id'], name='review_title_id_idx'),
+            models.Index(fields=['updated'], name='review_updated_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'],
@@ -112,6 +295,18 @@ class Review(models.Model):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        '''Запоминает произведение и оценку для пересчёта рейтинга'''
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if 'title_id' in loaded and 'score' in loaded:
+            instance.loaded_rating_values = {
+                'title_id': loaded['title_id'],
+                'score': loaded['score'],
+            }
+        return instance
+
 
 class Comments(models.Model):
     review = models.ForeignKey(
@@ -131,8 +326,22 @@ class Comments(models.Model):
         'Дата публикации комментария',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения комментария',
+        auto_now=True
+    )
 
     class Meta:
         ordering = ['id']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date', 'id'],
+                name='comment_review_pub_date_idx'
+            ),
+            models.Index(
+                fields=['review', 'id'], name='comment_review_id_idx'
+            ),
+            models.Index(fields=['updated'], name='comment_updated_idx'),
+        ]
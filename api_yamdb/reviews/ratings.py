@@ -0,0 +1,54 @@
+from django.db.models import (Avg, Case, Count, ExpressionWrapper, F,
+                              FloatField, OuterRef, Subquery, Sum, Value, When)
+from django.db.models.functions import Cast, Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Review, Title
+
+# Рейтинг произведений изменился: sender=Title, count — число
+# обновлённых произведений
+rating_changed = Signal()
+
+
+def update_title_rating(title_id, score_delta, count_delta):
+    '''Инкрементально обновляет рейтинг произведения одним UPDATE'''
+    score_sum = F('score_sum') + score_delta
+    review_count = F('review_count') + count_delta
+    count = Title.objects.filter(pk=title_id).update(
+        score_sum=score_sum,
+        review_count=review_count,
+        rating=Case(
+            When(review_count__lte=-count_delta, then=Value(None)),
+            default=ExpressionWrapper(
+                Cast(score_sum, FloatField()) / review_count,
+                output_field=FloatField()
+            ),
+            output_field=FloatField()
+        ),
+        updated=timezone.now()
+    )
+    rating_changed.send(sender=Title, count=count)
+
+
+def recalculate_ratings(titles=None):
+    '''Пересчитывает рейтинг произведений по всем отзывам'''
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    updated = titles.update(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(count=Count('id')).values('count')),
+            Value(0)
+        ),
+        score_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')),
+            Value(0)
+        ),
+        rating=Subquery(reviews.annotate(avg=Avg('score')).values('avg')),
+        updated=timezone.now()
+    )
+    rating_changed.send(sender=Title, count=updated)
+    return updated
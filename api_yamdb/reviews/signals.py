@@ -0,0 +1,98 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .genre_masks import recalculate_genre_masks, titles_with_mask
+from .models import Categories, Genres, Review, Title, title_deletion
+from .ratings import recalculate_ratings, update_title_rating
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    '''Обновляет рейтинг и дату изменения произведения по отзыву'''
+    if raw:
+        return
+
+    loaded = instance.loaded_rating_values
+    if created:
+        update_title_rating(instance.title_id, instance.score, 1)
+    elif loaded is None:
+        recalculate_ratings(Title.objects.filter(pk=instance.title_id))
+    elif loaded['title_id'] != instance.title_id:
+        update_title_rating(loaded['title_id'], -loaded['score'], -1)
+        update_title_rating(instance.title_id, instance.score, 1)
+    elif loaded['score'] != instance.score:
+        update_title_rating(
+            instance.title_id, instance.score - loaded['score'], 0
+        )
+    else:
+        Title.objects.filter(pk=instance.title_id).update(
+            updated=timezone.now()
+        )
+
+    instance.loaded_rating_values = {
+        'title_id': instance.title_id,
+        'score': instance.score,
+    }
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    '''Вычитает удалённый отзыв из рейтинга, в том числе при каскаде'''
+    if instance.title_id not in title_deletion:
+        update_title_rating(instance.title_id, -instance.score, -1)
+
+
+@receiver(pre_delete, sender=Title)
+def title_deleting(sender, instance, **kwargs):
+    '''Отмечает произведение, чьи отзывы удаляются вместе с ним'''
+    title_deletion.add(instance.pk)
+
+
+@receiver(post_save, sender=Categories)
+@receiver(pre_delete, sender=Categories)
+def category_changed(sender, instance, created=False, raw=False,
+                     **kwargs):
+    '''Отмечает изменёнными произведения изменённой категории'''
+    if not (created or raw):
+        Title.objects.filter(category=instance).update(
+            updated=timezone.now()
+        )
+
+
+@receiver(post_save, sender=Genres)
+@receiver(pre_delete, sender=Genres)
+def genre_changed(sender, instance, created=False, raw=False, **kwargs):
+    '''Отмечает изменёнными произведения изменённого жанра'''
+    if not (created or raw):
+        Title.objects.filter(genre=instance).update(updated=timezone.now())
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    '''Пересчитывает маски и дату изменения произведений по связи'''
+    if action == 'pre_clear' and reverse and instance.mask is None:
+        # После очистки связей жанра без бита его произведения не найти
+        Title.objects.filter(genre=instance).update(updated=timezone.now())
+        return
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        titles = Title.objects.filter(pk=instance.pk)
+    elif pk_set:
+        titles = Title.objects.filter(pk__in=pk_set)
+    elif instance.mask is not None:
+        # post_clear со стороны жанра: связей уже нет, ищем по биту
+        titles = titles_with_mask(instance.mask)
+    else:
+        return
+    recalculate_genre_masks(titles, updated=timezone.now())
+
+
+@receiver(post_delete, sender=Genres)
+def genre_deleted(sender, instance, **kwargs):
+    '''Убирает бит удалённого жанра, чтобы его можно было выдать снова'''
+    if instance.mask is not None:
+        recalculate_genre_masks(titles_with_mask(instance.mask))
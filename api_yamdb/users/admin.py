@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import User
+from .models import OutgoingEmail, User
 
 
 @admin.register(User)
@@ -9,3 +9,11 @@ class UserAdmin(admin.ModelAdmin):
     list_editable = ('role',)
     search_fields = ('username', 'role')
     empty_value_display = '-пусто-'
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'created', 'attempts', 'sent')
+    list_filter = ('sent',)
+    search_fields = ('to',)
+    empty_value_display = '-пусто-'
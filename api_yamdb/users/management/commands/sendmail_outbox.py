@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import MAX_ATTEMPTS, send_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет письма из очереди исходящих пачками через одно '
+        'соединение. Неудачные письма повторяются с растущей задержкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Число писем на одно соединение (по умолчанию 100)'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=MAX_ATTEMPTS,
+            help=f'Число попыток на письмо (по умолчанию {MAX_ATTEMPTS})'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Пауза в секундах, когда очередь пуста'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Отправить готовые письма и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending(
+                options['batch_size'], options['max_attempts']
+            )
+            if sent:
+                self.stdout.write(
+                    self.style.SUCCESS(f'Отправлено писем: {sent}')
+                )
+            if failed:
+                self.stdout.write(
+                    self.style.WARNING(f'Отложено до повтора: {failed}')
+                )
+            if not sent and not failed:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import UniqueConstraint
+from django.utils import timezone
 
 
 class UserRoles:
@@ -15,6 +16,12 @@ class UserRoles:
 
 
 class User(AbstractUser):
+    # Поля, изменение которых отзывает выданные токены
+    TOKEN_FIELDS = ('role', 'is_superuser', 'is_active')
+    loaded_token_values = None
+    # Пользователь собран из утверждений токена и может быть устаревшим
+    from_token = False
+
     username = models.CharField(
         unique=True,
         blank=False,
@@ -54,6 +61,10 @@ class User(AbstractUser):
         max_length=500,
         verbose_name='О себе',
     )
+    token_version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Версия токенов',
+    )
 
     class Meta:
         verbose_name = 'Пользователь',
@@ -64,6 +75,58 @@ class User(AbstractUser):
         ]
         ordering = ['id']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        '''Запоминает роль и статус для отзыва токенов'''
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(field in loaded for field in cls.TOKEN_FIELDS):
+            instance.loaded_token_values = {
+                field: loaded[field] for field in cls.TOKEN_FIELDS
+            }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        '''Загружает все отложенные поля одним запросом
+
+        Без fields пользователь из токена перечитывается целиком,
+        после этого его можно сохранять.
+        '''
+        deferred = self.get_deferred_fields()
+        if fields and set(fields) <= deferred:
+            fields = list(deferred)
+        elif fields is None and self.from_token:
+            fields = [field.attname for field in self._meta.concrete_fields]
+        super().refresh_from_db(using=using, fields=fields)
+        if set(self.TOKEN_FIELDS) <= set(fields or self.TOKEN_FIELDS) and (
+            not self.get_deferred_fields().intersection(self.TOKEN_FIELDS)
+        ):
+            self.from_token = False
+            self.loaded_token_values = {
+                field: getattr(self, field) for field in self.TOKEN_FIELDS
+            }
+
+    def save(self, *args, **kwargs):
+        '''Смена роли или статуса отзывает ранее выданные токены'''
+        if self.from_token:
+            raise ValueError(
+                'Пользователь собран из токена и может быть устаревшим, '
+                'перед сохранением вызовите refresh_from_db()'
+            )
+        loaded = self.loaded_token_values
+        if loaded is not None and any(
+            getattr(self, field) != value for field, value in loaded.items()
+        ):
+            self.token_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        if not self.get_deferred_fields().intersection(self.TOKEN_FIELDS):
+            self.loaded_token_values = {
+                field: getattr(self, field) for field in self.TOKEN_FIELDS
+            }
+
     @property
     def is_admin(self):
         return self.role == UserRoles.ADMIN or self.is_superuser
@@ -75,3 +138,57 @@ class User(AbstractUser):
     @property
     def is_moderator(self):
         return self.role == UserRoles.MODERATOR
+
+
+class OutgoingEmail(models.Model):
+    '''Письмо в очереди на отправку командой sendmail_outbox'''
+    subject = models.CharField(
+        max_length=255,
+        verbose_name='Тема',
+    )
+    body = models.TextField(
+        verbose_name='Текст',
+    )
+    from_email = models.CharField(
+        max_length=254,
+        verbose_name='Отправитель',
+    )
+    to = models.EmailField(
+        max_length=254,
+        verbose_name='Получатель',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания',
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Число попыток',
+    )
+    sent = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Дата отправки',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ['next_attempt']
+        indexes = [
+            models.Index(
+                fields=['sent', 'next_attempt'],
+                name='outgoing_email_pending_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.to}: {self.subject}'
@@ -0,0 +1,103 @@
+import datetime as dt
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+# Задержка повтора: BACKOFF_BASE * 2 ** (попытка - 1), но не больше BACKOFF_MAX
+BACKOFF_BASE = dt.timedelta(seconds=30)
+BACKOFF_MAX = dt.timedelta(hours=6)
+MAX_ATTEMPTS = 8
+# Срок, на который отправка забирает письма из очереди
+CLAIM_TIMEOUT = dt.timedelta(minutes=10)
+
+
+def enqueue_email(subject, body, from_email, recipients):
+    '''Ставит письма в очередь в текущей транзакции'''
+    return OutgoingEmail.objects.bulk_create(
+        OutgoingEmail(
+            subject=subject, body=body, from_email=from_email, to=to
+        )
+        for to in recipients
+    )
+
+
+def get_backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def mark_failed(emails, error, now):
+    for email in emails:
+        email.attempts += 1
+        email.next_attempt = now + get_backoff(email.attempts)
+        email.last_error = error
+    OutgoingEmail.objects.bulk_update(
+        emails, ['attempts', 'next_attempt', 'last_error']
+    )
+
+
+def claim_pending(batch_size, max_attempts, now):
+    '''Забирает пачку писем и откладывает их на CLAIM_TIMEOUT
+
+    Строки блокируются только на время короткой транзакции: другие
+    обработчики пропускают их, а после неё не выберут до срока.
+    Если обработчик упал во время отправки, письма вернутся в очередь
+    по истечении CLAIM_TIMEOUT.
+    '''
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True).filter(
+                sent__isnull=True,
+                next_attempt__lte=now,
+                attempts__lt=max_attempts,
+            ).order_by('next_attempt')[:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[email.pk for email in emails]
+        ).update(next_attempt=now + CLAIM_TIMEOUT)
+    return emails
+
+
+def send_pending(batch_size=100, max_attempts=MAX_ATTEMPTS):
+    '''Отправляет пачку писем через одно соединение
+
+    Письма забираются в короткой транзакции, а отправляются вне её,
+    поэтому ни транзакция, ни блокировки строк не ждут SMTP-сервер.
+    Возвращает число отправленных и неотправленных писем.
+    '''
+    emails = claim_pending(batch_size, max_attempts, timezone.now())
+    if not emails:
+        return 0, 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        mark_failed(emails, f'Нет соединения: {error}', timezone.now())
+        return 0, len(emails)
+
+    sent, failed = [], []
+    try:
+        for email in emails:
+            try:
+                EmailMessage(
+                    email.subject, email.body, email.from_email,
+                    [email.to], connection=connection
+                ).send()
+            except Exception as error:
+                failed.append((email, str(error)))
+            else:
+                sent.append(email.pk)
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    with transaction.atomic():
+        OutgoingEmail.objects.filter(pk__in=sent).update(
+            sent=now, last_error=''
+        )
+        for email, error in failed:
+            mark_failed([email], error, now)
+    return len(sent), len(failed)
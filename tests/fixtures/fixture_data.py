@@ -0,0 +1,99 @@
+import pytest
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUser', email='testuser@yamdb.fake', password='1234567'
+    )
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUserAnother', email='testuseranother@yamdb.fake',
+        password='1234567'
+    )
+
+
+@pytest.fixture
+def category():
+    from reviews.models import Categories
+    return Categories.objects.create(name='Фильм', slug='movie')
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genres
+    return [
+        Genres.objects.create(name='Драма', slug='drama'),
+        Genres.objects.create(name='Комедия', slug='comedy'),
+    ]
+
+
+@pytest.fixture
+def title(category, genres):
+    from reviews.models import Title
+    title = Title.objects.create(
+        name='Побег из Шоушенка', year=1994, description='Описание',
+        category=category
+    )
+    title.genre.set(genres)
+    return title
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestAdmin', email='testadmin@yamdb.fake',
+        password='1234567', role='admin'
+    )
+
+
+@pytest.fixture
+def admin_client(admin):
+    from rest_framework.test import APIClient
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    return client
+
+
+@pytest.fixture
+def make_catalog(django_user_model, category, genres):
+    '''Создаёт заданное число произведений, отзывов и комментариев'''
+    from reviews.models import Comments, Review, Title
+
+    def make(size):
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'author{i}', email=f'author{i}@yamdb.fake'
+            )
+            for i in range(size)
+        ]
+        titles = []
+        for i in range(size):
+            title = Title.objects.create(
+                name=f'Произведение {i}', year=2000 + i,
+                description='Описание', category=category
+            )
+            title.genre.set(genres)
+            titles.append(title)
+        reviews = [
+            Review.objects.create(
+                title=titles[0], author=author, text='Отзыв', score=5
+            )
+            for author in authors
+        ]
+        for author in authors:
+            Comments.objects.create(
+                review=reviews[0], author=author, text='Комментарий'
+            )
+        return titles[0], reviews[0]
+
+    return make
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    cache.clear()
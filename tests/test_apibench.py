@@ -0,0 +1,49 @@
+import io
+import json
+import time
+
+import pytest
+from django.core.management import call_command
+
+SETUP_DELAY = 0.2
+
+
+@pytest.mark.django_db(transaction=True)
+class TestApibench:
+
+    def test_smoke(self, tmp_path, monkeypatch):
+        from api.management.commands import apibench
+        from api.management.commands.apibench import Command
+        get_request = Command.get_request
+
+        def slow_get_request(self, endpoint):
+            time.sleep(SETUP_DELAY)
+            return get_request(self, endpoint)
+
+        monkeypatch.setattr(Command, 'get_request', slow_get_request)
+        # Тестовое окружение уже настроено pytest-django
+        monkeypatch.setattr(apibench, 'setup_test_environment', lambda: None)
+        output, stdout = tmp_path / 'bench.json', io.StringIO()
+        call_command(
+            'apibench', 'titles_list', 'review_create', users=5, titles=5,
+            reviews=20, comments=20, requests=3, warmup=1,
+            output=str(output), stdout=stdout
+        )
+        results = json.loads(output.read_text())['results']
+        assert set(results) == {'titles_list', 'review_create'}, (
+            'Проверьте, что apibench замеряет выбранные эндпоинты'
+        )
+        assert 'review_create' in stdout.getvalue()
+        assert results['review_create']['queries'] > 0
+        for endpoint, result in results.items():
+            assert result['requests'] == 3
+            assert result['mean_ms'] < SETUP_DELAY * 1000, (
+                f'Проверьте, что подготовка запроса {endpoint} не входит '
+                f'в замер'
+            )
+            assert result['throughput_rps'] >= 0.9 * 1000 / result[
+                'mean_ms'
+            ], (
+                'Проверьте, что подготовка запросов не входит в расчёт '
+                'пропускной способности'
+            )
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from django.core.signals import request_finished, request_started
+
+from api_yamdb.asgi import application
+
+
+def call(method, path, query_string=b'', body=b'', headers=(), send=None,
+         disconnect=False):
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    if disconnect:
+        messages.append({'type': 'http.disconnect'})
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        # Клиент на связи, пока сервер отправляет ответ
+        await asyncio.Event().wait()
+
+    async def default_send(message):
+        sent.append(message)
+
+    asyncio.run(application({
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': [(b'content-type', b'application/json'), *headers],
+        'server': ('testserver', 80),
+    }, receive, send or default_send))
+    if not sent:
+        return None, None
+    return sent[0]['status'], b''.join(
+        message.get('body', b'') for message in sent[1:]
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestASGI:
+
+    def test_catalog_read(self, title):
+        status, body = call('GET', '/api/v1/titles/', b'year=1994')
+        assert status == 200, (
+            'Проверьте, что ASGI-приложение отдаёт список произведений'
+        )
+        assert json.loads(body)['results'][0]['name'] == title.name
+
+        status, body = call('GET', f'/api/v1/titles/{title.id}/reviews/')
+        assert status == 200
+        assert json.loads(body)['count'] == 0
+
+    def test_request_body(self, category, settings):
+        status, body = call('POST', '/api/v1/auth/signup/', body=json.dumps({
+            'username': 'asgi_user', 'email': 'asgi_user@yamdb.fake'
+        }).encode())
+        assert status == 200, (
+            'Проверьте, что ASGI-приложение передаёт тело запроса в Django'
+        )
+
+        settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 16
+        status, body = call('POST', '/api/v1/auth/signup/', body=json.dumps({
+            'username': 'asgi_spooled', 'email': 'asgi_spooled@yamdb.fake'
+        }).encode())
+        assert status == 200, (
+            'Проверьте, что тело запроса больше FILE_UPLOAD_MAX_MEMORY_SIZE '
+            'читается из временного файла'
+        )
+
+    def test_streaming_response(self, admin, make_catalog, settings):
+        from api.authentication import issue_token
+        from api.connections import connection_stats
+        settings.API_EXPORT_CHUNK_SIZE = 2
+        make_catalog(5)
+        threads = []
+
+        def record_thread(**kwargs):
+            threads.append(threading.get_ident())
+
+        request_started.connect(record_thread)
+        request_finished.connect(record_thread)
+        authorization = (
+            b'authorization', f'Bearer {issue_token(admin)}'.encode()
+        )
+        status, body = call(
+            'GET', '/api/v1/export/titles/', headers=[authorization]
+        )
+        assert status == 200, (
+            'Проверьте, что ASGI-приложение отдаёт потоковый ответ'
+        )
+        assert len(body.decode().splitlines()) == 5, (
+            'Проверьте, что потоковый ответ приходит целиком'
+        )
+        request_started.disconnect(record_thread)
+        request_finished.disconnect(record_thread)
+        assert len(threads) == 2 and threads[0] == threads[1], (
+            'Проверьте, что потоковый ответ закрывается в потоке запроса'
+        )
+        assert not connection_stats.busy
+
+        async def disconnect(message):
+            if message.get('more_body'):
+                raise OSError('Клиент отключился')
+
+        with pytest.raises(OSError):
+            call(
+                'GET', '/api/v1/export/titles/', headers=[authorization],
+                send=disconnect
+            )
+        assert not connection_stats.busy
+
+    def test_client_disconnect(self, admin, make_catalog, settings):
+        from api.authentication import issue_token
+        from api.connections import connection_stats
+        settings.API_EXPORT_CHUNK_SIZE = 1
+        make_catalog(20)
+        finished = []
+
+        def record_finished(**kwargs):
+            finished.append(True)
+
+        request_finished.connect(record_finished)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        call(
+            'GET', '/api/v1/export/titles/', send=send, disconnect=True,
+            headers=[(
+                b'authorization', f'Bearer {issue_token(admin)}'.encode()
+            )]
+        )
+        request_finished.disconnect(record_finished)
+        assert not sent or sent[-1].get('more_body'), (
+            'Проверьте, что после http.disconnect потоковый ответ '
+            'не дочитывается'
+        )
+        assert finished and not connection_stats.busy, (
+            'Проверьте, что прерванный ответ закрывается'
+        )
@@ -0,0 +1,93 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db(transaction=True)
+class TestStatelessJWTAuthentication:
+
+    def get_client(self, user):
+        user.confirmation_code = 'code'
+        user.save()
+        response = APIClient().post('/api/v1/auth/token/', data={
+            'username': user.username, 'confirmation_code': 'code'
+        })
+        assert response.status_code == 200
+        token = response.json()[0].split('token: ')[1]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def test_no_user_query(self, admin, django_assert_num_queries):
+        client = self.get_client(admin)
+        client.get('/api/v1/users/')
+        with django_assert_num_queries(2):
+            response = client.get('/api/v1/users/')
+        assert response.status_code == 200, (
+            'Проверьте, что роль администратора берётся из токена '
+            'без запроса пользователя'
+        )
+
+    def test_lazy_user_fields(self, user, django_assert_num_queries):
+        client = self.get_client(user)
+        client.get('/api/v1/users/me/')
+        with django_assert_num_queries(1):
+            response = client.get('/api/v1/users/me/')
+        assert response.json()['email'] == user.email, (
+            'Проверьте, что остальные поля пользователя загружаются '
+            'одним запросом при обращении'
+        )
+
+    def test_role_change_revokes_token(self, user, admin_client):
+        client = self.get_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что смена роли отзывает выданные токены'
+        )
+
+        cache.clear()
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что версия токенов берётся из БД при пустом кэше'
+        )
+        user.refresh_from_db()
+        assert self.get_client(user).get(
+            '/api/v1/users/'
+        ).status_code == 200
+
+    def test_profile_edit_keeps_token(self, user):
+        client = self.get_client(user)
+        response = client.patch('/api/v1/users/me/', data={'bio': 'О себе'})
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/me/').status_code == 200, (
+            'Проверьте, что правка профиля не отзывает токен'
+        )
+
+    def test_token_user_is_not_saved_stale(self, user, admin_client):
+        client = self.get_client(user)
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', data={'username': 'renamed'}
+        )
+        assert response.status_code == 200
+        response = client.patch('/api/v1/users/me/', data={'bio': 'О себе'})
+        assert response.status_code == 200
+        assert response.json()['username'] == 'renamed'
+        user.refresh_from_db()
+        assert (user.username, user.bio) == ('renamed', 'О себе'), (
+            'Проверьте, что правка профиля не возвращает имя и роль '
+            'из устаревшего токена'
+        )
+
+    def test_token_user_save_requires_refresh(self, user):
+        from api.authentication import StatelessJWTAuthentication, issue_token
+
+        token = issue_token(user)
+        token_user = StatelessJWTAuthentication().get_user(token)
+        with pytest.raises(ValueError):
+            token_user.save()
+        token_user.refresh_from_db()
+        token_user.save()
@@ -0,0 +1,57 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.autocomplete import prefix_index
+from reviews.models import Title
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAutocomplete:
+
+    url = '/api/v1/autocomplete/'
+
+    def suggest(self, query, **params):
+        response = APIClient().get(self.url, {'q': query, **params})
+        assert response.status_code == 200
+        return [(item['type'], item['name']) for item in response.json()]
+
+    def test_prefix_across_types(self, title):
+        assert self.suggest('дра') == [('genre', 'Драма')]
+        assert self.suggest('ПОБ') == [('title', 'Побег из Шоушенка')], (
+            'Проверьте, что поиск по префиксу не зависит от регистра'
+        )
+        assert self.suggest('шоу') == [('title', 'Побег из Шоушенка')], (
+            'Проверьте, что префикс ищется с начала любого слова'
+        )
+        assert self.suggest('ф', type='title') == []
+        assert self.suggest('') == []
+
+    def test_limit(self, make_catalog):
+        make_catalog(5)
+        assert len(self.suggest('произведение', limit=3)) == 3
+        assert APIClient().get(
+            self.url, {'q': 'п', 'limit': 'много'}
+        ).status_code == 400
+
+    def test_incremental_update(self, title, django_assert_num_queries):
+        self.suggest('поб')
+        title.name = 'Зелёная миля'
+        title.save()
+        with django_assert_num_queries(0):
+            assert self.suggest('зеле') == [('title', 'Зелёная миля')], (
+                'Проверьте, что индекс обновляется без перестроения'
+            )
+        assert self.suggest('поб') == []
+
+        title.delete()
+        with django_assert_num_queries(0):
+            assert self.suggest('мил') == []
+
+    def test_rebuild_after_foreign_change(self, title, category):
+        self.suggest('поб')
+        # Изменение другого процесса: версия сдвинута без сигнала в индекс
+        prefix_index.version -= 1
+        Title.objects.create(name='Ёлки', year=2010, category=category)
+        assert self.suggest('елк') == [('title', 'Ёлки')], (
+            'Проверьте, что индекс перестраивается при пропуске изменений'
+        )
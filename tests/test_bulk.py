@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from reviews.models import Categories, Title
+
+
+@pytest.mark.django_db
+class TestBulkWrite:
+
+    def test_categories_per_item_results(self, admin_client, category):
+        response = admin_client.post('/api/v1/categories/bulk/', data=[
+            {'name': 'Книга', 'slug': 'book'},
+            {'name': 'Фильм', 'slug': 'movie'},
+            {'name': 'Книга 2', 'slug': 'book'},
+            {'name': 'Без слага'},
+        ], format='json')
+        assert response.status_code == 200
+        data = response.json()
+        assert [item['status'] for item in data['results']] == [
+            'created', 'error', 'error', 'error'
+        ], 'Проверьте, что ошибка элемента не отменяет запись остальных'
+        assert data['created'] == 1 and data['errors'] == 3
+        assert Categories.objects.filter(slug='book').exists()
+
+    def test_titles_create_and_upsert(self, admin_client, category, genres,
+                                      django_assert_max_num_queries):
+        items = [
+            {'name': f'Произведение {i}', 'year': 2000, 'description': 'Д',
+             'category': 'movie', 'genre': ['drama', 'comedy']}
+            for i in range(30)
+        ]
+        items.append({
+            'name': 'Плохое', 'year': 2000, 'description': 'Д',
+            'category': 'unknown', 'genre': ['drama'],
+        })
+        with django_assert_max_num_queries(9):
+            response = admin_client.post(
+                '/api/v1/titles/bulk/', data=items, format='json'
+            )
+        data = response.json()
+        assert data['created'] == 30, (
+            'Проверьте, что число запросов не зависит от размера пачки'
+        )
+        assert 'category' in data['results'][-1]['errors']
+        title = Title.objects.get(pk=data['results'][0]['id'])
+        assert title.genre.count() == 2
+
+        response = admin_client.put('/api/v1/titles/bulk/', data=[
+            {'name': 'Произведение 0', 'year': 2000, 'description': 'Новое',
+             'category': 'movie', 'genre': ['comedy']},
+        ], format='json')
+        assert response.json()['results'][0] == {
+            'index': 0, 'status': 'updated', 'id': title.id
+        }, 'Проверьте, что PUT обновляет существующее произведение'
+        title.refresh_from_db()
+        assert title.description == 'Новое'
+        assert list(title.genre.values_list('slug', flat=True)) == ['comedy']
+
+        response = admin_client.post('/api/v1/titles/bulk/', data=[
+            {'name': 'Произведение 0', 'year': 2000, 'description': 'Д',
+             'category': 'movie', 'genre': []},
+        ], format='json')
+        assert response.json()['results'][0]['status'] == 'error', (
+            'Проверьте, что POST не перезаписывает существующие произведения'
+        )
+
+    def test_ndjson(self, admin_client):
+        body = '\n'.join([
+            json.dumps({'name': 'Драма', 'slug': 'drama'}),
+            '{не json',
+            json.dumps({'name': 'Комедия', 'slug': 'comedy'}),
+        ])
+        response = admin_client.generic(
+            'POST', '/api/v1/genres/bulk/', body.encode(),
+            content_type='application/x-ndjson'
+        )
+        assert response.status_code == 200
+        assert [item['status'] for item in response.json()['results']] == [
+            'created', 'error', 'created'
+        ], 'Проверьте, что эндпоинт принимает NDJSON построчно'
+
+    def test_admin_only(self, user):
+        from rest_framework.test import APIClient
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            '/api/v1/genres/bulk/', data=[], format='json'
+        )
+        assert response.status_code == 403
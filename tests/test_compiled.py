@@ -0,0 +1,104 @@
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def list_results(url):
+    response = APIClient().get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+    )
+    return response.data['results']
+
+
+@pytest.mark.django_db
+class TestCompiledSerializer:
+    '''Список из values() совпадает с ответом сериализатора DRF'''
+
+    def test_titles(self, make_catalog, genres):
+        from api.serializers import TitleReadSerializer
+        from reviews.models import Title
+        make_catalog(12)
+        bare = Title.objects.create(name='Без категории', year=1990)
+        bare.genre.set(genres[1:])
+        Title.objects.filter(pk=bare.pk).update(rating=7.5)
+        Title.objects.create(name='Без жанров', year=1980)
+        for page in (1, 2):
+            expected = TitleReadSerializer(
+                Title.objects.order_by('-year', 'id')[(page - 1) * 10:][:10],
+                many=True
+            ).data
+            assert render(
+                list_results(f'/api/v1/titles/?page={page}')
+            ) == render(expected), (
+                'Проверьте, что список произведений совпадает с ответом '
+                'TitleReadSerializer байт в байт'
+            )
+
+    def test_reviews_and_comments(self, make_catalog):
+        from api.serializers import CommentSerializer, ReviewSerializer
+        from reviews.models import Comments, Review
+        title, review = make_catalog(12)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        expected = ReviewSerializer(
+            Review.objects.filter(title=title)[:10], many=True
+        ).data
+        assert render(list_results(url)) == render(expected), (
+            'Проверьте, что список отзывов совпадает с ответом '
+            'ReviewSerializer байт в байт'
+        )
+        cursor = list_results(f'{url}?pagination=cursor')
+        assert render(cursor) == render(ReviewSerializer(
+            Review.objects.filter(title=title).order_by('pub_date', 'id')[:10],
+            many=True
+        ).data), 'Проверьте курсорную пагинацию отзывов'
+
+        expected = CommentSerializer(
+            Comments.objects.filter(review=review)[:10], many=True
+        ).data
+        assert render(
+            list_results(f'{url}{review.id}/comments/')
+        ) == render(expected), (
+            'Проверьте, что список комментариев совпадает с ответом '
+            'CommentSerializer байт в байт'
+        )
+
+    def test_count_without_joins(self, make_catalog):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        make_catalog(12)
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get('/api/v1/titles/')
+        assert response.json()['count'] == 12
+        count, = [
+            query['sql'] for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        assert 'JOIN' not in count, (
+            'Проверьте, что число строк считается без соединений '
+            'для колонок ответа'
+        )
+
+    def test_sparse_fields(self, make_catalog):
+        make_catalog(3)
+        results = list_results('/api/v1/titles/?fields=genre,year')
+        assert list(results[0]) == ['year', 'genre']
+        assert results[0]['genre'] == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ]
+
+    def test_compiled_once(self):
+        from api.compiled import compile_serializer
+        from api.serializers import TitleReadSerializer
+        compiled = compile_serializer(TitleReadSerializer)
+        assert compile_serializer(TitleReadSerializer) is compiled, (
+            'Проверьте, что сериализатор компилируется один раз на класс'
+        )
+        assert compiled.paths(['category']) == [
+            'category', 'category__name', 'category__slug'
+        ]
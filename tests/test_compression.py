@@ -0,0 +1,132 @@
+import gzip
+import os
+
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Review
+
+
+def get(url, encoding='gzip, deflate', **headers):
+    return APIClient().get(url, HTTP_ACCEPT_ENCODING=encoding, **headers)
+
+
+@pytest.mark.django_db
+class TestCompression:
+
+    def test_large_json(self, make_catalog):
+        make_catalog(10)
+        response = get('/api/v1/titles/')
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что большой ответ JSON сжимается gzip'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+        assert int(response['Content-Length']) == len(response.content)
+        body = gzip.decompress(response.content)
+        assert body == get('/api/v1/titles/', encoding='').content, (
+            'Проверьте, что сжатый ответ совпадает с несжатым'
+        )
+
+    def test_small_json(self, settings, make_catalog):
+        make_catalog(10)
+        response = get('/api/v1/categories/')
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что ответы меньше API_GZIP_MIN_SIZE не сжимаются'
+        )
+        settings.API_GZIP_MIN_SIZE = 10 ** 6
+        response = get('/api/v1/titles/')
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что порог берётся из настройки API_GZIP_MIN_SIZE'
+        )
+
+    @pytest.mark.parametrize('encoding', (
+        '', 'identity', 'br', 'gzip;q=0', '*;q=0', 'gzip;q=0, *',
+    ))
+    def test_not_accepted(self, make_catalog, encoding):
+        make_catalog(10)
+        response = get('/api/v1/titles/', encoding=encoding)
+        assert not response.has_header('Content-Encoding'), (
+            f'Проверьте, что ответ не сжимается при Accept-Encoding: '
+            f'{encoding}'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+
+    @pytest.mark.parametrize('encoding', ('GZIP', 'br;q=1, gzip;q=0.5', '*'))
+    def test_accepted(self, make_catalog, encoding):
+        make_catalog(10)
+        response = get('/api/v1/titles/', encoding=encoding)
+        assert response['Content-Encoding'] == 'gzip'
+
+    def test_gzip_etag(self, make_catalog):
+        title, review = make_catalog(10)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = get(url)
+        assert response['Content-Encoding'] == 'gzip'
+        etag = get(url, encoding='')['ETag']
+        assert response['ETag'] == etag[:-1] + ';gzip"', (
+            'Проверьте, что сжатый ответ получает свой ETag с суффиксом gzip'
+        )
+
+        response = get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == 304, (
+            'Проверьте, что ETag сжатого ответа проходит If-None-Match'
+        )
+        assert response['ETag'] == etag[:-1] + ';gzip"'
+        assert 'Accept-Encoding' in response['Vary']
+        response = get(url, HTTP_IF_NONE_MATCH=etag)
+        assert (response.status_code, response['ETag']) == (304, etag), (
+            'Проверьте, что ответ 304 возвращает ETag клиента'
+        )
+
+    def test_gzip_etag_if_match(self, settings, user, title):
+        settings.API_GZIP_MIN_SIZE = 0
+        review = Review.objects.create(
+            title=title, author=user, text='Т' * 500, score=3
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        etag = client.get(url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        assert etag.endswith(';gzip"')
+        response = client.patch(url, {'text': 'Новый'}, HTTP_IF_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что If-Match принимает ETag сжатого ответа'
+        )
+        response = client.patch(url, {'text': 'Старый'}, HTTP_IF_MATCH=etag)
+        assert response.status_code == 412
+
+    def test_streaming_skipped(self, admin_client, make_catalog):
+        make_catalog(10)
+        response = admin_client.get(
+            '/api/v1/export/titles/', HTTP_ACCEPT_ENCODING='gzip'
+        )
+        assert response.streaming
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что потоковые ответы не сжимаются'
+        )
+
+
+class TestStaticPrecompression:
+
+    def test_post_process(self, tmp_path):
+        from api_yamdb.storage import GzipStaticFilesStorage
+        (tmp_path / 'app.js').write_text('var a = 1;\n' * 100)
+        (tmp_path / 'tiny.css').write_text('a{}')
+        (tmp_path / 'logo.png').write_bytes(b'\x89PNG' * 100)
+        storage = GzipStaticFilesStorage(location=str(tmp_path))
+        processed = list(storage.post_process(
+            ['app.js', 'tiny.css', 'logo.png']
+        ))
+        assert processed == [('app.js', 'app.js.gz', True)], (
+            'Проверьте, что сжимаются только текстовые файлы от MIN_SIZE'
+        )
+        source, compressed = tmp_path / 'app.js', tmp_path / 'app.js.gz'
+        assert gzip.decompress(compressed.read_bytes()) == (
+            source.read_bytes()
+        )
+        assert os.stat(compressed).st_mtime == os.stat(source).st_mtime, (
+            'Проверьте, что копия .gz получает время изменения исходника'
+        )
+        assert list(storage.post_process(['app.js'])) == [], (
+            'Проверьте, что актуальная копия .gz не пересоздаётся'
+        )
@@ -0,0 +1,142 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Review
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalRequests:
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/categories/',
+        '/api/v1/titles/',
+        '/api/v1/titles/{title_id}/',
+        '/api/v1/titles/{title_id}/reviews/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+    ))
+    def test_not_modified(self, make_catalog, url):
+        title, review = make_catalog(3)
+        url = url.format(title_id=title.id, review_id=review.id)
+        client = APIClient()
+        response = client.get(url)
+        etag = response['ETag']
+        assert etag, f'Проверьте, что ответ на `{url}` содержит ETag'
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            f'Проверьте, что `{url}` возвращает 304 при совпадении ETag'
+        )
+        assert response['ETag'] == etag
+
+    def test_etag_changes_on_write(self, title, user, another_user):
+        client = APIClient()
+        for url in (f'/api/v1/titles/{title.id}/',
+                    f'/api/v1/titles/{title.id}/reviews/'):
+            etag = client.get(url)['ETag']
+            Review.objects.create(
+                title=title, author=user, text='Т', score=3
+            )
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200, (
+                f'Проверьте, что новый отзыв меняет ETag `{url}`'
+            )
+            user = another_user
+
+        etag = client.get(f'/api/v1/titles/{title.id}/')['ETag']
+        title.category.name = 'Кино'
+        title.category.save()
+        response = client.get(
+            f'/api/v1/titles/{title.id}/', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что изменение категории меняет ETag произведения'
+        )
+
+        etag = client.get(f'/api/v1/titles/{title.id}/')['ETag']
+        title.genre.clear()
+        response = client.get(
+            f'/api/v1/titles/{title.id}/', HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == 200, (
+            'Проверьте, что изменение жанров меняет ETag произведения'
+        )
+
+    def test_comment_list_etag(self, make_catalog, user):
+        from reviews.models import Comments
+
+        title, review = make_catalog(2)
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        etag = client.get(url)['ETag']
+        Comments.objects.create(review=review, author=user, text='Т')
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag списка'
+        )
+
+    def test_cached_detail_etag(self, title, django_assert_num_queries):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/'
+        etag = client.get(url)['ETag']
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response['ETag'] == etag, (
+            'Проверьте, что ответ из кэша содержит тот же ETag'
+        )
+        with django_assert_num_queries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что условный запрос проверяет ETag одним запросом'
+        )
+
+    def test_if_match(self, title, user):
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=3
+        )
+        client = APIClient()
+        client.force_authenticate(user=user)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        etag = client.get(url)['ETag']
+
+        response = client.patch(url, {'text': 'Новый'}, HTTP_IF_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что PATCH с актуальным If-Match выполняется'
+        )
+        response = client.patch(url, {'text': 'Старый'}, HTTP_IF_MATCH=etag)
+        assert response.status_code == 412, (
+            'Проверьте, что PATCH с устаревшим If-Match возвращает 412'
+        )
+
+
+@pytest.mark.django_db
+class TestUpdatedNotExposed:
+    '''Колонка updated служит только для Last-Modified'''
+    review_fields = ['id', 'author', 'text', 'score', 'pub_date']
+    comment_fields = ['id', 'text', 'author', 'pub_date']
+
+    def test_review_and_comment_schema(self, make_catalog, another_user):
+        title, review = make_catalog(2)
+        client = APIClient()
+        client.force_authenticate(user=another_user)
+        reviews_url = f'/api/v1/titles/{title.id}/reviews/'
+        comments_url = f'{reviews_url}{review.id}/comments/'
+        for url, fields in (
+            (reviews_url, self.review_fields),
+            (comments_url, self.comment_fields),
+        ):
+            response = client.post(
+                url, {'text': 'Текст', 'score': 5}, format='json'
+            )
+            assert response.status_code == 201
+            assert list(response.json()) == fields, (
+                f'Проверьте поля ответа на POST-запрос к `{url}`'
+            )
+            assert list(
+                client.get(f'{url}{response.json()["id"]}/').json()
+            ) == fields
+            assert all(
+                list(item) == fields
+                for item in client.get(url).json()['results']
+            ), f'Проверьте поля списка `{url}`'
+            assert client.get(f'{url}?fields=updated').status_code == 400
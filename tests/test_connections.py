@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+from django.db import OperationalError
+
+
+class FakeWrapper:
+    '''DatabaseWrapper с управляемым состоянием соединения'''
+
+    def __init__(self, usable=True, fail=False):
+        self.connection = object()
+        self.usable = usable
+        self.fail = fail
+        self.closed = 0
+        self._thread_ident = threading.get_ident()
+
+    def is_usable(self):
+        return self.usable
+
+    def close(self):
+        self.connection = None
+        self.closed += 1
+
+    def ensure_connection(self):
+        if self.fail:
+            raise OperationalError('connection refused')
+        if self.connection is None:
+            self.connection = object()
+
+
+@pytest.fixture
+def stats():
+    from api.connections import connection_stats
+    connection_stats.reset()
+    yield connection_stats
+    connection_stats.reset()
+
+
+class TestCheckout:
+
+    def test_healthy_connection_reused(self, settings, stats):
+        from api.connections import checkout_connection
+        wrapper = FakeWrapper()
+        connection = wrapper.connection
+        checkout_connection(wrapper)
+        assert wrapper.connection is connection, (
+            'Проверьте, что живое соединение используется повторно'
+        )
+        snapshot = stats.snapshot()
+        assert (snapshot['checkouts'], snapshot['connects']) == (1, 0)
+
+    def test_unusable_connection_replaced(self, settings, stats):
+        from api.connections import checkout_connection
+        wrapper = FakeWrapper(usable=False)
+        connection = wrapper.connection
+        checkout_connection(wrapper)
+        assert wrapper.closed == 1
+        assert wrapper.connection not in (None, connection), (
+            'Проверьте, что мёртвое соединение заменяется новым при выдаче'
+        )
+        snapshot = stats.snapshot()
+        assert (snapshot['unusable'], snapshot['connects']) == (1, 1)
+
+        settings.DB_CONN_HEALTH_CHECKS = False
+        wrapper = FakeWrapper(usable=False)
+        checkout_connection(wrapper)
+        assert wrapper.closed == 0, (
+            'Проверьте, что проверку можно отключить DB_CONN_HEALTH_CHECKS'
+        )
+
+    def test_recent_connection_not_checked(self, settings, stats):
+        from api.connections import checkout_connection
+        wrapper = FakeWrapper(usable=False)
+        stats.release([wrapper])
+        checkout_connection(wrapper)
+        assert wrapper.closed == 0, (
+            'Проверьте, что соединение после недавнего запроса '
+            'не проверяется запросом к БД'
+        )
+        settings.DB_CONN_HEALTH_CHECK_IDLE = 0
+        checkout_connection(wrapper)
+        assert wrapper.closed == 1, (
+            'Проверьте, что простаивавшее соединение проверяется'
+        )
+
+    def test_connect_error(self, stats):
+        from api.connections import checkout_connection
+        wrapper = FakeWrapper(fail=True)
+        wrapper.connection = None
+        checkout_connection(wrapper)
+        assert stats.snapshot()['errors'] == 1, (
+            'Проверьте, что ошибка подключения не прерывает запрос в сигнале'
+        )
+
+    def test_persistent_limit(self, settings, stats):
+        from api.connections import checkout_connection
+        pooled = FakeWrapper()
+        checkout_connection(pooled)
+        settings.DB_PERSISTENT_CONNECTIONS = stats.open_count()
+        extra = FakeWrapper()
+        extra.connection = None
+        checkout_connection(extra)
+        assert extra.connection is None, (
+            'Проверьте, что сверх DB_PERSISTENT_CONNECTIONS постоянное '
+            'соединение не открывается'
+        )
+        assert extra in stats.overflowed
+        assert stats.snapshot()['overflow'] == 1
+
+        # View открыло соединение само, к следующему запросу оно закрыто
+        extra.ensure_connection()
+        settings.DB_PERSISTENT_CONNECTIONS += 1
+        checkout_connection(extra)
+        assert extra.closed == 1
+        assert extra not in stats.overflowed
+
+    def test_idle(self, stats):
+        from api.connections import checkout_connection
+        wrapper = FakeWrapper()
+        checkout_connection(wrapper)
+        before = stats.snapshot()['idle']
+        stats.release()
+        assert stats.snapshot()['idle'] > before, (
+            'Проверьте, что соединение после запроса считается простаивающим'
+        )
+
+
+@pytest.mark.django_db
+class TestConnectionStats:
+
+    def test_conn_max_age(self):
+        from django.conf import settings
+        assert settings.DATABASES['default']['CONN_MAX_AGE'] > 0, (
+            'Проверьте, что соединения с БД по умолчанию постоянные'
+        )
+
+    def test_stats_endpoint(self, admin_client, stats, title):
+        assert admin_client.get('/api/v1/titles/').status_code == 200
+        connections = admin_client.get('/api/v1/stats/').json()[
+            'connections'
+        ]
+        assert connections['checkouts'] >= 1, (
+            'Проверьте, что /api/v1/stats/ считает выдачу соединений'
+        )
+        assert connections['open'] >= 1
+        assert {'idle', 'max_open', 'wait_ms', 'max_wait_ms',
+                'persistent_limit'} <= set(connections)
+        assert admin_client.delete('/api/v1/stats/').status_code == 204
+        assert admin_client.get('/api/v1/stats/').json()['connections'][
+            'checkouts'
+        ] == 1
@@ -0,0 +1,142 @@
+import datetime as dt
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from reviews.management.commands.dbseed import TABLE_MODELS
+from reviews.models import Comments, Genres, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def seeded_models(monkeypatch):
+    '''Модели, для которых dbseed сдвинул последовательности id'''
+    from reviews.management.commands import dbseed
+    models = []
+    reset_sequences = dbseed.reset_sequences
+
+    def record(*args):
+        models.extend(args)
+        reset_sequences(*args)
+
+    monkeypatch.setattr(dbseed, 'reset_sequences', record)
+    return models
+
+
+def insert_after_seed():
+    '''Новые строки через ORM и API получают свободные id'''
+    user = User.objects.create(username='after_seed', email='a@yamdb.fake')
+    title = Title.objects.create(name='После сида', year=2000)
+    title.genre.add(Genres.objects.first())
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.post(
+        f'/api/v1/titles/{title.id}/reviews/', {'text': 'Т', 'score': 5}
+    )
+    assert response.status_code == 201, (
+        'Проверьте, что после загрузки с явными id можно создать отзыв'
+    )
+    response = client.post(
+        f'/api/v1/titles/{title.id}/reviews/{response.json()["id"]}'
+        '/comments/', {'text': 'Т'}
+    )
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+class TestDbseedBulk:
+
+    def test_bulk_seed(self):
+        call_command('dbseed', '__all__', '--bulk', '--batch-size', '10')
+        title = Title.objects.get(pk=1)
+        assert title.genre.exists(), (
+            'Проверьте, что dbseed загружает связи genre_title'
+        )
+        assert title.review_count == title.reviews.count() > 0, (
+            'Проверьте, что после загрузки отзывов пересчитывается рейтинг'
+        )
+        counts = (Review.objects.count(), Comments.objects.count())
+
+        call_command('dbseed', '__all__', '--bulk')
+        assert (Review.objects.count(), Comments.objects.count()) == counts, (
+            'Проверьте, что повторный запуск dbseed пропускает '
+            'существующие записи'
+        )
+
+    @pytest.mark.parametrize('mode', ((), ('--bulk',)))
+    def test_insert_after_seed(self, seeded_models, mode):
+        call_command('dbseed', '__all__', *mode)
+        assert set(seeded_models) == set(TABLE_MODELS.values()), (
+            'Проверьте, что dbseed сдвигает последовательности id '
+            'каждой загруженной таблицы'
+        )
+        insert_after_seed()
+
+    @pytest.mark.parametrize('mode', ((), ('--bulk',)))
+    def test_csv_dates_kept(self, mode):
+        call_command('dbseed', '__all__', *mode)
+        review = Review.objects.get(pk=1)
+        date = dt.datetime(2019, 9, 24, 21, 8, 21, 567000, dt.timezone.utc)
+        assert review.pub_date == date, (
+            'Проверьте, что отзыв сохраняет дату публикации из CSV'
+        )
+        assert review.updated == date
+        assert Comments.objects.get(pk=1).pub_date == dt.datetime(
+            2020, 1, 13, 23, 20, 2, 422000, dt.timezone.utc
+        ), 'Проверьте, что комментарий сохраняет дату публикации из CSV'
+
+
+@pytest.mark.django_db
+class TestDbgenerate:
+
+    def test_generate(self):
+        call_command(
+            'dbgenerate', '--users', '20', '--titles', '30',
+            '--reviews', '200', '--comments', '50', '--seed', '7'
+        )
+        assert Title.objects.count() == 30
+        assert Review.objects.count() == 200, (
+            'Проверьте, что dbgenerate создаёт заданное число отзывов'
+        )
+        assert Comments.objects.count() == 50
+        counts = list(
+            Title.objects.order_by('id').values_list('review_count', flat=True)
+        )
+        assert counts[0] >= counts[-1], (
+            'Проверьте, что популярность произведений убывает по рангу'
+        )
+        assert max(counts) <= 20, (
+            'Проверьте, что один автор пишет не больше одного отзыва '
+            'на произведение'
+        )
+        for model in (Review, Comments):
+            dates = model.objects.values_list('pub_date', flat=True)
+            assert max(dates) - min(dates) > dt.timedelta(days=365), (
+                f'Проверьте, что даты {model.__name__} разнесены во времени'
+            )
+            assert len(set(dates)) > len(dates) // 2
+
+    def test_insert_after_generate(self, seeded_models):
+        call_command(
+            'dbgenerate', '--users', '5', '--titles', '5',
+            '--reviews', '10', '--comments', '5'
+        )
+        assert {User, Title, Review, Comments} <= set(seeded_models), (
+            'Проверьте, что dbgenerate сдвигает последовательности id'
+        )
+        insert_after_seed()
+
+    def test_csv_is_deterministic(self, tmp_path):
+        for directory in ('first', 'second'):
+            call_command(
+                'dbgenerate', '--users', '5', '--titles', '10',
+                '--reviews', '30', '--comments', '10',
+                '--csv', str(tmp_path / directory)
+            )
+        for table in ('titles', 'review', 'comments'):
+            first = (tmp_path / 'first' / f'{table}.csv').read_text()
+            second = (tmp_path / 'second' / f'{table}.csv').read_text()
+            assert first == second, (
+                f'Проверьте, что {table}.csv не меняется при том же --seed'
+            )
@@ -0,0 +1,141 @@
+import csv
+import datetime as dt
+import io
+import json
+
+import pytest
+from rest_framework.test import APIClient
+
+
+def read_ndjson(response):
+    body = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in body.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_admin_only(self, user):
+        url = '/api/v1/export/titles/'
+        assert APIClient().get(url).status_code == 401, (
+            f'Проверьте, что `{url}` недоступен без токена'
+        )
+        user_client = APIClient()
+        user_client.force_authenticate(user=user)
+        assert user_client.get(url).status_code == 403, (
+            f'Проверьте, что `{url}` доступен только администратору'
+        )
+
+    def test_titles_ndjson(self, admin_client, title, genres, user):
+        from reviews.models import Review
+        Review.objects.create(title=title, author=user, text='Т', score=8)
+        response = admin_client.get('/api/v1/export/titles/')
+        assert response.status_code == 200
+        assert response.streaming, (
+            'Проверьте, что выгрузка отдаётся потоковым ответом'
+        )
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = read_ndjson(response)
+        assert len(rows) == 1
+        assert rows[0]['name'] == title.name
+        assert rows[0]['category'] == 'movie'
+        assert rows[0]['genres'] == ['comedy', 'drama'], (
+            'Проверьте, что выгрузка произведений содержит слаги жанров'
+        )
+        assert rows[0]['rating'] == 8.0
+        assert rows[0]['review_count'] == 1
+
+    def test_reviews_and_comments(self, admin_client, make_catalog):
+        title, review = make_catalog(3)
+        rows = read_ndjson(admin_client.get('/api/v1/export/reviews/'))
+        assert [row['id'] for row in rows] == sorted(
+            row['id'] for row in rows
+        ), 'Проверьте, что выгрузка упорядочена по id'
+        assert len(rows) == 3
+        assert rows[0]['author'] == 'author0'
+
+        rows = read_ndjson(admin_client.get('/api/v1/export/comments/'))
+        assert len(rows) == 3
+        assert rows[0]['review_id'] == review.id
+        assert rows[0]['title_id'] == title.id, (
+            'Проверьте, что комментарий выгружается с id произведения'
+        )
+
+    def test_csv(self, admin_client, title):
+        response = admin_client.get('/api/v1/export/titles/?output=csv')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/csv')
+        body = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert len(rows) == 1
+        assert rows[0]['genres'] == 'comedy,drama'
+        assert rows[0]['rating'] == ''
+
+        response = admin_client.get(
+            '/api/v1/export/comments/?output=csv'
+        )
+        body = b''.join(response.streaming_content).decode()
+        assert body.splitlines() == [
+            'id,title_id,review_id,author,text,pub_date,updated'
+        ], 'Проверьте, что пустая выгрузка CSV содержит заголовок'
+
+    def test_updated_since(self, admin_client, make_catalog):
+        from reviews.models import Title
+        make_catalog(4)
+        old = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+        Title.objects.filter(year__lt=2002).update(updated=old)
+        response = admin_client.get(
+            '/api/v1/export/titles/?updated_since=2021-01-01'
+        )
+        assert {row['year'] for row in read_ndjson(response)} == {
+            2002, 2003
+        }, 'Проверьте фильтр updated_since'
+        assert response['X-Updated-Until'], (
+            'Проверьте, что выгрузка возвращает время начала в '
+            'X-Updated-Until'
+        )
+        response = admin_client.get(
+            '/api/v1/export/titles/?updated_since=2019-12-31T23:00:00Z'
+        )
+        assert len(read_ndjson(response)) == 4
+
+    def test_genre_change_marks_updated(self, admin_client, title, genres):
+        from reviews.models import Genres, Title
+        old = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+        url = '/api/v1/export/titles/?updated_since=2021-01-01'
+        untagged = Genres.objects.create(name='Без бита', slug='untagged')
+        Genres.objects.filter(pk=untagged.pk).update(mask=None)
+        untagged.refresh_from_db()
+        changes = (
+            lambda: title.genre.remove(genres[0]),
+            lambda: genres[1].titles.clear(),
+            lambda: title.genre.add(untagged),
+            lambda: untagged.titles.clear(),
+        )
+        for change in changes:
+            Title.objects.update(updated=old)
+            change()
+            assert [
+                row['id'] for row in read_ndjson(admin_client.get(url))
+            ] == [title.id], (
+                'Проверьте, что изменение жанров произведения обновляет '
+                'дату его изменения'
+            )
+
+    @pytest.mark.parametrize('url, status', (
+        ('/api/v1/export/titles/?updated_since=вчера', 400),
+        ('/api/v1/export/titles/?output=xml', 400),
+        ('/api/v1/export/users/', 404),
+    ))
+    def test_bad_request(self, admin_client, url, status):
+        assert admin_client.get(url).status_code == status
+
+    def test_chunked_queries(self, admin_client, make_catalog, settings,
+                             django_assert_max_num_queries):
+        '''Жанры читаются одним запросом на пачку, а не на строку'''
+        settings.API_EXPORT_CHUNK_SIZE = 4
+        make_catalog(12)
+        with django_assert_max_num_queries(4):
+            rows = read_ndjson(admin_client.get('/api/v1/export/titles/'))
+        assert len(rows) == 12
+        assert all(row['genres'] == ['comedy', 'drama'] for row in rows)
@@ -0,0 +1,181 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+def title_mask(title):
+    title.refresh_from_db(fields=['genre_mask'])
+    return title.genre_mask
+
+
+def genre_mask(*genres):
+    return sum(genre.mask for genre in genres)
+
+
+def list_names(url):
+    response = APIClient().get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+    )
+    return [title['name'] for title in response.json()['results']]
+
+
+def list_genres():
+    return APIClient().get('/api/v1/genres/').json()['results']
+
+
+@pytest.mark.django_db
+class TestGenreMaskSync:
+
+    def test_genres_get_distinct_bits(self, genres):
+        from reviews.models import Genres
+        assert list_genres() == [
+            {'name': 'Драма', 'slug': 'drama'},
+            {'name': 'Комедия', 'slug': 'comedy'},
+        ], 'Проверьте, что бит жанра не попадает в ответ API'
+        masks = [genre.mask for genre in genres]
+        assert all(mask and mask & (mask - 1) == 0 for mask in masks), (
+            'Проверьте, что каждому жанру выдаётся один бит маски'
+        )
+        assert len(set(masks)) == len(masks), (
+            'Проверьте, что биты жанров не повторяются'
+        )
+        genres[0].delete()
+        genre = Genres.objects.create(name='Ужасы', slug='horror')
+        assert genre.mask == masks[0], (
+            'Проверьте, что бит удалённого жанра выдаётся снова'
+        )
+
+    def test_mask_follows_title_genres(self, title, genres):
+        drama, comedy = genres
+        assert title_mask(title) == genre_mask(drama, comedy), (
+            'Проверьте, что маска произведения содержит биты его жанров'
+        )
+        title.genre.remove(comedy)
+        assert title_mask(title) == genre_mask(drama), (
+            'Проверьте, что удаление жанра у произведения убирает его бит'
+        )
+        comedy.titles.add(title)
+        assert title_mask(title) == genre_mask(drama, comedy), (
+            'Проверьте, что маска обновляется при изменении связи '
+            'со стороны жанра'
+        )
+        comedy.titles.clear()
+        assert title_mask(title) == genre_mask(drama), (
+            'Проверьте, что очистка связи со стороны жанра убирает его бит'
+        )
+        drama.delete()
+        assert title_mask(title) == 0, (
+            'Проверьте, что удаление жанра убирает его бит из масок'
+        )
+
+    def test_save_keeps_mask(self, title, genres):
+        from reviews.models import Title
+        stale = Title.objects.get(pk=title.pk)
+        title.genre.set(genres[:1])
+        stale.description = 'Новое описание'
+        stale.save()
+        assert title_mask(title) == genre_mask(genres[0]), (
+            'Проверьте, что сохранение произведения не перезаписывает '
+            'маску жанров'
+        )
+
+    def test_api_write_mask(self, admin_client, category, genres):
+        from reviews.models import Title
+        drama, comedy = genres
+        data = {
+            'name': 'Новое', 'year': 2001, 'description': 'Д',
+            'category': category.slug, 'genre': ['drama'],
+        }
+        response = admin_client.post('/api/v1/titles/', data, format='json')
+        assert response.status_code == 201
+        assert list_names('/api/v1/titles/?genre=drama') == ['Новое'], (
+            'Проверьте, что создание через API заполняет маску жанров'
+        )
+        title = Title.objects.get(pk=response.json()['id'])
+        url = f'/api/v1/titles/{title.id}/'
+        for method, slugs, expected in (
+            ('patch', ['comedy'], genre_mask(comedy)),
+            ('put', ['drama', 'comedy'], genre_mask(drama, comedy)),
+        ):
+            response = getattr(admin_client, method)(
+                url, dict(data, genre=slugs), format='json'
+            )
+            assert response.status_code == 200
+            assert title_mask(title) == expected, (
+                f'Проверьте, что {method.upper()} обновляет маску жанров'
+            )
+
+    def test_bulk_titles_write_mask(self, admin_client, category, genres):
+        from reviews.models import Title
+        response = admin_client.post('/api/v1/titles/bulk/', [{
+            'name': 'Пачка', 'year': 2001, 'description': 'Д',
+            'category': category.slug, 'genre': ['drama', 'comedy'],
+        }], format='json')
+        assert response.status_code == 200
+        title = Title.objects.get(name='Пачка')
+        assert title.genre_mask == genre_mask(*genres), (
+            'Проверьте, что пакетная запись заполняет маску жанров'
+        )
+
+
+@pytest.mark.django_db
+class TestGenreFilter:
+
+    @pytest.fixture
+    def catalog(self, category, genres):
+        from reviews.models import Genres, Title
+        drama, comedy = genres
+        horror = Genres.objects.create(name='Ужасы', slug='horror')
+        for name, year, title_genres in (
+            ('Драма', 2001, [drama]),
+            ('Комедия', 2002, [comedy]),
+            ('Драмеди', 2003, [drama, comedy]),
+            ('Хоррор', 2004, [horror]),
+        ):
+            title = Title.objects.create(
+                name=name, year=year, description='Д', category=category
+            )
+            title.genre.set(title_genres)
+
+    @pytest.mark.parametrize('query, expected', (
+        ('genre=drama', ['Драмеди', 'Драма']),
+        ('genre=drama,comedy', ['Драмеди', 'Комедия', 'Драма']),
+        ('genre=drama,unknown', ['Драмеди', 'Драма']),
+        ('genre_all=drama,comedy', ['Драмеди']),
+        ('genre_all=drama,unknown', []),
+        ('genre=unknown', []),
+        ('genre=drama&genre_all=comedy', ['Драмеди']),
+    ))
+    def test_filter(self, catalog, query, expected):
+        assert list_names(f'/api/v1/titles/?{query}') == expected, (
+            f'Проверьте фильтрацию произведений по жанрам `{query}`'
+        )
+
+    def test_genre_without_bit(self, catalog):
+        from reviews.genre_masks import recalculate_genre_masks
+        from reviews.models import Genres
+        Genres.objects.filter(slug='comedy').update(mask=None)
+        recalculate_genre_masks()
+        assert list_names('/api/v1/titles/?genre=comedy,horror') == [
+            'Хоррор', 'Драмеди', 'Комедия'
+        ], 'Проверьте, что жанры без бита ищутся по связи'
+        assert list_names('/api/v1/titles/?genre_all=drama,comedy') == [
+            'Драмеди'
+        ], 'Проверьте, что жанры без бита ищутся по связи'
+
+    def test_genre_bits_index(self, catalog):
+        from django.db import connection
+
+        from reviews.genre_masks import titles_with_mask
+        if connection.vendor != 'postgresql':
+            pytest.skip('GIN-индекс есть только на PostgreSQL')
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reviews_mask_bits(5), reviews_mask_bits(0)')
+            assert cursor.fetchone() == ([0, 2], []), (
+                'Проверьте, что reviews_mask_bits раскладывает маску на биты'
+            )
+        sql = str(titles_with_mask(4).query)
+        assert 'reviews_mask_bits("reviews_title"."genre_mask") @>' in sql, (
+            'Проверьте, что фильтр по маске сравнивает массивы битов, '
+            'покрытые индексом title_genre_bits_idx'
+        )
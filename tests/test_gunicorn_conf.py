@@ -0,0 +1,98 @@
+import os
+import re
+import runpy
+
+import pytest
+
+from .conftest import root_dir
+
+CONFIG_PATH = os.path.join(root_dir, 'api_yamdb', 'gunicorn.conf.py')
+GUNICORN_ENV = (
+    'GUNICORN_CPUS', 'GUNICORN_WORKERS', 'GUNICORN_THREADS',
+    'GUNICORN_WORKER_CLASS', 'GUNICORN_PRELOAD', 'GUNICORN_MAX_REQUESTS',
+    'GUNICORN_MAX_REQUESTS_JITTER',
+)
+SHARED_CACHE = 'django.core.cache.backends.memcached.MemcachedCache'
+
+
+@pytest.fixture
+def load_config(monkeypatch):
+    def load(**env):
+        for name in GUNICORN_ENV:
+            monkeypatch.delenv(name, raising=False)
+        env.setdefault('CACHE_BACKEND', SHARED_CACHE)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return runpy.run_path(CONFIG_PATH)
+    return load
+
+
+class TestGunicornConfig:
+
+    def test_defaults(self, load_config):
+        config = load_config(GUNICORN_CPUS='4')
+        assert config['worker_class'] == 'gthread'
+        assert config['workers'] == 5, (
+            'Проверьте, что число воркеров gthread считается по ядрам'
+        )
+        assert config['threads'] == 4
+        assert config['preload_app'] is True
+        assert config['max_requests'] > 0
+        assert 0 < config['max_requests_jitter'] < config['max_requests'], (
+            'Проверьте, что перезапуск воркеров идёт с разбросом'
+        )
+        assert config['graceful_timeout'] > 0
+
+    def test_sync_workers(self, load_config):
+        config = load_config(GUNICORN_CPUS='2', GUNICORN_WORKER_CLASS='sync')
+        assert (config['workers'], config['threads']) == (5, 1)
+
+    def test_env_override(self, load_config):
+        config = load_config(
+            GUNICORN_WORKERS='3', GUNICORN_THREADS='8',
+            GUNICORN_PRELOAD='False', GUNICORN_MAX_REQUESTS='0',
+        )
+        assert (config['workers'], config['threads']) == (3, 8)
+        assert config['preload_app'] is False
+        assert config['max_requests'] == 0, (
+            'Проверьте, что перезапуск воркеров можно отключить'
+        )
+
+    def test_locmem_cache(self, load_config):
+        with pytest.raises(RuntimeError, match='LocMemCache'):
+            load_config(GUNICORN_CPUS='2', CACHE_BACKEND=(
+                'django.core.cache.backends.locmem.LocMemCache'
+            ))
+        config = load_config(
+            GUNICORN_WORKERS='1',
+            CACHE_BACKEND='django.core.cache.backends.locmem.LocMemCache'
+        )
+        assert config['workers'] == 1, (
+            'Проверьте, что с LocMemCache запускается один воркер'
+        )
+
+    def test_file_based_cache(self, load_config):
+        with pytest.raises(RuntimeError, match='FileBasedCache'):
+            load_config(GUNICORN_WORKERS='1', CACHE_BACKEND=(
+                'django.core.cache.backends.filebased.FileBasedCache'
+            ))
+
+    def test_compose_shared_cache(self):
+        with open(os.path.join(root_dir, 'infra', 'docker-compose.yaml')) as f:
+            compose = f.read()
+        assert f'CACHE_BACKEND: {SHARED_CACHE}' in compose, (
+            'Проверьте, что воркеры web используют общий кэш'
+        )
+
+    def test_available_cpus(self, load_config):
+        config = load_config()
+        assert 1 <= config['CPUS'] <= len(os.sched_getaffinity(0)), (
+            'Проверьте, что число ядер учитывает cpuset процесса'
+        )
+
+    def test_dockerfile_uses_config(self):
+        with open(os.path.join(root_dir, 'api_yamdb', 'Dockerfile')) as f:
+            dockerfile = f.read()
+        assert re.search(
+            r'CMD \[.*"--config", "gunicorn\.conf\.py"', dockerfile
+        ), 'Проверьте, что gunicorn в контейнере запускается с конфигом'
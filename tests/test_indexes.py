@@ -0,0 +1,254 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+# Справочники маленькие: их списки и жанры страницы в префетче
+# дешевле прочитать и отсортировать целиком, чем искать по индексу
+LOOKUP_TABLES = ('reviews_categories', 'reviews_genres')
+ORDER_BY = re.compile(r'ORDER BY "(\w+)"')
+# Индексов SQLite условие на биты маски не ускоряют, фильтр по жанрам
+# проверяется на PostgreSQL по GIN-индексу title_genre_bits_idx
+BITMASK = re.compile(r'"genre_mask"\) (?:@>|&&)|"genre_mask" &')
+SQLITE_ACCESS = re.compile(
+    r'\b(SEARCH|SCAN) (?:TABLE )?(\w+)'
+    r'(?: USING (?:(?:COVERING )?INDEX (\w+)|(INTEGER PRIMARY KEY)))?'
+)
+POSTGRESQL_NODE = re.compile(
+    r'(?:Index (?:Only )?Scan(?: Backward)? using (?P<index>\w+) '
+    r'on (?P<table>\w+)'
+    r'|Bitmap Heap Scan on (?P<heap>\w+)'
+    r'|Bitmap Index Scan on (?P<bitmap>\w+)'
+    r'|Seq Scan on (?P<seq>\w+))'
+)
+SORT = {
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY'),
+    'postgresql': re.compile(r'(?:^|->\s+)Sort\b'),
+}
+PRIMARY_KEY = 'pk'
+TITLES = 5000
+BLOCKS = 50
+
+
+def explain(sql):
+    '''Строки плана запроса для текущей СУБД'''
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}')
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def sqlite_accesses(plan):
+    for line in plan:
+        match = SQLITE_ACCESS.search(line)
+        if match:
+            kind, table, index, primary_key = match.groups()
+            yield table, index or (primary_key and PRIMARY_KEY), (
+                kind == 'SEARCH'
+            )
+
+
+def postgresql_accesses(plan):
+    '''Чтения таблиц узлами плана: по Index Cond или целиком'''
+    heap = None
+    for number, line in enumerate(plan):
+        match = POSTGRESQL_NODE.search(line)
+        if not match:
+            continue
+        if match['heap']:
+            heap = match['heap']
+            continue
+        table = match['table'] or match['seq'] or heap
+        index = match['index'] or match['bitmap']
+        if index == f'{table}_pkey':
+            index = PRIMARY_KEY
+        details = []
+        for detail in plan[number + 1:]:
+            if '->' in detail:
+                break
+            details.append(detail)
+        yield table, index, any('Index Cond:' in line for line in details)
+
+
+ACCESSES = {'sqlite': sqlite_accesses, 'postgresql': postgresql_accesses}
+
+
+@pytest.fixture
+def dataset(django_user_model):
+    '''Каталог, где строки одного значения фильтра лежат рядом
+
+    Значения фильтров выбирают несколько процентов строк, поэтому
+    планировщик сам предпочитает индекс полному проходу.
+    '''
+    from reviews.genre_masks import assign_genre_masks
+    from reviews.models import Categories, Comments, Genres, Review, Title
+
+    Categories.objects.bulk_create(
+        Categories(name=f'Категория {i}', slug=f'category{i}')
+        for i in range(BLOCKS)
+    )
+    Genres.objects.bulk_create(
+        Genres(name=f'Жанр {i}', slug=f'genre{i}') for i in range(BLOCKS)
+    )
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'reader{i}', email=f'reader{i}@yamdb.fake')
+        for i in range(1000)
+    )
+    categories = list(Categories.objects.order_by('pk'))
+    genres = list(Genres.objects.order_by('pk'))
+    users = list(django_user_model.objects.order_by('pk'))
+    Title.objects.bulk_create(
+        Title(
+            name=f'Произведение {i}', year=1950 + i * 70 // TITLES,
+            description='Описание',
+            category=categories[i * BLOCKS // TITLES]
+        )
+        for i in range(TITLES)
+    )
+    titles = list(Title.objects.order_by('pk'))
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title_id=title.pk, genres_id=genre.pk)
+        for i, title in enumerate(titles)
+        for genre in {
+            genres[i * BLOCKS // TITLES],
+            genres[(i * BLOCKS // TITLES + 3) % BLOCKS],
+        }
+    )
+    assign_genre_masks()
+    Review.objects.bulk_create(
+        Review(
+            title=title, author=users[(4 * i + k) % len(users)],
+            text='Отзыв', score=7
+        )
+        for i, title in enumerate(titles)
+        for k in range(4)
+    )
+    reviews = list(Review.objects.order_by('pk')[:4000])
+    Comments.objects.bulk_create(
+        Comments(review=review, author=author, text='Комментарий')
+        for review in reviews
+        for author in users[:2]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return titles[0], reviews[0]
+
+
+@pytest.mark.django_db
+class TestAccessPathIndexes:
+    '''Запросы эндпоинтов каталога ищут строки по своим индексам
+
+    Запрос с условием должен найти строки по индексу (SEARCH в SQLite,
+    Index Cond в PostgreSQL), а не пройти таблицу или индекс целиком
+    с фильтром. Основной запрос эндпоинта должен искать по индексу,
+    который для него создан. Поиск по подстроке в SQLite индексом
+    не ускоряется, поэтому фильтры name и search здесь не проверяются.
+    '''
+
+    # Таблица и индексы, по которым эндпоинт ищет строки. В SQLite
+    # индекс внешнего ключа содержит rowid и равен составному (fk, id)
+    access_paths = (
+        ('/api/v1/titles/', None),
+        ('/api/v1/titles/?year=1990', (
+            'reviews_title', {'title_year_id_idx'}
+        )),
+        ('/api/v1/titles/?category=category3', (
+            'reviews_title', {'title_category_year_id_idx'}
+        )),
+        ('/api/v1/titles/?genre=genre5', (
+            'reviews_title', {'title_genre_bits_idx'}
+        )),
+        ('/api/v1/titles/?category=category3&genre=genre3', (
+            'reviews_title',
+            {'title_category_year_id_idx', 'title_genre_bits_idx'}
+        )),
+        ('/api/v1/titles/?genre=genre1,genre4', (
+            'reviews_title', {'title_genre_bits_idx'}
+        )),
+        ('/api/v1/titles/?genre_all=genre1,genre4', (
+            'reviews_title', {'title_genre_bits_idx'}
+        )),
+        ('/api/v1/titles/{title_id}/', ('reviews_title', {PRIMARY_KEY})),
+        ('/api/v1/titles/{title_id}/reviews/', (
+            'reviews_review', {'review_title_id_idx'}
+        )),
+        ('/api/v1/titles/{title_id}/reviews/?pagination=cursor', (
+            'reviews_review', {'review_title_pub_date_idx'}
+        )),
+        ('/api/v1/titles/{title_id}/reviews/{review_id}/', (
+            'reviews_review', {PRIMARY_KEY}
+        )),
+        ('/api/v1/titles/{title_id}/reviews/{review_id}/comments/', (
+            'reviews_comments',
+            {'comment_review_id_idx', 'reviews_comments_review_id_090883fb'}
+        )),
+        ('/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+         '?pagination=cursor', (
+             'reviews_comments', {'comment_review_pub_date_idx'}
+         )),
+    )
+
+    def check_query(self, url, sql):
+        '''Ошибки плана одного запроса и найденные им (таблица, индекс)'''
+        bitmask = BITMASK.search(sql)
+        plan = explain(sql)
+        report = f'{url}:\n{sql}\n' + '\n'.join(plan)
+        errors, searched = [], set()
+        for table, index, search in ACCESSES[connection.vendor](plan):
+            if search:
+                searched.add((table, index))
+            elif table in LOOKUP_TABLES or ' WHERE ' not in sql:
+                continue
+            elif connection.vendor == 'sqlite' and bitmask and (
+                table == 'reviews_title'
+            ):
+                continue
+            else:
+                errors.append(
+                    f'Запрос читает {table} целиком без условия на индекс, '
+                    f'проверьте индексы `{report}'
+                )
+        order_by = ORDER_BY.search(sql)
+        # Совпадения GIN-индекса не упорядочены, их сортирует top-N
+        if not bitmask and not (
+            order_by and order_by.group(1) in LOOKUP_TABLES
+        ) and any(SORT[connection.vendor].search(line) for line in plan):
+            errors.append(f'Запрос сортирует строки без индекса `{report}')
+        return errors, searched
+
+    def test_index_access(self, dataset):
+        title, review = dataset
+        errors = []
+        for url, expected in self.access_paths:
+            url = url.format(title_id=title.id, review_id=review.id)
+            with CaptureQueriesContext(connection) as context:
+                response = APIClient().get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+            )
+            searched = set()
+            for query in context.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    query_errors, query_searched = self.check_query(
+                        url, query['sql']
+                    )
+                    errors.extend(query_errors)
+                    searched |= query_searched
+            if expected is None:
+                continue
+            table, indexes = expected
+            if connection.vendor == 'sqlite' and (
+                indexes == {'title_genre_bits_idx'}
+            ):
+                continue
+            if not {(table, index) for index in indexes} & searched:
+                errors.append(
+                    f'Эндпоинт `{url}` не ищет строки {table} по индексу '
+                    f'{" или ".join(sorted(indexes))}, найдено: '
+                    f'{sorted(searched)}'
+                )
+        assert not errors, '\n\n'.join(errors)
@@ -0,0 +1,109 @@
+import datetime as dt
+
+import pytest
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import OutgoingEmail
+from users.outbox import (MAX_ATTEMPTS, claim_pending, enqueue_email,
+                          send_pending)
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_enqueues_email(self, mailoutbox):
+        response = APIClient().post('/api/v1/auth/signup/', data={
+            'username': 'new_user', 'email': 'new_user@yamdb.fake'
+        })
+        assert response.status_code == 200
+        assert mailoutbox == [], (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'new_user@yamdb.fake'
+        assert email.sent is None
+
+        call_command('sendmail_outbox', once=True)
+        assert len(mailoutbox) == 1, (
+            'Проверьте, что sendmail_outbox отправляет письма из очереди'
+        )
+        assert mailoutbox[0].to == ['new_user@yamdb.fake']
+        email.refresh_from_db()
+        assert email.sent is not None
+
+    def test_retry_with_backoff(self, mailoutbox, monkeypatch):
+        enqueue_email('Тема', 'Текст', 'info@yamdb.ru', [
+            'ok@yamdb.fake', 'broken@yamdb.fake'
+        ])
+        original_send = EmailMessage.send
+
+        def send(message, *args, **kwargs):
+            if message.to == ['broken@yamdb.fake']:
+                raise ConnectionError('Сервер не отвечает')
+            return original_send(message, *args, **kwargs)
+
+        monkeypatch.setattr(EmailMessage, 'send', send)
+        assert send_pending() == (1, 1)
+        broken = OutgoingEmail.objects.get(to='broken@yamdb.fake')
+        assert broken.attempts == 1
+        assert broken.next_attempt > timezone.now(), (
+            'Проверьте, что повтор откладывается'
+        )
+        assert 'Сервер не отвечает' in broken.last_error
+        assert send_pending() == (0, 0), (
+            'Проверьте, что письмо не повторяется до срока'
+        )
+
+        monkeypatch.undo()
+        OutgoingEmail.objects.filter(pk=broken.pk).update(
+            next_attempt=timezone.now() - dt.timedelta(seconds=1)
+        )
+        assert send_pending() == (1, 0)
+        assert [message.to for message in mailoutbox] == [
+            ['ok@yamdb.fake'], ['broken@yamdb.fake']
+        ]
+
+    def test_max_attempts(self, mailoutbox):
+        enqueue_email('Тема', 'Текст', 'info@yamdb.ru', ['a@yamdb.fake'])
+        OutgoingEmail.objects.update(attempts=3)
+        assert send_pending(max_attempts=3) == (0, 0), (
+            'Проверьте, что исчерпавшие попытки письма не отправляются'
+        )
+
+    def test_send_outside_transaction(self, mailoutbox, monkeypatch):
+        enqueue_email('Тема', 'Текст', 'info@yamdb.ru', ['a@yamdb.fake'])
+        original_send = EmailMessage.send
+        savepoints, pending = [], []
+
+        def send(message, *args, **kwargs):
+            savepoints.append(list(connection.savepoint_ids))
+            pending.append(send_pending())
+            return original_send(message, *args, **kwargs)
+
+        monkeypatch.setattr(EmailMessage, 'send', send)
+        # Тест сам выполняется внутри транзакции pytest-django,
+        # atomic() внутри неё открывает точку сохранения
+        outer = list(connection.savepoint_ids)
+        assert send_pending() == (1, 0)
+        assert savepoints == [outer], (
+            'Проверьте, что письма отправляются вне транзакции'
+        )
+        assert pending == [(0, 0)], (
+            'Проверьте, что забранное письмо не берёт другой обработчик'
+        )
+        assert OutgoingEmail.objects.get().sent is not None
+
+    def test_claim_timeout(self, mailoutbox):
+        enqueue_email('Тема', 'Текст', 'info@yamdb.ru', ['a@yamdb.fake'])
+        claim_pending(10, MAX_ATTEMPTS, timezone.now())
+        assert send_pending() == (0, 0)
+        OutgoingEmail.objects.update(
+            next_attempt=timezone.now() - dt.timedelta(seconds=1)
+        )
+        assert send_pending() == (1, 0), (
+            'Проверьте, что письма упавшего обработчика возвращаются в очередь'
+        )
@@ -0,0 +1,80 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestCursorPagination:
+
+    @pytest.mark.parametrize('url', (
+        '/api/v1/titles/{title_id}/reviews/',
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+    ))
+    def test_cursor_pages(self, make_catalog, django_assert_num_queries,
+                          url):
+        title, review = make_catalog(25)
+        url = url.format(title_id=title.id, review_id=review.id)
+        client = APIClient()
+
+        response = client.get(url)
+        assert 'count' in response.json(), (
+            'Проверьте, что без параметра pagination пагинация не меняется'
+        )
+
+        ids = []
+        next_url = f'{url}?pagination=cursor'
+        while next_url:
+            with django_assert_num_queries(1):
+                response = client.get(next_url)
+            assert response.status_code == 200, (
+                f'Проверьте, что GET-запрос к `{next_url}` '
+                'возвращает статус 200'
+            )
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что курсорная пагинация не считает COUNT(*)'
+            )
+            ids.extend(item['id'] for item in data['results'])
+            next_url = data['next']
+
+        assert len(ids) == 25 and len(set(ids)) == 25, (
+            'Проверьте, что курсорная пагинация возвращает все записи '
+            'без повторов'
+        )
+
+    def test_cursor_keyset(self, make_catalog):
+        from reviews.models import Review
+
+        title, _ = make_catalog(25)
+        # Одинаковое время публикации: порядок задаёт только id
+        Review.objects.update(pub_date=title.reviews.first().pub_date)
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        client = APIClient()
+        pages = []
+        while url:
+            data = client.get(url).json()
+            pages.append([item['id'] for item in data['results']])
+            url = data['next']
+        ids = [pk for page in pages for pk in page]
+        assert ids == sorted(
+            title.reviews.values_list('id', flat=True)
+        ), (
+            'Проверьте, что курсор упорядочивает записи по (pub_date, id) '
+            'и не теряет записи с одинаковым pub_date'
+        )
+
+        url = data['previous']
+        for page in reversed(pages[:-1]):
+            data = client.get(url).json()
+            assert [item['id'] for item in data['results']] == page, (
+                'Проверьте, что ссылка previous возвращает '
+                'предыдущую страницу'
+            )
+            url = data['previous']
+        assert url is None
+
+        response = client.get(
+            f'/api/v1/titles/{title.id}/reviews/?cursor=bad'
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что неверный курсор возвращает статус 404'
+        )
@@ -0,0 +1,195 @@
+from types import SimpleNamespace
+
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+PAGE_SIZES = (1, 5, 15)
+# Управление транзакцией не входит в бюджет записи
+TRANSACTION_STATEMENTS = ('SAVEPOINT', 'RELEASE', 'BEGIN', 'COMMIT')
+
+
+def count_statements(queries):
+    return len([
+        query for query in queries
+        if not query['sql'].upper().startswith(TRANSACTION_STATEMENTS)
+    ])
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+    '''Число SQL-запросов на эндпоинт не зависит от размера страницы
+
+    ETag без условных заголовков не требует запроса к БД, фильтр
+    по жанрам читает биты жанров отдельным запросом.
+    '''
+
+    list_budgets = (
+        ('/api/v1/categories/', 2),
+        ('/api/v1/genres/', 2),
+        ('/api/v1/titles/', 3),
+        ('/api/v1/titles/?genre=drama', 4),
+        ('/api/v1/titles/{title_id}/reviews/', 2),
+        ('/api/v1/titles/{title_id}/reviews/{review_id}/comments/', 2),
+    )
+    detail_budgets = (
+        ('/api/v1/titles/{title_id}/', 2),
+        ('/api/v1/titles/{title_id}/reviews/{review_id}/', 1),
+    )
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    @pytest.mark.parametrize('url, budget', list_budgets)
+    def test_list_budget(self, make_catalog, django_assert_num_queries,
+                         size, url, budget):
+        title, review = make_catalog(size)
+        url = url.format(title_id=title.id, review_id=review.id)
+        client = APIClient()
+        with django_assert_num_queries(budget):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+        )
+        assert response.json()['results'], (
+            f'Проверьте, что GET-запрос к `{url}` возвращает данные'
+        )
+
+    @pytest.mark.parametrize('url, budget', detail_budgets)
+    def test_detail_budget(self, make_catalog, django_assert_num_queries,
+                           url, budget):
+        title, review = make_catalog(5)
+        url = url.format(title_id=title.id, review_id=review.id)
+        with django_assert_num_queries(budget):
+            response = APIClient().get(url)
+        assert response.status_code == 200, (
+            f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+        )
+
+    @pytest.mark.parametrize('size', PAGE_SIZES)
+    def test_users_budget(self, admin_client, make_catalog,
+                          django_assert_num_queries, size):
+        make_catalog(size)
+        with django_assert_num_queries(2):
+            response = admin_client.get('/api/v1/users/?limit=20')
+        assert response.status_code == 200, (
+            'Проверьте, что GET-запрос администратора к `/api/v1/users/` '
+            'возвращает статус 200'
+        )
+
+
+@pytest.mark.django_db
+class TestWriteBudget:
+    '''Создание отзыва и комментария укладывается в два SQL-запроса'''
+
+    def test_review_create(self, title, another_user):
+        client = APIClient()
+        client.force_authenticate(another_user)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, data={'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        assert response.json()['author'] == another_user.username
+        assert count_statements(context.captured_queries) <= 2, (
+            'Проверьте, что создание отзыва не выполняет лишних запросов: '
+            f'{context.captured_queries}'
+        )
+
+        response = client.post(url, data={'text': 'Ещё', 'score': 5})
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв автора возвращает статус 400'
+        )
+        assert 'non_field_errors' in response.json()
+
+    def test_comment_create(self, make_catalog, another_user):
+        title, review = make_catalog(1)
+        client = APIClient()
+        client.force_authenticate(another_user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+                data={'text': 'Комментарий'}
+            )
+        assert response.status_code == 201
+        assert response.json()['author'] == another_user.username
+        assert count_statements(context.captured_queries) <= 2, (
+            'Проверьте, что создание комментария не выполняет лишних '
+            f'запросов: {context.captured_queries}'
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestWriteMissingParent:
+    '''Внешние ключи проверяются при фиксации транзакции'''
+
+    def test_missing_title(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            '/api/v1/titles/999/reviews/', data={'text': 'Т', 'score': 5}
+        )
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв к несуществующему произведению '
+            'возвращает статус 404'
+        )
+
+    def test_missing_review(self, title, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            f'/api/v1/titles/{title.id}/reviews/999/comments/',
+            data={'text': 'Т'}
+        )
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+class TestWriteIntegrityErrors:
+    '''Ответ на ошибку БД зависит от нарушенного ограничения'''
+
+    def test_duplicate_review(self, title, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert client.post(url, data={'text': 'Т', 'score': 5}).status_code == 201
+        response = client.post(url, data={'text': 'Т', 'score': 5})
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв возвращает статус 400'
+        )
+
+    def test_other_error_is_raised(self, title, user, monkeypatch):
+        from api.serializers import ReviewSerializer
+
+        def save(self, **kwargs):
+            raise IntegrityError('NOT NULL constraint failed: reviews_review.text')
+
+        monkeypatch.setattr(ReviewSerializer, 'save', save)
+        client = APIClient()
+        client.force_authenticate(user)
+        with pytest.raises(IntegrityError):
+            client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'Т', 'score': 5}
+            )
+
+    @pytest.mark.parametrize('pgcode, constraint, foreign_key, unique', (
+        ('23503', 'reviews_review_title_id_fkey', True, False),
+        ('23505', 'unique_title_author', False, True),
+        ('23505', 'reviews_review_pkey', False, False),
+        ('23502', None, False, False),
+    ))
+    def test_postgresql_sqlstate(self, pgcode, constraint, foreign_key,
+                                 unique):
+        from api.views import is_foreign_key_violation, is_unique_violation
+        from reviews.models import Review
+
+        error = IntegrityError('FOREIGN KEY и UNIQUE в тексте не важны')
+        error.__cause__ = Exception()
+        error.__cause__.pgcode = pgcode
+        error.__cause__.diag = SimpleNamespace(constraint_name=constraint)
+        assert is_foreign_key_violation(error) == foreign_key
+        assert is_unique_violation(
+            error, Review, 'unique_title_author'
+        ) == unique, (
+            'Проверьте, что ограничение в PostgreSQL определяется '
+            'по SQLSTATE и имени ограничения'
+        )
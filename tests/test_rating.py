@@ -0,0 +1,101 @@
+import pytest
+from django.core.management import call_command
+
+from reviews.models import Review, Title
+
+
+def refresh(title):
+    return Title.objects.get(pk=title.pk)
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_on_create_update_delete(self, title, user, another_user):
+        assert refresh(title).rating is None, (
+            'Проверьте, что у произведения без отзывов рейтинг пустой'
+        )
+
+        review = Review.objects.create(
+            title=title, author=user, text='Текст', score=10
+        )
+        Review.objects.create(
+            title=title, author=another_user, text='Текст', score=5
+        )
+        title = refresh(title)
+        assert (title.rating, title.review_count, title.score_sum) == (
+            7.5, 2, 15
+        ), 'Проверьте, что рейтинг обновляется при создании отзыва'
+
+        review = Review.objects.get(pk=review.pk)
+        review.score = 1
+        review.save()
+        assert refresh(title).rating == 3.0, (
+            'Проверьте, что рейтинг обновляется при изменении оценки'
+        )
+
+        review.delete()
+        title = refresh(title)
+        assert (title.rating, title.review_count) == (5.0, 1), (
+            'Проверьте, что рейтинг обновляется при удалении отзыва'
+        )
+
+    def test_rating_on_cascade(self, title, user, another_user):
+        Review.objects.create(title=title, author=user, text='Т', score=2)
+        Review.objects.create(
+            title=title, author=another_user, text='Т', score=8
+        )
+        user.delete()
+        title = refresh(title)
+        assert (title.rating, title.review_count) == (8.0, 1), (
+            'Проверьте, что рейтинг обновляется при каскадном удалении отзывов'
+        )
+
+    def test_title_save_keeps_rating(self, title, user):
+        stale_title = refresh(title)
+        Review.objects.create(title=title, author=user, text='Т', score=4)
+        stale_title.name = 'Новое название'
+        stale_title.save()
+        assert refresh(title).rating == 4.0, (
+            'Проверьте, что сохранение произведения не затирает рейтинг'
+        )
+
+    def test_recalculate_ratings_command(self, title, user):
+        Review.objects.create(title=title, author=user, text='Т', score=6)
+        Title.objects.update(rating=None, review_count=0, score_sum=0)
+        call_command('recalculate_ratings')
+        title = refresh(title)
+        assert (title.rating, title.review_count, title.score_sum) == (
+            6.0, 1, 6
+        ), 'Проверьте, что команда recalculate_ratings пересчитывает рейтинг'
+
+    @pytest.mark.parametrize('delete', (
+        lambda title: title.delete(),
+        lambda title: Title.objects.filter(pk=title.pk).delete(),
+    ))
+    def test_title_delete_skips_rating(self, title, user, another_user,
+                                       delete):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        for author in (user, another_user):
+            Review.objects.create(title=title, author=author, text='Т',
+                                  score=5)
+        with CaptureQueriesContext(connection) as context:
+            delete(title)
+        assert not Title.objects.filter(pk=title.pk).exists()
+        assert not [
+            query for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "reviews_title"')
+        ], (
+            'Проверьте, что удаление произведения не пересчитывает его '
+            'рейтинг по каждому отзыву'
+        )
+
+        Review.objects.create(
+            title=Title.objects.create(name='Другое', year=2000),
+            author=user, text='Т', score=4
+        ).delete()
+        assert Title.objects.get(name='Другое').review_count == 0, (
+            'Проверьте, что после удаления произведения рейтинг других '
+            'произведений снова обновляется'
+        )
@@ -0,0 +1,78 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.middleware import EndpointStats, request_stats
+
+
+@pytest.fixture
+def stats_enabled(settings):
+    settings.API_REQUEST_STATS = True
+    request_stats.reset()
+    yield
+    request_stats.reset()
+
+
+class TestEndpointStats:
+
+    def test_percentiles_from_histogram(self):
+        stats = EndpointStats()
+        for wall_ms in [3] * 90 + [300] * 10:
+            stats.add(wall_ms, 2, 1.0, 100, 200)
+        result = stats.as_dict()
+        assert result['requests'] == 100
+        assert result['p50_ms'] == 5, (
+            'Проверьте, что p50 равен верхней границе корзины гистограммы'
+        )
+        assert result['p99_ms'] == 300, (
+            'Проверьте, что перцентиль не превышает максимум'
+        )
+        assert result['queries'] == 2
+        assert sum(result['histogram'].values()) == 100
+
+
+@pytest.mark.django_db
+class TestRequestStatsMiddleware:
+
+    def test_disabled_by_default(self, title):
+        response = APIClient().get('/api/v1/titles/')
+        assert 'Server-Timing' not in response, (
+            'Проверьте, что сбор статистики по умолчанию выключен'
+        )
+
+    def test_server_timing_and_stats(self, stats_enabled, title,
+                                     admin_client):
+        response = APIClient().get(f'/api/v1/titles/{title.id}/')
+        assert response.status_code == 200
+        assert 'db;dur=' in response['Server-Timing'], (
+            'Проверьте, что ответ содержит заголовок Server-Timing'
+        )
+
+        response = admin_client.get('/api/v1/stats/')
+        assert response.status_code == 200
+        endpoints = {
+            (item['view'], item['method']): item
+            for item in response.json()['endpoints']
+        }
+        detail = endpoints[('title-detail', 'GET')]
+        assert detail['requests'] == 1
+        assert detail['queries'] >= 1, (
+            'Проверьте, что учитываются SQL-запросы эндпоинта'
+        )
+        assert detail['bytes'] > 0
+
+        assert admin_client.delete('/api/v1/stats/').status_code == 204
+        views = {
+            item['view']
+            for item in admin_client.get('/api/v1/stats/').json()['endpoints']
+        }
+        assert 'title-detail' not in views, (
+            'Проверьте, что DELETE-запрос сбрасывает статистику'
+        )
+
+    def test_stats_admin_only(self, stats_enabled, user):
+        client = APIClient()
+        assert client.get('/api/v1/stats/').status_code == 401
+        client.force_authenticate(user)
+        assert client.get('/api/v1/stats/').status_code == 403, (
+            'Проверьте, что статистика доступна только администратору'
+        )
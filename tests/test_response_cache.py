@@ -0,0 +1,74 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Categories, Review
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResponseCache:
+
+    def test_cached_until_write(self, title, user,
+                                django_assert_num_queries):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.id}/'
+        assert client.get(url).json()['rating'] is None
+
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response.status_code == 200, (
+            'Проверьте, что повторный GET-запрос отдаётся из кэша'
+        )
+
+        client.get('/api/v1/titles/')
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200, (
+            'Проверьте, что повторный GET-запрос списка отдаётся из кэша'
+        )
+
+        Review.objects.create(title=title, author=user, text='Т', score=9)
+        assert client.get(url).json()['rating'] == 9, (
+            'Проверьте, что создание отзыва сбрасывает кэш произведений'
+        )
+
+    def test_review_text_keeps_titles(self, title, user):
+        from api.cache import get_version
+        review = Review.objects.create(
+            title=title, author=user, text='Т', score=9
+        )
+        version = get_version('titles')
+        review.text = 'Новый текст'
+        review.save()
+        assert get_version('titles') == version, (
+            'Проверьте, что правка текста отзыва не сбрасывает кэш '
+            'произведений'
+        )
+        review.score = 3
+        review.save()
+        assert get_version('titles') != version, (
+            'Проверьте, что изменение оценки сбрасывает кэш произведений'
+        )
+
+    def test_query_string_in_key(self, title):
+        client = APIClient()
+        assert client.get('/api/v1/titles/').json()['count'] == 1
+        assert client.get('/api/v1/titles/?year=1').json()['count'] == 0, (
+            'Проверьте, что параметры запроса входят в ключ кэша'
+        )
+
+    def test_write_invalidates_lists(self, admin_client, category):
+        client = APIClient()
+        assert client.get('/api/v1/categories/').json()['count'] == 1
+
+        response = admin_client.post(
+            '/api/v1/categories/', data={'name': 'Книга', 'slug': 'book'}
+        )
+        assert response.status_code == 201
+        assert client.get('/api/v1/categories/').json()['count'] == 2, (
+            'Проверьте, что создание категории сбрасывает кэш категорий'
+        )
+
+        Categories.objects.filter(slug='book').delete()
+        assert client.get('/api/v1/categories/').json()['count'] == 1, (
+            'Проверьте, что удаление категории сбрасывает кэш категорий'
+        )
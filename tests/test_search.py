@@ -0,0 +1,51 @@
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Title
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    @pytest.fixture
+    def titles(self, category):
+        return [
+            Title.objects.create(
+                name=name, year=year, description=description,
+                category=category
+            )
+            for name, year, description in (
+                ('Зелёная миля', 1999, 'Тюремная драма по Стивену Кингу'),
+                ('Ёлки', 2010, 'Новогодняя комедия'),
+                ('Побег', 1994, 'Драма о зелёной надежде'),
+            )
+        ]
+
+    def search(self, query):
+        response = APIClient().get('/api/v1/titles/', {'search': query})
+        assert response.status_code == 200
+        return [item['name'] for item in response.json()['results']]
+
+    def test_cyrillic_case_folding(self, titles):
+        assert self.search('ЗЕЛЁН') == ['Зелёная миля', 'Побег'], (
+            'Проверьте, что поиск не зависит от регистра кириллицы и ё'
+        )
+        assert self.search('елки') == ['Ёлки'], (
+            'Проверьте, что буквы ё и е в поиске не различаются'
+        )
+
+    def test_ranked_by_relevance(self, titles):
+        assert sorted(self.search('драма')) == ['Зелёная миля', 'Побег'], (
+            'Проверьте, что поиск находит совпадения в описании'
+        )
+        assert self.search('зелён')[0] == 'Зелёная миля', (
+            'Проверьте, что совпадение в названии выше, чем в описании'
+        )
+
+    def test_all_words_required(self, titles):
+        assert self.search('драма кингу') == ['Зелёная миля'], (
+            'Проверьте, что результаты содержат все слова запроса'
+        )
+        assert self.search('   ') == [
+            'Ёлки', 'Зелёная миля', 'Побег'
+        ], 'Проверьте, что пустой запрос не фильтрует произведения'
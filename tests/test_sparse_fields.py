@@ -0,0 +1,98 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def get(url, client=None):
+    client = client or APIClient()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+    )
+    return response.json(), [query['sql'] for query in context]
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+
+    def test_title_fields(self, make_catalog):
+        make_catalog(5)
+        data, queries = get('/api/v1/titles/?fields=id,name,rating')
+        assert all(
+            list(title) == ['id', 'name', 'rating']
+            for title in data['results']
+        ), 'Проверьте, что ?fields= оставляет только перечисленные поля'
+        assert len(queries) == 2, (
+            'Проверьте, что без genre жанры не загружаются отдельным '
+            'запросом'
+        )
+        page_query = queries[-1]
+        assert 'reviews_categories' not in page_query, (
+            'Проверьте, что без category категория не присоединяется'
+        )
+        assert '"description"' not in page_query, (
+            'Проверьте, что невыбранные колонки не читаются из БД'
+        )
+
+    def test_title_omit(self, make_catalog):
+        make_catalog(5)
+        data, queries = get('/api/v1/titles/?omit=genre,description')
+        assert list(data['results'][0]) == [
+            'id', 'name', 'year', 'rating', 'category'
+        ], 'Проверьте, что ?omit= убирает перечисленные поля'
+        assert data['results'][0]['category']['slug'] == 'movie'
+        assert len(queries) == 2
+        assert not any('reviews_genres' in query for query in queries)
+
+    def test_title_detail(self, title):
+        data, queries = get(f'/api/v1/titles/{title.id}/?fields=name,genre')
+        assert data == {
+            'name': title.name,
+            'genre': [
+                {'name': 'Драма', 'slug': 'drama'},
+                {'name': 'Комедия', 'slug': 'comedy'},
+            ],
+        }
+
+    def test_reviews_and_comments(self, make_catalog):
+        title, review = make_catalog(12)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        data, queries = get(f'{url}?fields=id,score')
+        assert list(data['results'][0]) == ['id', 'score']
+        assert not any('users_user' in query for query in queries), (
+            'Проверьте, что без author автор не присоединяется'
+        )
+
+        data, queries = get(
+            f'{url}?pagination=cursor&fields=id,text'
+        )
+        assert list(data['results'][0]) == ['id', 'text']
+        assert data['next'], 'Проверьте курсорную пагинацию с ?fields='
+        assert len(queries) == 1, (
+            'Проверьте, что колонки курсора читаются вместе со страницей'
+        )
+
+        data, queries = get(f'{url}{review.id}/comments/?omit=author')
+        assert list(data['results'][0]) == ['id', 'text', 'pub_date']
+        assert not any('users_user' in query for query in queries)
+
+    def test_unknown_field(self, title):
+        response = APIClient().get('/api/v1/titles/?fields=id,secret')
+        assert response.status_code == 400, (
+            'Проверьте, что неизвестное поле в ?fields= даёт статус 400'
+        )
+        assert 'secret' in response.json()['fields']
+
+    def test_write_ignores_fieldset(self, title, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        response = client.post(
+            f'/api/v1/titles/{title.id}/reviews/?fields=id',
+            {'text': 'Отзыв', 'score': 7}, format='json'
+        )
+        assert response.status_code == 201
+        assert {'id', 'text', 'author', 'score'} <= set(response.json()), (
+            'Проверьте, что ?fields= не влияет на запросы на запись'
+        )
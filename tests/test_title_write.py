@@ -0,0 +1,68 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Genres, Title
+
+
+def statements(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'SAVEPOINT' not in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleWrite:
+    url = '/api/v1/titles/'
+
+    @pytest.mark.parametrize('genres_count', (1, 8))
+    def test_create_query_budget(self, admin_client, category, genres_count):
+        slugs = [f'genre{i}' for i in range(genres_count)]
+        Genres.objects.bulk_create(
+            Genres(name=slug, slug=slug) for slug in slugs
+        )
+        data = {
+            'name': 'Произведение', 'year': 2000, 'description': 'Описание',
+            'genre': slugs, 'category': category.slug,
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(self.url, data=data, format='json')
+        assert response.status_code == 201, (
+            f'Проверьте, что POST-запрос к `{self.url}` создаёт произведение'
+        )
+        assert len(statements(context)) <= 5, (
+            'Проверьте, что создание произведения не делает запрос '
+            'на каждый жанр'
+        )
+        assert [genre['slug'] for genre in response.json()['genre']] == slugs
+        assert response.json()['category']['slug'] == category.slug
+        title = Title.objects.get(pk=response.json()['id'])
+        assert sorted(title.genre.values_list('slug', flat=True)) == slugs
+
+    def test_update_writes_genre_diff(self, admin_client, title, genres):
+        extra = Genres.objects.create(name='Триллер', slug='thriller')
+        url = f'{self.url}{title.id}/'
+        response = admin_client.patch(
+            url, data={'genre': ['comedy', 'thriller']}, format='json'
+        )
+        assert response.status_code == 200, (
+            f'Проверьте, что PATCH-запрос к `{url}` возвращает статус 200'
+        )
+        assert [genre['slug'] for genre in response.json()['genre']] == [
+            'comedy', 'thriller'
+        ]
+        assert set(title.genre.all()) == {genres[1], extra}, (
+            'Проверьте, что PATCH-запрос обновляет жанры произведения'
+        )
+
+    def test_unknown_genre(self, admin_client, category):
+        data = {
+            'name': 'Произведение', 'year': 2000, 'description': 'Описание',
+            'genre': ['unknown'], 'category': category.slug,
+        }
+        response = admin_client.post(self.url, data=data, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что при несуществующем жанре возвращается статус 400'
+        )
+        assert 'genre' in response.json()